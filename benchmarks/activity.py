@@ -0,0 +1,70 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Compare the per-commit activity aggregation of the collector with the
+NumPy one on synthetic commits.
+
+    python benchmarks/activity.py [commits]
+"""
+
+import random
+import sys
+import time
+
+from gitstats.activity import HAVE_NUMPY, update_activity_arrays
+from gitstats.main import GitDataCollector
+
+TIMEZONES = ("+0000", "+0100", "+0200", "-0500", "-0800", "+0530", "+0900")
+
+
+def get_commits(count, authors=500, years=20, seed=0):
+    """Return count random (stamp, timezone, author, mail) tuples."""
+    rng = random.Random(seed)
+    end = int(time.time())
+    start = end - years * 365 * 86400
+    names = ["Author %d" % i for i in range(authors)]
+    commits = []
+    for stamp in sorted(rng.randrange(start, end) for _ in range(count)):
+        i = int(rng.paretovariate(1.2)) % authors
+        commits.append(
+            (
+                stamp,
+                rng.choice(TIMEZONES),
+                names[i],
+                "author%d@example%d.com" % (i, i % 7),
+            )
+        )
+    return commits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    commits = get_commits(count)
+
+    loop = GitDataCollector()
+    start = time.time()
+    for commit in commits:
+        loop.update_activity(*commit)
+    loop_time = time.time() - start
+    print("per commit: %.2f secs" % loop_time)
+
+    if not HAVE_NUMPY:
+        print("numpy: not installed")
+        return
+
+    arrays = GitDataCollector()
+    start = time.time()
+    update_activity_arrays(arrays, commits)
+    arrays_time = time.time() - start
+    print("numpy:      %.2f secs (%.1fx)" % (arrays_time, loop_time / arrays_time))
+
+    for name in vars(loop):
+        ours, theirs = getattr(loop, name), getattr(arrays, name)
+        if hasattr(ours, "to_dict"):
+            ours, theirs = ours.to_dict(), theirs.to_dict()
+        if name not in ("stamp_created", "cache") and ours != theirs:
+            print("MISMATCH: %s" % name)
+
+
+if __name__ == "__main__":
+    main()
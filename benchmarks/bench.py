@@ -0,0 +1,144 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Run gitstats on synthetic repositories of several sizes, once with a cold
+cache and once with the cache of that run, and write the timing of each
+phase, and of rendering each page of the report, to a JSON file to compare
+versions with.
+
+    nox -s bench -- [--scales 10000,100000,1000000] [--output results.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+from gitstats import load_config
+from gitstats.activity import HAVE_NUMPY
+from gitstats.main import GitDataCollector
+from gitstats.utils import get_git_version, get_version
+
+from render import time_render
+from repo import generate
+
+RESULTS_VERSION = 2
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "--scales",
+        default="10000,100000",
+        help="Comma separated numbers of commits of the repositories.",
+    )
+    parser.add_argument("--authors", type=int, default=200)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=100)
+    parser.add_argument(
+        "--merges", type=float, default=0.05, help="Share of merge commits."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-c",
+        "--config",
+        metavar="key=value",
+        action="append",
+        default=[],
+        help="Configuration value passed on to gitstats.",
+    )
+    parser.add_argument(
+        "--workdir",
+        default=".bench",
+        help="Directory of the generated repositories and reports, they are "
+        "generated once and reused.",
+    )
+    parser.add_argument("--output", default="bench-results.json")
+    return parser
+
+
+def run_gitstats(repository, report, config):
+    """Run gitstats, return the wall time and its timing report."""
+    cmd = [sys.executable, "-m", "gitstats.main", "--profile"]
+    for item in config:
+        cmd += ["-c", item]
+    start = time.time()
+    subprocess.run(cmd + [repository, report], check=True, stdout=subprocess.DEVNULL)
+    wall = time.time() - start
+    with open(os.path.join(report, "profile.json")) as f:
+        return wall, json.load(f)
+
+
+def run_render(repository, report, config):
+    """Time rendering the pages, on the data collected with the cache of report."""
+    conf = load_config()
+    for item in config:
+        key, value = item.split("=", 1)
+        conf[key] = value
+    data = GitDataCollector()
+    data.load_cache(os.path.join(report, "gitstats.cache"))
+    data.collect(repository)
+    data.refine()
+    return time_render(data)
+
+
+def main():
+    args = get_parser().parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "gitstats": get_version(),
+        "git": get_git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": HAVE_NUMPY,
+        "config": args.config,
+        "runs": [],
+        "render": [],
+    }
+    for commits in (int(el) for el in args.scales.split(",")):
+        params = {
+            "commits": commits,
+            "authors": args.authors,
+            "files": args.files,
+            "tags": args.tags,
+            "merges": args.merges,
+            "seed": args.seed,
+        }
+        name = "repo-%(commits)d-%(authors)d-%(files)d-%(tags)d-%(merges)g-%(seed)d"
+        repository = os.path.abspath(os.path.join(args.workdir, name % params))
+        if not os.path.exists(repository):
+            print("Generating %s" % repository)
+            generate(repository, **params)
+
+        report = os.path.join(args.workdir, "report-%d" % commits)
+        shutil.rmtree(report, ignore_errors=True)
+        for cache in ("cold", "warm"):
+            wall, profile = run_gitstats(repository, report, args.config)
+            print("%d commits, %s cache: %.2f secs" % (commits, cache, wall))
+            results["runs"].append(
+                dict(params, cache=cache, wall=wall, profile=profile)
+            )
+        render = run_render(repository, report, args.config)
+        print(
+            "%d commits, pages rendered in %.2f ms"
+            % (commits, 1000 * sum(sum(el.values()) for el in render["pages"].values()))
+        )
+        results["render"].append(dict(params, **render))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print("Results written to %s" % args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
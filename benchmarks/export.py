@@ -0,0 +1,75 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Compare the time, peak memory and size of the exports with the former
+json.dump() of the whole collector, on the data of a repository.
+
+    python benchmarks/export.py <repository>
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from gitstats.export import BINARY_FORMATS, WRITERS
+from gitstats.main import GitDataCollector
+
+
+def legacy_default(value):
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+def write_legacy(data, f):
+    """The former export, the __dict__ of the collector with one json.dump()."""
+    json.dump(data.__dict__, f, default=legacy_default)
+
+
+def open_output(name, path):
+    if name in BINARY_FORMATS:
+        return open(path, "wb")
+    return open(path, "w", encoding="utf-8")
+
+
+def measure(name, write, data, path):
+    """
+    Return the seconds, peak bytes allocated and bytes written by write.
+    The peak is measured in a second run, as tracing slows it down.
+    """
+    start = time.perf_counter()
+    with open_output(name, path) as f:
+        write(data, f)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    with open_output(name, path) as f:
+        write(data, f)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, os.path.getsize(path)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return 1
+    data = GitDataCollector()
+    data.collect(sys.argv[1])
+    data.refine()
+
+    writers = dict(legacy=write_legacy, **WRITERS)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, write in writers.items():
+            seconds, peak, size = measure(name, write, data, os.path.join(tmp, name))
+            print(
+                "%-7s %8.2f secs, peak %8.1f MB, written %8.1f MB"
+                % (name, seconds, peak / 2**20, size / 2**20)
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
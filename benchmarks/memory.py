@@ -0,0 +1,88 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Compare the memory used by the per-commit line statistics kept as nested
+dicts with the columnar storage, on a synthetic history.
+
+    python benchmarks/memory.py [commits] [authors]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from gitstats.changes import ChangesByDate, ChangesByDateByAuthor
+
+
+def get_commits(count, authors, seed=0):
+    """Yield count random (stamp, author, files, inserted, deleted) tuples."""
+    rng = random.Random(seed)
+    stamp = 1000000000
+    for _ in range(count):
+        stamp += rng.randrange(1, 3600)
+        yield (
+            stamp,
+            "Author %d" % (int(rng.paretovariate(1.2)) % authors),
+            rng.randrange(1, 10),
+            rng.randrange(0, 200),
+            rng.randrange(0, 100),
+        )
+
+
+def build_dicts(commits):
+    changes_by_date = {}
+    changes_by_date_by_author = {}
+    lines = 0
+    totals = {}
+    for stamp, author, files, inserted, deleted in commits:
+        lines += inserted - deleted
+        changes_by_date[stamp] = {
+            "files": files,
+            "ins": inserted,
+            "del": deleted,
+            "lines": lines,
+        }
+        added, commits = totals.get(author, (0, 0))
+        totals[author] = (added + inserted, commits + 1)
+        changes_by_date_by_author.setdefault(stamp, {})[author] = {
+            "lines_added": added + inserted,
+            "commits": commits + 1,
+        }
+    return changes_by_date, changes_by_date_by_author
+
+
+def build_columns(commits):
+    changes_by_date = ChangesByDate()
+    changes_by_date_by_author = ChangesByDateByAuthor()
+    lines = 0
+    totals = {}
+    for stamp, author, files, inserted, deleted in commits:
+        lines += inserted - deleted
+        changes_by_date.add(stamp, files, inserted, deleted, lines)
+        added, commits = totals.get(author, (0, 0))
+        totals[author] = (added + inserted, commits + 1)
+        changes_by_date_by_author.add(stamp, author, added + inserted, commits + 1)
+    return changes_by_date, changes_by_date_by_author
+
+
+def measure(build, count, authors):
+    tracemalloc.start()
+    result = build(get_commits(count, authors))
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    authors = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    dicts = measure(build_dicts, count, authors)
+    columns = measure(build_columns, count, authors)
+    print("commits: %d, authors: %d" % (count, authors))
+    print("nested dicts: %.1f MB" % (dicts / 1048576.0))
+    print("columnar:     %.1f MB (%.1fx less)" % (columns / 1048576.0, dicts / columns))
+
+
+if __name__ == "__main__":
+    main()
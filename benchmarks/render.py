@@ -0,0 +1,76 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Time the compilation of the report templates, and the building of the
+view of each page and its rendering, on the data of a repository.
+
+    python benchmarks/render.py <repository> [repeat]
+"""
+
+import sys
+import time
+
+from gitstats import load_config
+from gitstats.charts import get_chart_backend
+from gitstats.main import GitDataCollector
+from gitstats.report_creator import (
+    PAGES,
+    HTMLReportCreator,
+    get_template,
+    load_templates,
+    render,
+)
+
+conf = load_config()
+
+
+def time_render(data, repeat=5):
+    """
+    Return the seconds taken to compile the templates, and page -> the
+    best seconds of repeat runs to build the view of the page and render it.
+    """
+    creator = HTMLReportCreator()
+    creator.title = data.project_name
+    creator.version = "benchmark"
+    creator.chart_backend = get_chart_backend(conf["chart_backend"])
+
+    get_template.cache_clear()
+    start = time.perf_counter()
+    load_templates()
+    result = {"compile": time.perf_counter() - start, "pages": {}}
+    for page in PAGES:
+        get_view = getattr(creator, "get_%s_view" % page)
+        view_time = render_time = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            view = get_view(data)
+            middle = time.perf_counter()
+            render(page, **view)
+            end = time.perf_counter()
+            view_time = min(view_time, middle - start)
+            render_time = min(render_time, end - middle)
+        result["pages"][page] = {"view": view_time, "render": render_time}
+    return result
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return 1
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    data = GitDataCollector()
+    data.collect(sys.argv[1])
+    data.refine()
+
+    result = time_render(data, repeat)
+    print("templates compiled in %.2f ms" % (1000 * result["compile"]))
+    for page, times in result["pages"].items():
+        print(
+            "%-8s view %8.2f ms, render %8.2f ms"
+            % (page, 1000 * times["view"], 1000 * times["render"])
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Generate a synthetic git repository with git fast-import. The same
+arguments always give the same history.
+
+    python benchmarks/repo.py <path> [commits] [authors] [files] [tags] [merges]
+"""
+
+import os
+import random
+import subprocess
+import sys
+
+TIMEZONES = ("+0000", "+0100", "+0200", "-0500", "-0800", "+0530", "+0900")
+EXTENSIONS = ("py", "c", "h", "js", "md", "txt", "")
+START_STAMP = 1000000000  # 2001-09-09
+MAX_LINES = 60  # lines of a file, to keep the fast-import stream small
+
+
+def get_authors(count):
+    """Return count (name, mail, timezone) tuples."""
+    return [
+        (
+            "Author %d" % i,
+            "author%d@example%d.com" % (i, i % 13),
+            TIMEZONES[i % len(TIMEZONES)],
+        )
+        for i in range(count)
+    ]
+
+
+def get_paths(count):
+    """Return count file paths, spread over nested directories."""
+    paths = []
+    for i in range(count):
+        ext = EXTENSIONS[i % len(EXTENSIONS)]
+        name = "file%d.%s" % (i, ext) if ext else "FILE%d" % i
+        paths.append("dir%d/sub%d/%s" % (i % 17, i % 5, name))
+    return paths
+
+
+def write_blob(out, content):
+    data = content.encode("utf-8")
+    out.write(b"data %d\n" % len(data))
+    out.write(data)
+    out.write(b"\n")
+
+
+def write_commit(out, ref, mark, author, stamp, message, parents, changes):
+    """Write a commit, with its parents given as marks and changes as (path, content)."""
+    name, mail, timezone = author
+    out.write(b"commit %s\nmark :%d\n" % (ref.encode(), mark))
+    ident = ("%s <%s> %d %s\n" % (name, mail, stamp, timezone)).encode("utf-8")
+    out.write(b"author " + ident)
+    out.write(b"committer " + ident)
+    write_blob(out, message)
+    if parents:
+        out.write(b"from :%d\n" % parents[0])
+        for parent in parents[1:]:
+            out.write(b"merge :%d\n" % parent)
+    for path, content in changes:
+        out.write(b"M 100644 inline %s\n" % path.encode("utf-8"))
+        write_blob(out, content)
+    out.write(b"\n")
+
+
+def change_file(rng, lines, number):
+    """Delete and insert some lines of a file, given as a list of lines."""
+    for _ in range(min(len(lines), rng.randrange(0, 3))):
+        del lines[rng.randrange(len(lines))]
+    for _ in range(rng.randrange(1, 8)):
+        lines.insert(rng.randrange(len(lines) + 1), "line %d" % number)
+    del lines[MAX_LINES:]
+    return "\n".join(lines) + "\n"
+
+
+def generate(path, commits, authors=100, files=1000, tags=100, merges=0.05, seed=0):
+    """
+    Create a bare repository at path with the given number of commits on
+    its main branch. The authors commit following a Pareto distribution,
+    each commit changes up to three of the files, one in merges of them
+    merges a side branch forked a few commits earlier, and tags are put
+    evenly along the history, every other one annotated.
+    """
+    rng = random.Random(seed)
+    subprocess.run(["git", "init", "-q", "--bare", path], check=True)
+    subprocess.run(
+        ["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=path, check=True
+    )
+    process = subprocess.Popen(
+        ["git", "fast-import", "--quiet", "--done"], stdin=subprocess.PIPE, cwd=path
+    )
+    out = process.stdin
+
+    people = get_authors(authors)
+    paths = get_paths(files)
+    contents = {}  # path -> lines
+    tag_every = max(1, commits // tags) if tags else 0
+    stamp = START_STAMP
+    mainline = []  # marks of the commits on the main branch
+    mark = 0
+    for number in range(1, commits + 1):
+        stamp += rng.randrange(60, 2 * 86400 * 3650 // max(commits, 1) + 120)
+        author = people[int(rng.paretovariate(1.2) - 1) % authors]
+        changes = []
+        for file in rng.sample(paths, min(len(paths), rng.randrange(1, 4))):
+            changes.append(
+                (file, change_file(rng, contents.setdefault(file, []), number))
+            )
+        parents = mainline[-1:]
+        if mainline and rng.random() < merges:
+            # a side branch forked a few commits back, merged with this commit
+            mark += 1
+            fork = mainline[-min(len(mainline), rng.randrange(1, 10))]
+            write_commit(
+                out,
+                "refs/heads/side",
+                mark,
+                people[rng.randrange(authors)],
+                stamp - 60,
+                "side change %d\n" % number,
+                [fork],
+                changes,
+            )
+            parents = parents + [mark]
+        mark += 1
+        write_commit(
+            out,
+            "refs/heads/main",
+            mark,
+            author,
+            stamp,
+            "change %d\n" % number,
+            parents,
+            changes,
+        )
+        mainline.append(mark)
+        if tag_every and number % tag_every == 0:
+            tag = "v%d" % (number // tag_every)
+            if number // tag_every % 2:
+                out.write(b"reset refs/tags/%s\nfrom :%d\n\n" % (tag.encode(), mark))
+            else:
+                out.write(b"tag %s\nfrom :%d\n" % (tag.encode(), mark))
+                out.write(
+                    b"tagger %s <%s> %d +0000\n"
+                    % (author[0].encode("utf-8"), author[1].encode("utf-8"), stamp)
+                )
+                write_blob(out, "release %s\n" % tag)
+    out.write(b"done\n")
+    out.close()
+    if process.wait() != 0:
+        raise RuntimeError("git fast-import failed for %s" % path)
+    subprocess.run(["git", "update-ref", "-d", "refs/heads/side"], cwd=path)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        return 1
+    path = sys.argv[1]
+    args = [int(el) for el in sys.argv[2:6]]
+    if len(sys.argv) > 6:
+        args.append(float(sys.argv[6]))
+    if os.path.exists(path):
+        print("%s already exists" % path)
+        return 1
+    generate(path, *args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
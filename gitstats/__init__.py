@@ -3,8 +3,6 @@
 import platform
 import time
 
-exectime_internal = 0.0
-exectime_external = 0.0
 time_start = time.time()
 
 GNUPLOT_COMMON = "set terminal png transparent size 640,240\nset size 1.0,1.0\n"
@@ -15,14 +13,19 @@ DEFAULT_CONFIG = {
     "max_domains": 10,  # Maximum number of domains to display in "Domains by Commits".
     "max_ext_length": 10,  # Maximum length of file extensions shown in statistics.
     "style": "gitstats.css",  # CSS stylesheet for the generated report.
+    "templates": "",  # Directory of HTML templates overriding the built-in ones of the report (empty = built-in only).
     "max_authors": 20,  # Maximum number of authors to list in "Authors".
     "authors_top": 5,  # Number of top authors to highlight.
+    "authors_page_size": 500,  # Number of authors per page of the list of all authors, shown when there are more than max_authors.
     "commit_begin": "",  # Start of commit range (empty = include all commits).
     "commit_end": "HEAD",  # End of commit range (default: HEAD).
     "linear_linestats": 1,  # Enable linear history for line statistics (1 = enabled, 0 = disabled).
     "project_name": "",  # Project name to display (default: repository directory name).
     "processes": 8,  # Number of parallel processes to use when gathering data.
     "start_date": "",  # Starting date for commits, passed as --since to Git (optional).
+    "incremental_files": 0,  # Count files per commit from diffs instead of listing every tree (1 = enabled, 0 = disabled).
+    "chart_backend": "gnuplot",  # Chart renderer: "gnuplot" (PNG images), "svg" (rendered in-process, no gnuplot needed) or "js" (rendered in the browser from one data bundle).
+    "max_chart_points": 1000,  # Maximum number of points of line charts, longer histories are decimated (0 = no limit).
 }
 
 
@@ -44,8 +47,10 @@ def load_config(file_path="gitstats.conf") -> dict:
 
     if os.path.exists(file_path):
         config_parser.read(file_path)
-        _config = {
-            k: int(v) if v.isdigit() else v
-            for k, v in config_parser["gitstats"].items()
-        }
+        _config.update(
+            {
+                k: int(v) if v.isdigit() else v
+                for k, v in config_parser["gitstats"].items()
+            }
+        )
     return _config
@@ -0,0 +1,165 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import datetime
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # optional, update_activity() is used per commit instead
+    np = None  # type: ignore[assignment]
+
+HAVE_NUMPY = np is not None
+
+# date ordinal of 1970-01-01
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def get_local_offsets(stamps):
+    """
+    Return the UTC offsets of the local timezone at the given stamps. They
+    are computed once per day, and per stamp only on the days on which the
+    offset changes.
+    """
+    days, inverse = np.unique(stamps // 86400, return_inverse=True)
+    offsets = np.empty(len(days), dtype=np.int64)
+    changing = []
+    for i, day in enumerate(days.tolist()):
+        offsets[i] = time.localtime(day * 86400).tm_gmtoff
+        if time.localtime(day * 86400 + 86399).tm_gmtoff != offsets[i]:
+            changing.append(i)
+    result = offsets[inverse]
+    for i in changing:
+        for j in np.nonzero(inverse == i)[0].tolist():
+            result[j] = time.localtime(int(stamps[j])).tm_gmtoff
+    return result
+
+
+def count_in_order(keys):
+    """
+    Return the distinct keys and their counts, in the order in which the
+    keys first occur.
+    """
+    values, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first, kind="stable")
+    return values[order].tolist(), counts[order].tolist()
+
+
+def add_to(counts, keys, values):
+    for key, value in zip(keys, values):
+        counts[key] = counts.get(key, 0) + value
+
+
+def update_activity_arrays(data, commits):
+    """
+    Account the commits, (stamp, timezone, author, mail) tuples, to the
+    activity, author and domain statistics of data like
+    DataCollector.update_activity() does one commit at a time, but with
+    the dates and histograms computed over arrays of all commits.
+    """
+    if len(commits) == 0:
+        return
+    stamps = np.fromiter((c[0] for c in commits), dtype=np.int64, count=len(commits))
+    author_ids = {}
+    authors = np.fromiter(
+        (author_ids.setdefault(c[2], len(author_ids)) for c in commits),
+        dtype=np.int64,
+        count=len(commits),
+    )
+    records = [data.authors.add(name) for name in author_ids]
+
+    # local dates, like datetime.fromtimestamp()
+    local = stamps + get_local_offsets(stamps)
+    days = local // 86400
+    hours = (local - days * 86400) // 3600
+    weekdays = (days + 3) % 7  # 1970-01-01 was a Thursday
+    dates = days.astype("datetime64[D]")
+    years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    yeardays = days - dates.astype("datetime64[Y]").astype("datetime64[D]").astype(
+        np.int64
+    )
+    weeks = (yeardays + 7 - weekdays) // 7  # %W, weeks starting on Monday
+
+    first = int(stamps.min())
+    last = int(stamps.max())
+    if last > data.last_commit_stamp:
+        data.last_commit_stamp = last
+    if data.first_commit_stamp == 0 or first < data.first_commit_stamp:
+        data.first_commit_stamp = first
+
+    # activity
+    add_to(data.activity_by_hour_of_day, *count_in_order(hours))
+    data.activity_by_hour_of_day_busiest = max(
+        data.activity_by_hour_of_day_busiest,
+        max(data.activity_by_hour_of_day.values()),
+    )
+    add_to(data.activity_by_day_of_week, *count_in_order(weekdays))
+    keys, counts = count_in_order(weekdays * 24 + hours)
+    for key, count in zip(keys, counts):
+        by_hour = data.activity_by_hour_of_week.setdefault(key // 24, {})
+        by_hour[key % 24] = by_hour.get(key % 24, 0) + count
+        if by_hour[key % 24] > data.activity_by_hour_of_week_busiest:
+            data.activity_by_hour_of_week_busiest = by_hour[key % 24]
+    add_to(data.activity_by_month_of_year, *count_in_order(months))
+    keys, counts = count_in_order(years * 100 + weeks)
+    add_to(
+        data.activity_by_year_week,
+        ["%d-%02d" % (key // 100, key % 100) for key in keys],
+        counts,
+    )
+    data.activity_by_year_week_peak = max(
+        data.activity_by_year_week_peak, max(data.activity_by_year_week.values())
+    )
+
+    # domains
+    for mail, count in Counter(c[3] for c in commits).items():
+        domain = mail.rsplit("@", 1)[1] if mail.find("@") != -1 else "?"
+        info = data.domains.setdefault(domain, {})
+        info["commits"] = info.get("commits", 0) + count
+
+    # authors: first and last commit
+    first_stamps = np.full(len(records), np.iinfo(np.int64).max)
+    last_stamps = np.full(len(records), np.iinfo(np.int64).min)
+    np.minimum.at(first_stamps, authors, stamps)
+    np.maximum.at(last_stamps, authors, stamps)
+    for info, first, last in zip(records, first_stamps.tolist(), last_stamps.tolist()):
+        info.add_commit_stamp(first)
+        info.add_commit_stamp(last)
+
+    # author of the month/year
+    yymms = years * 100 + months
+    keys, counts = count_in_order(yymms * len(records) + authors)
+    for key, count in zip(keys, counts):
+        yymm = "%d-%02d" % (
+            key // len(records) // 100,
+            key // len(records) % 100,
+        )
+        data.author_of_month.add(yymm, records[key % len(records)].id, count)
+        data.commits_by_month[yymm] = data.commits_by_month.get(yymm, 0) + count
+    keys, counts = count_in_order(years * len(records) + authors)
+    for key, count in zip(keys, counts):
+        yy = key // len(records)
+        data.author_of_year.add(yy, records[key % len(records)].id, count)
+        data.commits_by_year[yy] = data.commits_by_year.get(yy, 0) + count
+
+    # active days, of the authors and the project
+    day_names = {}
+    first_day = int(days.min())
+    for key in np.unique((days - first_day) * len(records) + authors).tolist():
+        day = key // len(records) + first_day
+        if day not in day_names:
+            day_names[day] = str(np.datetime64(day, "D"))
+            data.active_days.add(day_names[day])
+        records[key % len(records)].add_active_day(day + EPOCH_ORDINAL)
+    last_index = np.full(len(records), -1)
+    np.maximum.at(last_index, authors, np.arange(len(commits)))
+    for info, last in zip(records, last_index.tolist()):
+        info.last_active_day = day_names[int(days[last])]
+    data.last_active_day = day_names[int(days[-1])]
+
+    # timezone
+    for timezone, count in Counter(c[1] for c in commits).items():
+        data.commits_by_timezone[timezone] = (
+            data.commits_by_timezone.get(timezone, 0) + count
+        )
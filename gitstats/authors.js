@@ -0,0 +1,174 @@
+/*
+Pages through the list of all authors of a gitstats report, which can be
+too long for a single page.
+
+The rows of the authors, most commits first, are written one page per
+file, authors/<n>.js, which calls authors_chunk(), and loaded when a page
+shows them. Sorting and filtering use the index in authors/index.js, which
+calls authors_index() with the values of the sortable columns, and is only
+loaded the first time the list is sorted or filtered.
+*/
+
+var authors = {
+	table: null,
+	version: "",
+	total: 0,
+	page_size: 1,
+	page: 0,
+	order: null,     // the authors shown, by place, null for all in order
+	column: "place",
+	descending: false,
+	filter: "",
+	index: null,
+	on_index: null,  // called when the index is loaded
+	chunks: {},
+	loading: {},
+	showing: null    // the page waiting for its chunks
+};
+
+function authors_init() {
+	var table = document.getElementById("allauthors");
+	if (!table) return;
+	authors.table = table;
+	authors.version = table.getAttribute("data-version");
+	authors.total = parseInt(table.getAttribute("data-total"), 10);
+	authors.page_size = parseInt(table.getAttribute("data-page-size"), 10);
+
+	var headers = table.rows[0].cells;
+	for (var i = 0; i < headers.length; i++) {
+		var column = headers[i].getAttribute("data-column");
+		if (column) {
+			headers[i].onclick = authors_sorter(column);
+		}
+	}
+	document.getElementById("allauthors_filter").oninput = function () {
+		var filter = this.value.toLowerCase();
+		authors_with_index(function () {
+			authors.filter = filter;
+			authors_update();
+		});
+	};
+	document.getElementById("allauthors_previous").onclick = function () {
+		authors_show(authors.page - 1);
+	};
+	document.getElementById("allauthors_next").onclick = function () {
+		authors_show(authors.page + 1);
+	};
+	authors_show(0);
+}
+
+function authors_load(name) {
+	if (authors.loading[name]) return;
+	authors.loading[name] = true;
+	var script = document.createElement("script");
+	script.type = "text/javascript";
+	script.src = "authors/" + name + ".js?v=" + authors.version;
+	document.body.appendChild(script);
+}
+
+function authors_index(index) {
+	authors.index = index;
+	if (authors.on_index) {
+		var callback = authors.on_index;
+		authors.on_index = null;
+		callback();
+	}
+}
+
+function authors_chunk(number, rows) {
+	authors.chunks[number] = rows;
+	if (authors.showing !== null) {
+		authors_show(authors.showing);
+	}
+}
+
+function authors_with_index(callback) {
+	if (authors.index) {
+		callback();
+	} else {
+		authors.on_index = callback;
+		authors_load("index");
+	}
+}
+
+function authors_sorter(column) {
+	return function () {
+		authors_with_index(function () {
+			if (authors.column === column) {
+				authors.descending = !authors.descending;
+			} else {
+				authors.column = column;
+				authors.descending = false;
+			}
+			authors_update();
+		});
+	};
+}
+
+function authors_update() {
+	var index = authors.index;
+	var order = [];
+	for (var i = 0; i < authors.total; i++) {
+		if (!authors.filter || index.name[i].toLowerCase().indexOf(authors.filter) !== -1) {
+			order.push(i);
+		}
+	}
+	if (authors.column !== "place") {
+		var values = index[authors.column];
+		order.sort(function (a, b) {
+			if (values[a] < values[b]) return -1;
+			if (values[a] > values[b]) return 1;
+			return a - b;
+		});
+	}
+	if (authors.descending) {
+		order.reverse();
+	}
+	authors.order = order;
+	authors_show(0);
+}
+
+function authors_count() {
+	return authors.order ? authors.order.length : authors.total;
+}
+
+function authors_show(page) {
+	var pages = Math.max(1, Math.ceil(authors_count() / authors.page_size));
+	page = Math.max(0, Math.min(page, pages - 1));
+
+	// the places of the authors of the page, and the chunks they are in
+	var places = [];
+	var missing = false;
+	var end = Math.min(authors_count(), (page + 1) * authors.page_size);
+	for (var i = page * authors.page_size; i < end; i++) {
+		var place = authors.order ? authors.order[i] : i;
+		var chunk = Math.floor(place / authors.page_size);
+		if (!authors.chunks[chunk]) {
+			missing = true;
+			authors_load(chunk);
+		}
+		places.push(place);
+	}
+	if (missing) {
+		authors.showing = page;
+		return;
+	}
+	authors.showing = null;
+	authors.page = page;
+
+	var table = authors.table;
+	while (table.rows.length > 1) {
+		table.deleteRow(1);
+	}
+	for (var i = 0; i < places.length; i++) {
+		var values = authors.chunks[Math.floor(places[i] / authors.page_size)][places[i] % authors.page_size];
+		var row = table.insertRow(-1);
+		for (var j = 0; j < values.length; j++) {
+			row.insertCell(-1).textContent = values[j];
+		}
+	}
+	document.getElementById("allauthors_page").textContent =
+		"Page " + (page + 1) + " of " + pages + " (" + authors_count() + " authors)";
+}
+
+authors_init();
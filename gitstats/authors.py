@@ -0,0 +1,149 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import datetime
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+class Author:
+    """Statistics of one author, the active days kept as sorted day ordinals."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "commits",
+        "lines_added",
+        "lines_removed",
+        "first_commit_stamp",
+        "last_commit_stamp",
+        "last_active_day",
+        "days",
+        "place_by_commits",
+        "commits_frac",
+        "date_first",
+        "date_last",
+        "timedelta",
+    )
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+        self.commits = 0
+        self.lines_added = 0
+        self.lines_removed = 0
+        self.first_commit_stamp = None
+        self.last_commit_stamp = None
+        self.last_active_day = None
+        self.days = array("l")
+        self.place_by_commits = None
+        self.commits_frac = None
+        self.date_first = None
+        self.date_last = None
+        self.timedelta = None
+
+    def add_commit_stamp(self, stamp):
+        # commits may be in any date order because of cherry-picking and patches
+        if self.first_commit_stamp is None or stamp < self.first_commit_stamp:
+            self.first_commit_stamp = stamp
+        if self.last_commit_stamp is None or stamp > self.last_commit_stamp:
+            self.last_commit_stamp = stamp
+
+    def add_active_day(self, day):
+        """Add a day, given as date ordinal, to the active days."""
+        days = self.days
+        if len(days) == 0 or day > days[-1]:
+            days.append(day)
+        elif day != days[-1]:
+            i = bisect_left(days, day)
+            if i == len(days) or days[i] != day:
+                days.insert(i, day)
+
+    @property
+    def active_days(self):
+        return {datetime.date.fromordinal(day).isoformat() for day in self.days}
+
+    def to_dict(self):
+        """Return the statistics as the dict the authors were formerly kept in."""
+        info = {}
+        for key in (
+            "last_commit_stamp",
+            "first_commit_stamp",
+            "last_active_day",
+            "active_days",
+            "commits",
+            "lines_added",
+            "lines_removed",
+            "place_by_commits",
+            "commits_frac",
+            "date_first",
+            "date_last",
+            "timedelta",
+        ):
+            value = getattr(self, key)
+            if value is not None:
+                info[key] = value
+        return info
+
+
+class AuthorRegistry(Mapping):
+    """Authors by name, each with a small integer id."""
+
+    def __init__(self):
+        self.records = []  # id -> Author
+        self.ids = {}  # name -> id
+
+    def add(self, name):
+        """Return the author of the given name, adding it if needed."""
+        if name not in self.ids:
+            self.ids[name] = len(self.records)
+            self.records.append(Author(len(self.records), name))
+        return self.records[self.ids[name]]
+
+    def get_name(self, id):
+        return self.records[id].name
+
+    def __getitem__(self, name):
+        return self.records[self.ids[name]]
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_dict(self):
+        return {author.name: author.to_dict() for author in self.records}
+
+
+class AuthorCounts(Mapping):
+    """
+    Commits of the authors per period (month or year), period -> author ->
+    commits, with the authors kept by id.
+    """
+
+    def __init__(self, authors):
+        self.authors = authors
+        self.counts = {}  # period -> author id -> commits
+
+    def add(self, period, author_id, count=1):
+        by_author = self.counts.setdefault(period, {})
+        by_author[author_id] = by_author.get(author_id, 0) + count
+
+    def __getitem__(self, period):
+        return {
+            self.authors.get_name(id): count
+            for id, count in self.counts[period].items()
+        }
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def to_dict(self):
+        return {period: self[period] for period in self}
@@ -0,0 +1,214 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import os
+import pickle
+import sqlite3
+import zlib
+from collections.abc import MutableMapping
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# Tables holding plain integers, all others hold pickled values
+INTEGER_TABLES = ("files_in_tree", "lines_in_blob")
+
+# Number of keys looked up per query
+LOOKUP_BATCH_SIZE = 500
+
+
+class CacheTable(MutableMapping):
+    """
+    One table of the cache, mapping object ids (or other string keys) to
+    values. Lookups go to the database, new entries are kept in memory until
+    the cache is saved and then appended in one transaction.
+    """
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+        self.pickled = name not in INTEGER_TABLES
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS "%s" (key TEXT PRIMARY KEY, value)' % name
+        )
+
+    def __getitem__(self, key):
+        if key in self.pending:
+            return self.pending[key]
+        row = self.select(key)
+        if row is None:
+            raise KeyError(key)
+        return self.decode(row[0])
+
+    def __setitem__(self, key, value):
+        self.pending[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.pending.pop(key, None)
+        self.connection.execute('DELETE FROM "%s" WHERE key = ?' % self.name, (key,))
+
+    def __contains__(self, key):
+        return key in self.pending or self.select(key) is not None
+
+    def __iter__(self):
+        for (key,) in self.connection.execute('SELECT key FROM "%s"' % self.name):
+            if key not in self.pending:
+                yield key
+        yield from list(self.pending)
+
+    def __len__(self):
+        stored = self.connection.execute(
+            'SELECT COUNT(*) FROM "%s"' % self.name
+        ).fetchone()[0]
+        return stored + sum(1 for key in self.pending if self.select(key) is None)
+
+    def select(self, key):
+        return self.connection.execute(
+            'SELECT value FROM "%s" WHERE key = ?' % self.name, (key,)
+        ).fetchone()
+
+    def decode(self, value):
+        return pickle.loads(value) if self.pickled else value
+
+    def lookup(self, keys):
+        """
+        Return a dict with the cached values of those of the given keys that
+        are in the table, looked up in batches, and count hits and misses.
+        """
+        keys = list(keys)
+        found = {key: self.pending[key] for key in keys if key in self.pending}
+        missing = list({key for key in keys if key not in found})
+        for i in range(0, len(missing), LOOKUP_BATCH_SIZE):
+            batch = missing[i : i + LOOKUP_BATCH_SIZE]
+            for key, value in self.connection.execute(
+                'SELECT key, value FROM "%s" WHERE key IN (%s)'
+                % (self.name, ", ".join("?" * len(batch))),
+                batch,
+            ):
+                found[key] = self.decode(value)
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def flush(self):
+        """Append the new entries to the database."""
+        if self.pickled:
+            rows = [(k, pickle.dumps(v)) for k, v in self.pending.items()]
+        else:
+            rows = list(self.pending.items())
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO "%s" (key, value) VALUES (?, ?)' % self.name, rows
+        )
+        self.pending = {}
+
+
+class Cache:
+    """
+    Cache of collected data kept in a SQLite database, so entries can be
+    looked up by key and appended without loading or rewriting the whole
+    file. Caches in the former zlib compressed pickle format are migrated
+    when they are opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                header = f.read(len(SQLITE_HEADER))
+            if header != SQLITE_HEADER:
+                self.migrate(path)
+        self.connection = sqlite3.connect(path)
+        self.tables = {}
+        for (name,) in self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ):
+            self.tables[name] = CacheTable(self.connection, name)
+
+    def __contains__(self, name):
+        return name in self.tables
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def __setitem__(self, name, items):
+        self.table(name).update(items)
+
+    def keys(self):
+        return self.tables.keys()
+
+    def table(self, name):
+        """Return the table of the given name, creating it if needed."""
+        if name not in self.tables:
+            self.tables[name] = CacheTable(self.connection, name)
+        return self.tables[name]
+
+    def update(self, tables):
+        for name, items in tables.items():
+            self[name] = items
+
+    def save(self, path=None):
+        """
+        Write the new entries of all tables to the database, and copy it to
+        path if it is not the file the cache was opened from.
+        """
+        for table in self.tables.values():
+            table.flush()
+        self.connection.commit()
+        if path is not None and path != self.path:
+            if os.path.exists(path):
+                os.remove(path)
+            target = sqlite3.connect(path)
+            self.connection.backup(target)
+            target.close()
+
+    def get_new_entries(self):
+        """Return the entries not saved yet and lookup counters of all tables."""
+        return {
+            name: (table.pending, table.hits, table.misses)
+            for name, table in self.tables.items()
+        }
+
+    def add_new_entries(self, entries):
+        """Take over the entries and counters returned by get_new_entries()."""
+        for name, (pending, hits, misses) in entries.items():
+            table = self.table(name)
+            table.update(pending)
+            table.hits += hits
+            table.misses += misses
+
+    def print_stats(self):
+        for name, table in self.tables.items():
+            lookups = table.hits + table.misses
+            if lookups > 0:
+                print(
+                    "Cache %s: %d hits, %d misses (%.2f%% hit rate)"
+                    % (name, table.hits, table.misses, (100.0 * table.hits) / lookups)
+                )
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def migrate(path):
+        """Convert a zlib compressed (or plain) pickle cache to SQLite."""
+        print("Migrating cache to SQLite...")
+        with open(path, "rb") as f:
+            try:
+                data = pickle.loads(zlib.decompress(f.read()))
+            except (zlib.error, pickle.UnpicklingError):
+                # non-compressed caches
+                f.seek(0)
+                data = pickle.load(f)
+        tempfile = path + ".tmp"
+        if os.path.exists(tempfile):
+            os.remove(tempfile)
+        cache = Cache(tempfile)
+        for name, items in data.items():
+            cache[name] = {str(key): value for key, value in items.items()}
+        cache.save()
+        cache.close()
+        os.replace(tempfile, path)
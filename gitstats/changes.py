@@ -0,0 +1,190 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+from array import array
+from collections.abc import Mapping
+
+
+class ChangesByDate(Mapping):
+    """
+    Line changes along the history used for the line statistics, stamp ->
+    {files, ins, del, lines}, stored as parallel arrays with one row per
+    commit. A later row of a stamp replaces the earlier ones, like an
+    assignment to a dict.
+    """
+
+    KEYS = ("files", "ins", "del", "lines")
+
+    def __init__(self):
+        self.stamps = array("q")
+        self.columns = tuple(array("q") for _ in self.KEYS)
+        self.index = None
+
+    def add(self, stamp, files, inserted, deleted, lines):
+        self.stamps.append(stamp)
+        for column, value in zip(self.columns, (files, inserted, deleted, lines)):
+            column.append(value)
+        self.index = None
+
+    def tail(self, start):
+        """Return the rows added from row start on."""
+        result = ChangesByDate()
+        result.stamps = self.stamps[start:]
+        result.columns = tuple(column[start:] for column in self.columns)
+        return result
+
+    def extend(self, other):
+        """Append the rows of other, as if they were added one by one."""
+        self.stamps.extend(other.stamps)
+        for column, values in zip(self.columns, other.columns):
+            column.extend(values)
+        self.index = None
+
+    def get_rows(self):
+        """Return the latest row of each stamp, ordered by stamp."""
+        if self.index is None:
+            latest = {}
+            for row, stamp in enumerate(self.stamps):
+                latest[stamp] = row
+            self.index = dict(sorted(latest.items()))
+        return self.index
+
+    def get_lines(self):
+        """Yield (stamp, lines) of each stamp, ordered by stamp."""
+        lines = self.columns[3]
+        for stamp, row in self.get_rows().items():
+            yield stamp, lines[row]
+
+    def __getitem__(self, stamp):
+        row = self.get_rows()[stamp]
+        return {key: column[row] for key, column in zip(self.KEYS, self.columns)}
+
+    def __iter__(self):
+        return iter(self.get_rows())
+
+    def __len__(self):
+        return len(self.get_rows())
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["index"] = None
+        return state
+
+    def to_dict(self):
+        return {stamp: self[stamp] for stamp in self}
+
+    @classmethod
+    def from_dict(cls, changes):
+        result = cls()
+        for stamp in sorted(changes):
+            result.add(stamp, *(changes[stamp][key] for key in cls.KEYS))
+        return result
+
+
+class ChangesByDateByAuthor(Mapping):
+    """
+    Running totals of the authors along the history, stamp -> author ->
+    {lines_added, commits}, defined for a stamp and author only if the
+    author committed at that stamp. Stored as parallel arrays with one row
+    per commit and the author names interned in a table.
+    """
+
+    def __init__(self):
+        self.authors = []  # id -> name
+        self.author_ids = {}  # name -> id
+        self.stamps = array("q")
+        self.author = array("q")
+        self.lines_added = array("q")
+        self.commits = array("q")
+        self.index = None
+
+    def get_author_id(self, name):
+        if name not in self.author_ids:
+            self.author_ids[name] = len(self.authors)
+            self.authors.append(name)
+        return self.author_ids[name]
+
+    def add(self, stamp, author, lines_added, commits):
+        self.stamps.append(stamp)
+        self.author.append(self.get_author_id(author))
+        self.lines_added.append(lines_added)
+        self.commits.append(commits)
+        self.index = None
+
+    def tail(self, start):
+        """Return the rows added from row start on."""
+        result = ChangesByDateByAuthor()
+        result.authors = list(self.authors)
+        result.author_ids = dict(self.author_ids)
+        result.stamps = self.stamps[start:]
+        result.author = self.author[start:]
+        result.lines_added = self.lines_added[start:]
+        result.commits = self.commits[start:]
+        return result
+
+    def extend(self, other):
+        """Append the rows of other, as if they were added one by one."""
+        authors = [self.get_author_id(name) for name in other.authors]
+        self.stamps.extend(other.stamps)
+        self.author.extend(authors[el] for el in other.author)
+        self.lines_added.extend(other.lines_added)
+        self.commits.extend(other.commits)
+        self.index = None
+
+    def get_rows(self):
+        """
+        Return the rows ordered by stamp, and by the order they were added
+        in for the same stamp.
+        """
+        stamps = self.stamps
+        if all(stamps[i] <= stamps[i + 1] for i in range(len(stamps) - 1)):
+            return range(len(stamps))
+        return sorted(range(len(stamps)), key=stamps.__getitem__)
+
+    def iter_rows(self):
+        """Yield (stamp, author id, lines_added, commits), ordered by stamp."""
+        for row in self.get_rows():
+            yield (
+                self.stamps[row],
+                self.author[row],
+                self.lines_added[row],
+                self.commits[row],
+            )
+
+    def get_index(self):
+        """Return stamp -> rows of the stamp, ordered by stamp."""
+        if self.index is None:
+            self.index = {}
+            for row in self.get_rows():
+                self.index.setdefault(self.stamps[row], []).append(row)
+        return self.index
+
+    def __getitem__(self, stamp):
+        changes = {}
+        for row in self.get_index()[stamp]:
+            changes[self.authors[self.author[row]]] = {
+                "lines_added": self.lines_added[row],
+                "commits": self.commits[row],
+            }
+        return changes
+
+    def __iter__(self):
+        return iter(self.get_index())
+
+    def __len__(self):
+        return len(self.get_index())
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["index"] = None
+        return state
+
+    def to_dict(self):
+        return {stamp: self[stamp] for stamp in self}
+
+    @classmethod
+    def from_dict(cls, changes):
+        result = cls()
+        for stamp in sorted(changes):
+            for author, values in changes[stamp].items():
+                result.add(stamp, author, values["lines_added"], values["commits"])
+        return result
@@ -0,0 +1,253 @@
+/*
+Renders the charts of a gitstats report in the browser from the data
+bundle in charts_data.js, which calls gitstats_charts() with the charts.
+
+Each chart is drawn into the <canvas class="chart" data-chart="name">
+element of the page, hovering over it shows the values at that point.
+*/
+
+var CHART_COLORS = ["#9400d3", "#009e73", "#56b4e9", "#e69f00", "#f0e442",
+	"#0072b2", "#e51e10", "#000000"];
+
+function gitstats_charts(bundle) {
+	var charts = {};
+	for (var i = 0; i < bundle.charts.length; i++) {
+		charts[bundle.charts[i].name] = bundle.charts[i];
+	}
+	var render = function () {
+		var canvases = document.querySelectorAll("canvas.chart");
+		for (var i = 0; i < canvases.length; i++) {
+			var chart = charts[canvases[i].getAttribute("data-chart")];
+			if (chart) {
+				chart_init(canvases[i], chart);
+			}
+		}
+	};
+	if (document.readyState === "loading") {
+		document.addEventListener("DOMContentLoaded", render);
+	} else {
+		render();
+	}
+}
+
+function chart_escape(text) {
+	return String(text).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+}
+
+function chart_tick_step(span, count) {
+	if (span <= 0) return 1;
+	var step = Math.pow(10, Math.floor(Math.log(span / count) / Math.LN10));
+	var factors = [1, 2, 5, 10];
+	for (var i = 0; i < factors.length; i++) {
+		if (span / (step * factors[i]) <= count) return step * factors[i];
+	}
+	return step * 10;
+}
+
+function chart_format_x(chart, x) {
+	if (chart.xdata === "number") return String(x);
+	var date = new Date(x * 1000);
+	var utc = chart.xdata !== "stamp";
+	var pad = function (n) { return n < 10 ? "0" + n : String(n); };
+	var parts = {
+		"%Y": utc ? date.getUTCFullYear() : date.getFullYear(),
+		"%m": pad((utc ? date.getUTCMonth() : date.getMonth()) + 1),
+		"%d": pad(utc ? date.getUTCDate() : date.getDate())
+	};
+	return chart.xformat.replace(/%[Ymd]/g, function (s) { return parts[s]; });
+}
+
+function chart_layout(chart) {
+	var layout = {
+		width: chart.size[0], height: chart.size[1],
+		left: 70, right: 20, top: 10, bottom: chart.rotate_xtics ? 70 : 30
+	};
+	layout.plot_width = layout.width - layout.left - layout.right;
+	layout.plot_height = layout.height - layout.top - layout.bottom;
+
+	var xs = chart.x;
+	var ymax = 0;
+	for (var s = 0; s < chart.y.length; s++) {
+		for (var i = 0; i < chart.y[s].length; i++) {
+			ymax = Math.max(ymax, chart.y[s][i]);
+		}
+	}
+	var xmin = 0, xmax = 1;
+	if (chart.xrange) {
+		xmin = chart.xrange[0];
+		xmax = chart.xrange[1];
+	} else if (xs.length > 0) {
+		xmin = xs[0];
+		xmax = xs[xs.length - 1];
+		if (chart.style === "boxes") {
+			var gap = Infinity;
+			for (var i = 1; i < xs.length; i++) {
+				if (xs[i] > xs[i - 1]) gap = Math.min(gap, xs[i] - xs[i - 1]);
+			}
+			var padding = gap === Infinity ? 0.5 : gap / 2;
+			xmin -= padding;
+			xmax += padding;
+		}
+	}
+	if (xmax <= xmin) {
+		xmin -= 1;
+		xmax += 1;
+	}
+	layout.ystep = chart_tick_step(ymax, 5);
+	layout.ytop = Math.max(layout.ystep, Math.ceil(ymax / layout.ystep) * layout.ystep);
+	layout.px = function (x) {
+		return layout.left + (x - xmin) * layout.plot_width / (xmax - xmin);
+	};
+	layout.py = function (y) {
+		return layout.top + layout.plot_height - y * layout.plot_height / layout.ytop;
+	};
+
+	layout.ticks = [];
+	if (chart.labels) {
+		for (var i = 0; i < xs.length; i++) layout.ticks.push([xs[i], chart.labels[i]]);
+	} else if (chart.xdata === "number") {
+		var step = Math.max(1, chart_tick_step(xmax - xmin, 12));
+		for (var x = Math.ceil(xmin / step) * step; x <= xmax; x += step) {
+			layout.ticks.push([x, String(x)]);
+		}
+	} else {
+		for (var i = 0; i < 6; i++) {
+			var x = xmin + i * (xmax - xmin) / 5;
+			layout.ticks.push([x, chart_format_x(chart, Math.round(x))]);
+		}
+	}
+	return layout;
+}
+
+function chart_draw(ctx, chart, layout) {
+	ctx.clearRect(0, 0, layout.width, layout.height);
+	ctx.font = "11px sans-serif";
+	ctx.lineWidth = 1;
+
+	// y axis with grid
+	ctx.textAlign = "right";
+	ctx.setLineDash([2, 2]);
+	ctx.strokeStyle = "#ccc";
+	ctx.fillStyle = "#000";
+	for (var value = 0; value <= layout.ytop; value += layout.ystep) {
+		var y = Math.round(layout.py(value)) + 0.5;
+		ctx.beginPath();
+		ctx.moveTo(layout.left, y);
+		ctx.lineTo(layout.left + layout.plot_width, y);
+		ctx.stroke();
+		ctx.fillText(String(value), layout.left - 5, y + 4);
+	}
+	ctx.setLineDash([]);
+	ctx.save();
+	ctx.translate(15, layout.top + layout.plot_height / 2);
+	ctx.rotate(-Math.PI / 2);
+	ctx.textAlign = "center";
+	ctx.fillText(chart.ylabel, 0, 0);
+	ctx.restore();
+
+	// x axis ticks
+	for (var i = 0; i < layout.ticks.length; i++) {
+		var tx = layout.px(layout.ticks[i][0]), ty = layout.top + layout.plot_height + 14;
+		ctx.save();
+		ctx.translate(tx, ty);
+		if (chart.rotate_xtics) {
+			ctx.rotate(-Math.PI / 4);
+			ctx.textAlign = "right";
+		} else {
+			ctx.textAlign = "center";
+		}
+		ctx.fillText(layout.ticks[i][1], 0, 0);
+		ctx.restore();
+	}
+
+	// series
+	for (var s = 0; s < chart.y.length; s++) {
+		var values = chart.y[s];
+		ctx.fillStyle = ctx.strokeStyle = CHART_COLORS[s % CHART_COLORS.length];
+		if (chart.style === "boxes") {
+			var gap = Infinity;
+			for (var i = 1; i < chart.x.length; i++) {
+				var d = layout.px(chart.x[i]) - layout.px(chart.x[i - 1]);
+				if (d > 0) gap = Math.min(gap, d);
+			}
+			var bar = gap === Infinity ? layout.px(1) - layout.px(0.5) : gap / 2;
+			for (var i = 0; i < values.length; i++) {
+				var x = layout.px(chart.x[i]), y = layout.py(values[i]);
+				ctx.fillRect(x - bar / 2, y, bar, layout.top + layout.plot_height - y);
+			}
+		} else if (values.length > 0) {
+			ctx.beginPath();
+			ctx.moveTo(layout.px(chart.x[0]), layout.py(values[0]));
+			for (var i = 1; i < values.length; i++) {
+				if (chart.style === "steps") {
+					ctx.lineTo(layout.px(chart.x[i]), layout.py(values[i - 1]));
+				}
+				ctx.lineTo(layout.px(chart.x[i]), layout.py(values[i]));
+			}
+			ctx.stroke();
+		}
+	}
+
+	// legend
+	if (chart.titles) {
+		for (var s = 0; s < chart.titles.length; s++) {
+			var y = layout.top + 14 + s * 14;
+			ctx.strokeStyle = CHART_COLORS[s % CHART_COLORS.length];
+			ctx.lineWidth = 2;
+			ctx.beginPath();
+			ctx.moveTo(layout.left + 10, y - 4);
+			ctx.lineTo(layout.left + 30, y - 4);
+			ctx.stroke();
+			ctx.fillStyle = "#000";
+			ctx.textAlign = "left";
+			ctx.fillText(chart.titles[s], layout.left + 35, y);
+		}
+		ctx.lineWidth = 1;
+	}
+
+	ctx.strokeStyle = "#000";
+	ctx.strokeRect(layout.left + 0.5, layout.top + 0.5, layout.plot_width, layout.plot_height);
+}
+
+function chart_init(canvas, chart) {
+	var layout = chart_layout(chart);
+	var ratio = window.devicePixelRatio || 1;
+	canvas.width = layout.width * ratio;
+	canvas.height = layout.height * ratio;
+	canvas.style.width = layout.width + "px";
+	canvas.style.height = layout.height + "px";
+	var ctx = canvas.getContext("2d");
+	ctx.scale(ratio, ratio);
+	chart_draw(ctx, chart, layout);
+
+	var tip = document.createElement("div");
+	tip.className = "charttip";
+	tip.style.cssText = "position: absolute; display: none; pointer-events: none; " +
+		"background: #fff; border: 1px solid #888; padding: 2px 4px; font-size: 11px";
+	document.body.appendChild(tip);
+
+	canvas.addEventListener("mousemove", function (event) {
+		var rect = canvas.getBoundingClientRect();
+		var mx = event.clientX - rect.left;
+		if (chart.x.length === 0) return;
+		// nearest point by x, the x values are sorted
+		var lo = 0, hi = chart.x.length - 1;
+		while (lo < hi) {
+			var mid = (lo + hi) >> 1;
+			if (layout.px(chart.x[mid]) < mx) lo = mid + 1; else hi = mid;
+		}
+		if (lo > 0 && mx - layout.px(chart.x[lo - 1]) < layout.px(chart.x[lo]) - mx) lo--;
+		var text = chart_escape(chart.labels ? chart.labels[lo] : chart_format_x(chart, chart.x[lo]));
+		for (var s = 0; s < chart.y.length; s++) {
+			text += "<br>" + chart_escape(chart.titles ? chart.titles[s] : chart.ylabel) +
+				": " + chart.y[s][lo];
+		}
+		tip.innerHTML = text;
+		tip.style.left = (event.pageX + 12) + "px";
+		tip.style.top = (event.pageY + 12) + "px";
+		tip.style.display = "block";
+	});
+	canvas.addEventListener("mouseleave", function () {
+		tip.style.display = "none";
+	});
+}
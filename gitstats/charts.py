@@ -0,0 +1,715 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import calendar
+import datetime
+import glob
+import hashlib
+import html
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+from gitstats import load_config, GNUPLOT_COMMON, WEEKDAYS
+from gitstats.timing import bind, phase
+from gitstats.utils import run_gnuplot
+
+conf = load_config()
+
+
+class Chart:
+    """
+    Data and layout of one chart of the report, independent of how it is
+    rendered. Rows are tuples of column values; x is the column plotted on
+    the x axis, y the columns plotted as series, and label the column
+    holding the names of the bars, if any.
+    """
+
+    def __init__(
+        self,
+        name,
+        ylabel,
+        style,
+        rows,
+        x=0,
+        y=(1,),
+        label=None,
+        xdata="number",
+        xformat=None,
+        xrange=None,
+        titles=None,
+        size=(640, 240),
+        rotate_xtics=False,
+    ):
+        self.name = name
+        self.ylabel = ylabel
+        self.style = style  # "boxes", "lines" or "steps"
+        self.rows = rows
+        self.x = x
+        self.y = y
+        self.label = label
+        self.xdata = xdata  # "number", "stamp" or a strptime format
+        self.xformat = xformat
+        self.xrange = xrange
+        self.titles = titles
+        self.size = size
+        self.rotate_xtics = rotate_xtics
+
+    def get_x(self, value):
+        """Return the position of an x value as a number."""
+        if self.xdata in ("number", "stamp"):
+            return float(value)
+        return float(
+            calendar.timegm(datetime.datetime.strptime(value, self.xdata).timetuple())
+        )
+
+    def get_columns(self):
+        """Return the chart as a dict of columns, with numeric x values."""
+        xs = [row[self.x] for row in self.rows]
+        return {
+            "name": self.name,
+            "ylabel": self.ylabel,
+            "style": self.style,
+            "xdata": self.xdata,
+            "xformat": self.xformat,
+            "xrange": self.xrange,
+            "titles": self.titles,
+            "size": self.size,
+            "rotate_xtics": self.rotate_xtics,
+            "x": xs if self.xdata == "number" else [int(self.get_x(x)) for x in xs],
+            "y": [[row[column] for row in self.rows] for column in self.y],
+            "labels": (
+                None if self.label is None else [row[self.label] for row in self.rows]
+            ),
+        }
+
+
+def get_charts(data):
+    """Return the charts of the report for the collected data."""
+    charts = []
+
+    hour_of_day = data.get_activity_by_hour_of_day()
+    charts.append(
+        Chart(
+            "hour_of_day",
+            "Commits",
+            "boxes",
+            [(i + 1, hour_of_day.get(i, 0)) for i in range(0, 24)],
+            xrange=(0.5, 24.5),
+        )
+    )
+
+    day_of_week = data.get_activity_by_day_of_week()
+    charts.append(
+        Chart(
+            "day_of_week",
+            "Commits",
+            "boxes",
+            [(d + 1, WEEKDAYS[d], day_of_week.get(d, 0)) for d in range(0, 7)],
+            y=(2,),
+            label=1,
+            xrange=(0.5, 7.5),
+        )
+    )
+
+    domains_by_commits = sorted(
+        data.domains, key=lambda d: (data.domains[d]["commits"], d), reverse=True
+    )
+    charts.append(
+        Chart(
+            "domains",
+            "Commits",
+            "boxes",
+            [
+                (domain, n + 1, data.get_domain_info(domain)["commits"])
+                for n, domain in enumerate(
+                    domains_by_commits[: int(conf["max_domains"])]
+                )
+            ],
+            x=1,
+            y=(2,),
+            label=0,
+            rotate_xtics=True,
+        )
+    )
+
+    charts.append(
+        Chart(
+            "month_of_year",
+            "Commits",
+            "boxes",
+            [(mm, data.activity_by_month_of_year.get(mm, 0)) for mm in range(1, 13)],
+            xrange=(0.5, 12.5),
+        )
+    )
+
+    charts.append(
+        Chart(
+            "commits_by_year_month",
+            "Commits",
+            "boxes",
+            [
+                (yymm, data.commits_by_month[yymm])
+                for yymm in sorted(data.commits_by_month.keys())
+            ],
+            xdata="%Y-%m",
+            xformat="%Y-%m",
+            rotate_xtics=True,
+        )
+    )
+
+    charts.append(
+        Chart(
+            "commits_by_year",
+            "Commits",
+            "boxes",
+            [(yy, data.commits_by_year[yy]) for yy in sorted(data.commits_by_year)],
+            rotate_xtics=True,
+        )
+    )
+
+    # use set to get rid of duplicate/unnecessary entries
+    files_by_date = set()
+    for stamp in data.files_by_stamp.keys():
+        files_by_date.add(
+            (
+                datetime.datetime.fromtimestamp(stamp).strftime("%Y-%m-%d"),
+                data.files_by_stamp[stamp],
+            )
+        )
+    charts.append(
+        Chart(
+            "files_by_date",
+            "Files",
+            "steps",
+            sorted(files_by_date),
+            xdata="%Y-%m-%d",
+            xformat="%Y-%m-%d",
+            rotate_xtics=True,
+        )
+    )
+
+    charts.append(
+        Chart(
+            "lines_of_code",
+            "Lines",
+            "lines",
+            list(data.changes_by_date.get_lines()),
+            xdata="stamp",
+            xformat="%Y-%m-%d",
+            rotate_xtics=True,
+        )
+    )
+
+    # changes_by_date_by_author has a row only where an author commits, so
+    # carry the last values of each author forward
+    authors_to_plot = data.get_authors(int(conf["max_authors"]))
+    changes = data.changes_by_date_by_author
+    columns = {
+        changes.author_ids[author]: i
+        for i, author in enumerate(authors_to_plot)
+        if author in changes.author_ids
+    }
+    lines_by_authors = [0] * len(authors_to_plot)
+    commits_by_authors = [0] * len(authors_to_plot)
+    lines_rows = []
+    commits_rows = []
+    last = None
+    for stamp, author, lines_added, commits in changes.iter_rows():
+        if last is not None and stamp != last:
+            lines_rows.append((last,) + tuple(lines_by_authors))
+            commits_rows.append((last,) + tuple(commits_by_authors))
+        last = stamp
+        if author in columns:
+            lines_by_authors[columns[author]] = lines_added
+            commits_by_authors[columns[author]] = commits
+    if last is not None:
+        lines_rows.append((last,) + tuple(lines_by_authors))
+        commits_rows.append((last,) + tuple(commits_by_authors))
+    for name, ylabel, rows in (
+        ("lines_of_code_by_author", "Lines", lines_rows),
+        ("commits_by_author", "Commits", commits_rows),
+    ):
+        charts.append(
+            Chart(
+                name,
+                ylabel,
+                "lines",
+                rows,
+                y=tuple(range(1, len(authors_to_plot) + 1)),
+                xdata="stamp",
+                xformat="%Y-%m-%d",
+                titles=authors_to_plot,
+                size=(640, 480),
+                rotate_xtics=True,
+            )
+        )
+
+    return charts
+
+
+def get_decimated_indexes(xs, columns, count):
+    """
+    Return the indexes of at most count points which keep the shape of the
+    series, picked by Largest-Triangle-Three-Buckets: the first and last
+    points, and from each bucket of the points in between the one forming
+    the largest triangle with the point picked before and the average of
+    the next bucket. Series sharing the x values are picked together, by
+    the sum of their triangle areas.
+    """
+    n = len(xs)
+    if count < 3 or n <= count:
+        return list(range(n))
+    every = (n - 2) / (count - 2)
+    indexes = [0]
+    a = 0
+    for i in range(count - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_end <= end:
+            next_end = n
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_ys = [sum(ys[end:next_end]) / (next_end - end) for ys in columns]
+        ax = xs[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            dx1 = ax - avg_x
+            dx2 = ax - xs[j]
+            area = 0.0
+            for ys, avg_y in zip(columns, avg_ys):
+                ay = ys[a]
+                area += abs(dx1 * (ys[j] - ay) - dx2 * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        indexes.append(best)
+        a = best
+    indexes.append(n - 1)
+    return indexes
+
+
+def decimate_charts(charts, count):
+    """
+    Reduce the line and step charts to at most count points each, so the
+    size of the chart data and the rendering time do not grow with the
+    length of the history. Bar charts are left as they are.
+    """
+    if count <= 0:
+        return charts
+    for chart in charts:
+        if chart.style == "boxes" or len(chart.rows) <= count:
+            continue
+        xs = [chart.get_x(row[chart.x]) for row in chart.rows]
+        columns = [[row[column] for row in chart.rows] for column in chart.y]
+        chart.rows = [chart.rows[i] for i in get_decimated_indexes(xs, columns, count)]
+    return charts
+
+
+# Settings and plot commands of the gnuplot scripts. Charts with several
+# series get one plot per series appended.
+GNUPLOT_SCRIPTS = {
+    "hour_of_day": """
+set output 'hour_of_day.png'
+unset key
+set xrange [0.5:24.5]
+set yrange [0:]
+set xtics 4
+set grid y
+set ylabel "Commits"
+plot 'hour_of_day.dat' using 1:2:(0.5) w boxes fs solid
+""",
+    "day_of_week": """
+set output 'day_of_week.png'
+unset key
+set xrange [0.5:7.5]
+set yrange [0:]
+set xtics 1
+set grid y
+set ylabel "Commits"
+plot 'day_of_week.dat' using 1:3:(0.5):xtic(2) w boxes fs solid
+""",
+    "domains": """
+set output 'domains.png'
+unset key
+unset xtics
+set yrange [0:]
+set grid y
+set ylabel "Commits"
+plot 'domains.dat' using 2:3:(0.5) with boxes fs solid, '' using 2:3:1 with labels rotate by 45 offset 0,1
+""",
+    "month_of_year": """
+set output 'month_of_year.png'
+unset key
+set xrange [0.5:12.5]
+set yrange [0:]
+set xtics 1
+set grid y
+set ylabel "Commits"
+plot 'month_of_year.dat' using 1:2:(0.5) w boxes fs solid
+""",
+    "commits_by_year_month": """
+set output 'commits_by_year_month.png'
+unset key
+set yrange [0:]
+set xdata time
+set timefmt "%Y-%m"
+set format x "%Y-%m"
+set xtics rotate
+set bmargin 5
+set grid y
+set ylabel "Commits"
+plot 'commits_by_year_month.dat' using 1:2:(0.5) w boxes fs solid
+""",
+    "commits_by_year": """
+set output 'commits_by_year.png'
+unset key
+set yrange [0:]
+set xtics 1 rotate
+set grid y
+set ylabel "Commits"
+set yrange [0:]
+plot 'commits_by_year.dat' using 1:2:(0.5) w boxes fs solid
+""",
+    "files_by_date": """
+set output 'files_by_date.png'
+unset key
+set yrange [0:]
+set xdata time
+set timefmt "%Y-%m-%d"
+set format x "%Y-%m-%d"
+set grid y
+set ylabel "Files"
+set xtics rotate
+set ytics autofreq
+set bmargin 6
+plot 'files_by_date.dat' using 1:2 w steps
+""",
+    "lines_of_code": """
+set output 'lines_of_code.png'
+unset key
+set yrange [0:]
+set xdata time
+set timefmt "%s"
+set format x "%Y-%m-%d"
+set grid y
+set ylabel "Lines"
+set xtics rotate
+set bmargin 6
+plot 'lines_of_code.dat' using 1:2 w lines
+""",
+    "lines_of_code_by_author": """
+set terminal png transparent size 640,480
+set output 'lines_of_code_by_author.png'
+set key left top
+set yrange [0:]
+set xdata time
+set timefmt "%s"
+set format x "%Y-%m-%d"
+set grid y
+set ylabel "Lines"
+set xtics rotate
+set bmargin 6
+plot """,
+    "commits_by_author": """
+set terminal png transparent size 640,480
+set output 'commits_by_author.png'
+set key left top
+set yrange [0:]
+set xdata time
+set timefmt "%s"
+set format x "%Y-%m-%d"
+set grid y
+set ylabel "Commits"
+set xtics rotate
+set bmargin 6
+plot """,
+}
+
+
+class ChartBackend:
+    """Renders the charts of the report into the output directory."""
+
+    extension: Optional[str] = None
+
+    def render(self, charts, path):
+        pass
+
+    def get_header_html(self):
+        """Return the HTML needed in the head of pages showing charts."""
+        return ""
+
+    def get_html(self, name, alt):
+        """Return the HTML showing the chart of the given name."""
+        return '<img src="%s.%s" alt="%s">' % (name, self.extension, alt)
+
+
+class GnuplotBackend(ChartBackend):
+    """Writes data files and gnuplot scripts and renders them to PNG images."""
+
+    extension = "png"
+
+    def render(self, charts, path):
+        with phase("dat files"):
+            for chart in charts:
+                self.write_data(chart, path)
+                self.write_script(chart, path)
+        with phase("gnuplot"):
+            self.run_gnuplot(path)
+
+    def write_data(self, chart, path):
+        with open(path + "/%s.dat" % chart.name, "w") as f:
+            for row in chart.rows:
+                f.write(" ".join(str(value) for value in row) + "\n")
+
+    def write_script(self, chart, path):
+        with open(path + "/%s.plot" % chart.name, "w") as f:
+            f.write(GNUPLOT_COMMON)
+            f.write(GNUPLOT_SCRIPTS[chart.name])
+            if chart.titles is not None:
+                plots = []
+                for column, title in zip(chart.y, chart.titles):
+                    title = title.replace('"', '\\"').replace("`", "")
+                    plots.append(
+                        """'%s.dat' using 1:%d title "%s" w lines"""
+                        % (chart.name, column + 1, title)
+                    )
+                f.write(", ".join(plots))
+                f.write("\n")
+
+    def run_gnuplot(self, path):
+        """
+        Render all plot scripts with concurrent gnuplot processes, and check
+        that each graph was written
+        """
+        files = sorted(glob.glob(path + "/*.plot"))
+        with ThreadPoolExecutor(max_workers=int(conf["processes"])) as executor:
+            results = list(executor.map(bind(partial(run_gnuplot, cwd=path)), files))
+
+        failed = []
+        for f, (returncode, output) in zip(files, results):
+            graph = os.path.splitext(f)[0] + ".png"
+            if len(output) > 0:
+                print(output)
+            if returncode != 0:
+                failed.append("%s (gnuplot exited with %d)" % (f, returncode))
+            elif not os.path.exists(graph) or os.path.getsize(graph) == 0:
+                failed.append("%s (%s was not written)" % (f, graph))
+        for error in failed:
+            print("Warning: failed to render %s" % error)
+
+
+SVG_COLORS = (
+    "#9400d3",
+    "#009e73",
+    "#56b4e9",
+    "#e69f00",
+    "#f0e442",
+    "#0072b2",
+    "#e51e10",
+    "#000000",
+)
+
+
+def get_tick_step(span, count):
+    """Return a round step dividing span into at most about count ticks."""
+    if span <= 0:
+        return 1
+    step = 10 ** math.floor(math.log10(span / count))
+    for factor in (1, 2, 5, 10):
+        if span / (step * factor) <= count:
+            return step * factor
+    return step * 10
+
+
+class SvgBackend(ChartBackend):
+    """Renders the charts to SVG images in-process, without gnuplot."""
+
+    extension = "svg"
+
+    def render(self, charts, path):
+        for chart in charts:
+            with open(path + "/%s.svg" % chart.name, "w", encoding="utf-8") as f:
+                f.write(render_svg(chart))
+
+
+class JavaScriptBackend(ChartBackend):
+    """
+    Writes the data of all charts into one bundle, charts_data.js, which
+    charts.js renders in the browser.
+    """
+
+    def render(self, charts, path):
+        columns = [chart.get_columns() for chart in charts]
+        content = "gitstats_charts(%s);\n" % json.dumps(
+            {"charts": columns}, separators=(",", ":")
+        )
+        # the version in the script URL changes with the data, so browsers
+        # can cache the bundle
+        self.version = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        with open(path + "/charts_data.js", "w", encoding="utf-8") as f:
+            f.write(content)
+        basedir = os.path.dirname(os.path.abspath(__file__))
+        shutil.copyfile(basedir + "/charts.js", path + "/charts.js")
+
+    def get_header_html(self):
+        return (
+            '<script type="text/javascript" src="charts.js"></script>\n'
+            '<script type="text/javascript" src="charts_data.js?v=%s"></script>\n'
+            % self.version
+        )
+
+    def get_html(self, name, alt):
+        return '<canvas class="chart" data-chart="%s" aria-label="%s"></canvas>' % (
+            name,
+            alt,
+        )
+
+
+def render_svg(chart):
+    """Return the SVG document of a chart."""
+    width, height = chart.size
+    left, right, top = 70, 20, 10
+    bottom = 70 if chart.rotate_xtics else 30
+    plot_width = width - left - right
+    plot_height = height - top - bottom
+
+    xs = [chart.get_x(row[chart.x]) for row in chart.rows]
+    ymax = max([row[column] for row in chart.rows for column in chart.y] + [0])
+
+    # x range, with room for the bars at both ends
+    if chart.xrange is not None:
+        xmin, xmax = chart.xrange
+    elif xs:
+        xmin, xmax = min(xs), max(xs)
+        if chart.style == "boxes":
+            gaps = [b - a for a, b in zip(xs, xs[1:]) if b > a]
+            pad = min(gaps) / 2.0 if gaps else 0.5
+            xmin, xmax = xmin - pad, xmax + pad
+    else:
+        xmin, xmax = 0.0, 1.0
+    if xmax <= xmin:
+        xmin, xmax = xmin - 1, xmax + 1
+
+    ystep = get_tick_step(ymax, 5)
+    ytop = max(ystep, math.ceil(ymax / ystep) * ystep)
+
+    def px(value):
+        return left + (value - xmin) * plot_width / (xmax - xmin)
+
+    def py(value):
+        return top + plot_height - value * plot_height / ytop
+
+    out = [
+        '<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" '
+        'viewBox="0 0 %d %d" font-family="sans-serif" font-size="11">'
+        % (width, height, width, height)
+    ]
+
+    # y axis with grid
+    value = 0
+    while value <= ytop:
+        y = py(value)
+        out.append(
+            '<line x1="%d" y1="%.1f" x2="%d" y2="%.1f" stroke="#ccc" '
+            'stroke-dasharray="2,2"/>' % (left, y, left + plot_width, y)
+        )
+        out.append(
+            '<text x="%d" y="%.1f" text-anchor="end">%s</text>'
+            % (left - 5, y + 4, "%g" % value)
+        )
+        value += ystep
+    out.append(
+        '<text transform="translate(15,%d) rotate(-90)" text-anchor="middle">'
+        "%s</text>" % (top + plot_height / 2, html.escape(chart.ylabel))
+    )
+
+    # x axis ticks
+    if chart.label is not None:
+        ticks = [(x, str(row[chart.label])) for x, row in zip(xs, chart.rows)]
+    elif chart.xdata == "number":
+        step = max(1, get_tick_step(xmax - xmin, 12))
+        first = math.ceil(xmin / step) * step
+        ticks = [
+            (first + i * step, "%g" % (first + i * step))
+            for i in range(int((xmax - first) // step) + 1)
+        ]
+    else:
+        ticks = []
+        for i in range(6):
+            x = xmin + i * (xmax - xmin) / 5
+            stamp = time.gmtime(x) if chart.xdata != "stamp" else time.localtime(x)
+            ticks.append((x, time.strftime(chart.xformat, stamp)))
+    for x, text in ticks:
+        tx, ty = px(x), top + plot_height + 14
+        if chart.rotate_xtics:
+            out.append(
+                '<text transform="translate(%.1f,%.1f) rotate(-45)" '
+                'text-anchor="end">%s</text>' % (tx, ty, html.escape(text))
+            )
+        else:
+            out.append(
+                '<text x="%.1f" y="%.1f" text-anchor="middle">%s</text>'
+                % (tx, ty, html.escape(text))
+            )
+
+    # series
+    for n, column in enumerate(chart.y):
+        color = SVG_COLORS[n % len(SVG_COLORS)]
+        points = [(px(x), py(row[column])) for x, row in zip(xs, chart.rows)]
+        if chart.style == "boxes":
+            # half of the space between neighbouring bars
+            gaps = [b[0] - a[0] for a, b in zip(points, points[1:]) if b[0] > a[0]]
+            bar = min(gaps) / 2 if gaps else plot_width / (xmax - xmin) / 2
+            for x, y in points:
+                out.append(
+                    '<rect x="%.1f" y="%.1f" width="%.1f" height="%.1f" fill="%s"/>'
+                    % (x - bar / 2, y, bar, top + plot_height - y, color)
+                )
+        elif points:
+            if chart.style == "steps":
+                coords = [points[0]]
+                for x, y in points[1:]:
+                    coords.append((x, coords[-1][1]))
+                    coords.append((x, y))
+            else:
+                coords = points
+            out.append(
+                '<polyline fill="none" stroke="%s" points="%s"/>'
+                % (color, " ".join("%.1f,%.1f" % point for point in coords))
+            )
+
+    # legend
+    if chart.titles is not None:
+        for n, title in enumerate(chart.titles):
+            y = top + 14 + n * 14
+            out.append(
+                '<line x1="%d" y1="%d" x2="%d" y2="%d" stroke="%s" stroke-width="2"/>'
+                % (left + 10, y - 4, left + 30, y - 4, SVG_COLORS[n % len(SVG_COLORS)])
+            )
+            out.append(
+                '<text x="%d" y="%d">%s</text>' % (left + 35, y, html.escape(title))
+            )
+
+    out.append(
+        '<rect x="%d" y="%d" width="%d" height="%d" fill="none" stroke="#000"/>'
+        % (left, top, plot_width, plot_height)
+    )
+    out.append("</svg>\n")
+    return "\n".join(out)
+
+
+CHART_BACKENDS = {
+    "gnuplot": GnuplotBackend,
+    "svg": SvgBackend,
+    "js": JavaScriptBackend,
+}
+
+
+def get_chart_backend(name):
+    """Return the chart backend of the given name."""
+    return CHART_BACKENDS[name]()
@@ -0,0 +1,253 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from gitstats.activity import np
+
+COLUMNS_MAGIC = b"GITSTATS"
+COLUMNS_VERSION = 1
+
+# name, array type code and dtype of each column of the columnar export
+COLUMNS = (
+    ("stamp", "q", "<i8"),
+    ("author", "i", "<i4"),
+    ("domain", "i", "<i4"),
+    ("timezone", "h", "<i2"),
+    ("files", "q", "<i8"),
+    ("insertions", "q", "<i8"),
+    ("deletions", "q", "<i8"),
+    ("tree_files", "q", "<i8"),
+)
+HASH_SIZE = 20  # bytes of a SHA-1 hash, SHA-256 repositories have 32
+
+
+class Commits:
+    """
+    Facts of each commit, in the order of the history walk: stamp, hash,
+    author, email domain, timezone in minutes east of UTC, the files,
+    insertions and deletions of its shortstat, and the files in its tree
+    (-1 if unknown). Stored as parallel arrays with one row per commit,
+    the authors and domains interned in tables.
+    """
+
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+        self.hashes = bytearray()  # get_hash_size() bytes per commit
+        self.authors = []  # id -> name
+        self.author_ids = {}  # name -> id
+        self.domains = []  # id -> domain
+        self.domain_ids = {}  # domain -> id
+        self.mail_domains = {}  # mail -> domain id
+        self.timezones = {}  # timezone -> minutes east of UTC
+
+    def get_author_id(self, name):
+        if name not in self.author_ids:
+            self.author_ids[name] = len(self.authors)
+            self.authors.append(name)
+        return self.author_ids[name]
+
+    def get_domain_id(self, domain):
+        if domain not in self.domain_ids:
+            self.domain_ids[domain] = len(self.domains)
+            self.domains.append(domain)
+        return self.domain_ids[domain]
+
+    def add(
+        self, stamp, hash, author, mail, timezone, files, inserted, deleted, tree_files
+    ):
+        if author not in self.author_ids:
+            self.get_author_id(author)
+        if mail not in self.mail_domains:
+            domain = mail.rsplit("@", 1)[1] if mail.find("@") != -1 else "?"
+            self.mail_domains[mail] = self.get_domain_id(domain)
+        if timezone not in self.timezones:
+            self.timezones[timezone] = get_timezone_minutes(timezone)
+        columns = self.columns
+        columns["stamp"].append(stamp)
+        columns["author"].append(self.author_ids[author])
+        columns["domain"].append(self.mail_domains[mail])
+        columns["timezone"].append(self.timezones[timezone])
+        columns["files"].append(files)
+        columns["insertions"].append(inserted)
+        columns["deletions"].append(deleted)
+        columns["tree_files"].append(tree_files)
+        self.hashes += bytes.fromhex(hash)
+
+    def extend(self, other):
+        """
+        Append the commits of another table, of another repository. If their
+        hash sizes differ, the shorter hashes are padded with zero bytes.
+        """
+        hashes = other.hashes
+        if len(self) and len(other):
+            size = max(self.get_hash_size(), other.get_hash_size())
+            if self.get_hash_size() != size:
+                self.hashes = bytearray(b"".join(self.get_hashes(size)))
+            if other.get_hash_size() != size:
+                hashes = b"".join(other.get_hashes(size))
+        authors = [self.get_author_id(name) for name in other.authors]
+        domains = [self.get_domain_id(domain) for domain in other.domains]
+        for name, column in other.columns.items():
+            if name == "author":
+                column = array(column.typecode, (authors[el] for el in column))
+            elif name == "domain":
+                column = array(column.typecode, (domains[el] for el in column))
+            self.columns[name].extend(column)
+        self.hashes += hashes
+
+    def tail(self, start):
+        """Return the commits from row start on."""
+        result = Commits()
+        result.columns = {name: column[start:] for name, column in self.columns.items()}
+        result.hashes = self.hashes[start * self.get_hash_size() :]
+        result.authors = list(self.authors)
+        result.author_ids = dict(self.author_ids)
+        result.domains = list(self.domains)
+        result.domain_ids = dict(self.domain_ids)
+        return result
+
+    def get_hash_size(self):
+        """Return the bytes of each hash, of the hash function of the repository."""
+        return len(self.hashes) // len(self) if len(self) else HASH_SIZE
+
+    def get_hashes(self, size=None):
+        """Return the hashes as bytes, padded with zero bytes to size if given."""
+        step = self.get_hash_size()
+        return [
+            bytes(self.hashes[i : i + step]).ljust(size or step, b"\0")
+            for i in range(0, len(self.hashes), step)
+        ]
+
+    def __len__(self):
+        return len(self.columns["stamp"])
+
+    def to_dict(self):
+        """Return name -> values of each column, with the author and domain names."""
+        result = {name: column.tolist() for name, column in self.columns.items()}
+        result["author"] = [self.authors[el] for el in result["author"]]
+        result["domain"] = [self.domains[el] for el in result["domain"]]
+        result["hash"] = [el.hex() for el in self.get_hashes()]
+        return result
+
+
+def get_timezone_minutes(timezone):
+    """Return the minutes east of UTC of a timezone like +0530, 0 if invalid."""
+    try:
+        minutes = int(timezone[1:3]) * 60 + int(timezone[3:5])
+    except (ValueError, IndexError):
+        return 0
+    return -minutes if timezone[0] == "-" else minutes
+
+
+def write_columns(data, f):
+    """
+    Write the commits in the columnar layout, to a binary file:
+
+        "GITSTATS", version (uint32), length of the header (uint32), the
+        header in JSON, then each column at the offset the header gives,
+        aligned to 8 bytes, little endian.
+
+    The header holds the number of rows, the bytes of each hash, the name,
+    numpy dtype, offset and size of each column, and the names of the
+    authors and domains the author and domain columns index. The columns
+    can be memory-mapped, see read_columns().
+    """
+    commits = data.commits
+    hash_size = commits.get_hash_size()
+    layout = [(name, dtype, commits.columns[name]) for name, _, dtype in COLUMNS]
+    # void, as numpy strips the trailing zero bytes of byte strings
+    layout.append(("hash", "|V%d" % hash_size, commits.hashes))
+    sizes = [
+        len(column) * column.itemsize if isinstance(column, array) else len(column)
+        for _, _, column in layout
+    ]
+    header = {
+        "rows": len(commits),
+        "hash_size": hash_size,
+        "columns": [],
+        "authors": commits.authors,
+        "domains": commits.domains,
+    }
+    # the columns follow the header, whose length depends on their offsets
+    start = 0
+    while True:
+        offset = start
+        header["columns"] = []
+        for (name, dtype, _), size in zip(layout, sizes):
+            header["columns"].append(
+                {"name": name, "dtype": dtype, "offset": offset, "size": size}
+            )
+            offset += align(size)
+        encoded = json.dumps(header).encode("utf-8")
+        if align(16 + len(encoded)) <= start:
+            break
+        start = align(16 + len(encoded))
+
+    f.write(COLUMNS_MAGIC + struct.pack("<II", COLUMNS_VERSION, len(encoded)))
+    f.write(encoded)
+    position = 16 + len(encoded)
+    for info, (_, _, column) in zip(header["columns"], layout):
+        f.write(b"\0" * (info["offset"] - position))
+        if isinstance(column, array) and sys.byteorder == "big":
+            column = array(column.typecode, column)
+            column.byteswap()
+        f.write(column)
+        position = info["offset"] + info["size"]
+
+
+def align(size):
+    return (size + 7) // 8 * 8
+
+
+def read_columns(path):
+    """
+    Return the header and name -> column of a file written by
+    write_columns(), memory-mapped: numpy arrays if numpy is installed,
+    otherwise memoryviews, and the hashes as bytes of the hash_size of the
+    header each.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:8] != COLUMNS_MAGIC:
+        raise ValueError("%s is not a gitstats columns file" % path)
+    version, length = struct.unpack("<II", buffer[8:16])
+    if version != COLUMNS_VERSION:
+        raise ValueError("Unsupported columns version %d in %s" % (version, path))
+    header = json.loads(buffer[16 : 16 + length].decode("utf-8"))
+    typecodes = {name: typecode for name, typecode, _ in COLUMNS}
+    columns = {}
+    for info in header["columns"]:
+        name, offset, size = info["name"], info["offset"], info["size"]
+        if np is not None:
+            columns[name] = np.frombuffer(
+                buffer, dtype=info["dtype"], count=header["rows"], offset=offset
+            )
+        elif name == "hash":
+            view = memoryview(buffer)[offset : offset + size]
+            step = header["hash_size"]
+            columns[name] = [bytes(view[i : i + step]) for i in range(0, size, step)]
+        else:
+            # little endian, as read on the platforms gitstats runs on
+            columns[name] = memoryview(buffer)[offset : offset + size].cast(
+                typecodes[name]
+            )
+    return header, columns
+
+
+def write_npz(data, f):
+    """Write the commits to a NumPy .npz file, one array per column."""
+    commits = data.commits
+    arrays = {
+        name: np.frombuffer(commits.columns[name], dtype=typecode).astype(dtype)
+        for name, typecode, dtype in COLUMNS
+    }
+    arrays["hash"] = np.frombuffer(
+        bytes(commits.hashes), dtype="V%d" % commits.get_hash_size()
+    )
+    arrays["authors"] = np.array(commits.authors, dtype=str)
+    arrays["domains"] = np.array(commits.domains, dtype=str)
+    np.savez(f, **arrays)
@@ -0,0 +1,226 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import json
+
+from gitstats.activity import HAVE_NUMPY
+from gitstats.commits import write_columns, write_npz
+from gitstats.utils import get_git_version, get_version
+
+SCHEMA = "gitstats"
+SCHEMA_VERSION = 1
+
+# one encoder for all rows, json.dumps() with arguments creates one per call
+dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+AUTHOR_COLUMNS = (
+    "name",
+    "commits",
+    "lines_added",
+    "lines_removed",
+    "first_commit_stamp",
+    "last_commit_stamp",
+    "active_days",
+    "place_by_commits",
+)
+TAG_COLUMNS = ("name", "hash", "stamp", "date", "commits", "authors")
+FILES_COLUMNS = ("stamp", "files")
+LINES_COLUMNS = ("stamp", "files", "lines_added", "lines_removed", "lines")
+LINES_BY_AUTHOR_COLUMNS = ("stamp", "author", "lines_added", "commits")
+
+
+class Table:
+    """A section of rows with the same columns, the rows produced as written."""
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+
+def get_header(data):
+    return {
+        "schema": SCHEMA,
+        "version": SCHEMA_VERSION,
+        "generator": {
+            "gitstats": get_version(),
+            "git": get_git_version(),
+            "created": int(data.get_stamp_created()),
+        },
+    }
+
+
+def get_sections(data):
+    """
+    Yield (name, value) of the sections of the export of refined data, in
+    the order of the schema, see docs/source/export.rst. Tables are
+    yielded with their rows as generators, so that they are never held in
+    memory as a whole.
+    """
+    yield (
+        "project",
+        {
+            "name": data.project_name,
+            "first_commit_stamp": data.first_commit_stamp,
+            "last_commit_stamp": data.last_commit_stamp,
+            "active_days": len(data.get_active_days()),
+            "commits": data.get_total_commits(),
+            "authors": data.get_total_authors(),
+            "files": data.get_total_files(),
+            "lines": data.get_total_loc(),
+            "lines_added": data.total_lines_added,
+            "lines_removed": data.total_lines_removed,
+            "size": data.get_total_size(),
+        },
+    )
+    yield (
+        "activity",
+        {
+            "hour_of_day": sorted_dict(data.activity_by_hour_of_day),
+            "day_of_week": sorted_dict(data.activity_by_day_of_week),
+            "hour_of_week": {
+                weekday: sorted_dict(hours)
+                for weekday, hours in sorted(data.activity_by_hour_of_week.items())
+            },
+            "month_of_year": sorted_dict(data.activity_by_month_of_year),
+            "year_week": sorted_dict(data.activity_by_year_week),
+            "timezone": {
+                timezone: data.commits_by_timezone[timezone]
+                for timezone in sorted(data.commits_by_timezone, key=int)
+            },
+            "month": get_periods(
+                data.commits_by_month,
+                data.lines_added_by_month,
+                data.lines_removed_by_month,
+            ),
+            "year": get_periods(
+                data.commits_by_year,
+                data.lines_added_by_year,
+                data.lines_removed_by_year,
+            ),
+        },
+    )
+    yield "authors", Table(AUTHOR_COLUMNS, get_author_rows(data))
+    yield (
+        "author_of_month",
+        {month: data.author_of_month[month] for month in sorted(data.author_of_month)},
+    )
+    yield (
+        "author_of_year",
+        {year: data.author_of_year[year] for year in sorted(data.author_of_year)},
+    )
+    yield (
+        "domains",
+        {domain: info["commits"] for domain, info in sorted(data.domains.items())},
+    )
+    yield "extensions", sorted_dict(data.extensions)
+    yield "tags", Table(TAG_COLUMNS, get_tag_rows(data))
+    yield (
+        "files_by_date",
+        Table(FILES_COLUMNS, (list(el) for el in sorted(data.files_by_stamp.items()))),
+    )
+    yield "lines_by_date", Table(LINES_COLUMNS, get_line_rows(data))
+    yield "lines_by_author", Table(LINES_BY_AUTHOR_COLUMNS, get_author_line_rows(data))
+
+
+def sorted_dict(d):
+    return {key: d[key] for key in sorted(d)}
+
+
+def get_periods(commits, lines_added, lines_removed):
+    return {
+        period: {
+            "commits": commits[period],
+            "lines_added": lines_added.get(period, 0),
+            "lines_removed": lines_removed.get(period, 0),
+        }
+        for period in sorted(commits)
+    }
+
+
+def get_author_rows(data):
+    """Yield the rows of the authors, most commits first."""
+    for name in data.get_authors():
+        author = data.authors[name]
+        yield [
+            name,
+            author.commits,
+            author.lines_added,
+            author.lines_removed,
+            author.first_commit_stamp,
+            author.last_commit_stamp,
+            len(author.days),
+            author.place_by_commits,
+        ]
+
+
+def get_tag_rows(data):
+    """Yield the rows of the tags, oldest first."""
+    for name in sorted(data.tags, key=lambda tag: (data.tags[tag]["stamp"], tag)):
+        tag = data.tags[name]
+        yield [
+            name,
+            tag["hash"],
+            tag["stamp"],
+            tag["date"],
+            tag["commits"],
+            tag["authors"],
+        ]
+
+
+def get_line_rows(data):
+    """Yield the line changes of each commit, ordered by stamp."""
+    changes = data.changes_by_date
+    for stamp, row in changes.get_rows().items():
+        yield [stamp] + [column[row] for column in changes.columns]
+
+
+def get_author_line_rows(data):
+    """Yield the running totals of the author of each commit, ordered by stamp."""
+    changes = data.changes_by_date_by_author
+    for stamp, author, lines_added, commits in changes.iter_rows():
+        yield [stamp, changes.authors[author], lines_added, commits]
+
+
+def write_json(data, f):
+    """Write the export as one JSON document, one section and row at a time."""
+    # the header without its closing brace, the sections follow it
+    f.write(dumps(get_header(data))[:-1])
+    for name, value in get_sections(data):
+        f.write(",%s:" % dumps(name))
+        if isinstance(value, Table):
+            f.write('{"columns":%s,"rows":[' % dumps(value.columns))
+            for i, row in enumerate(value.rows):
+                if i > 0:
+                    f.write(",")
+                f.write(dumps(row))
+            f.write("]}")
+        else:
+            f.write(dumps(value))
+    f.write("}\n")
+
+
+def write_ndjson(data, f):
+    """
+    Write the export as newline delimited JSON: the header, then a line
+    per section, except tables, which have a line per row with the columns
+    as keys.
+    """
+    f.write(dumps(get_header(data)))
+    f.write("\n")
+    for name, value in get_sections(data):
+        if isinstance(value, Table):
+            for row in value.rows:
+                record = {"section": name}
+                record.update(zip(value.columns, row))
+                f.write(dumps(record))
+                f.write("\n")
+        else:
+            f.write(dumps({"section": name, "data": value}))
+            f.write("\n")
+
+
+WRITERS = {"json": write_json, "ndjson": write_ndjson, "columns": write_columns}
+if HAVE_NUMPY:
+    WRITERS["npz"] = write_npz
+BINARY_FORMATS = ("columns", "npz")
@@ -4,23 +4,41 @@
 # GPLv2 / GPLv3
 import argparse
 import datetime
+import heapq
 import os
-import pickle
 import re
 import sys
 import time
-import zlib
-from multiprocessing import Pool
-from gitstats import load_config, time_start, exectime_external
-from gitstats.report_creator import HTMLReportCreator, get_keys_sorted_by_value_key
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import groupby
+from operator import itemgetter
+from typing import NamedTuple
+from gitstats import load_config, timing
+from gitstats.activity import HAVE_NUMPY, update_activity_arrays
+from gitstats.authors import AuthorCounts, AuthorRegistry
+from gitstats.cache import Cache
+from gitstats.changes import ChangesByDate, ChangesByDateByAuthor
+from gitstats.commits import Commits
+from gitstats.charts import CHART_BACKENDS
+from gitstats.export import BINARY_FORMATS, WRITERS
+from gitstats.report_creator import HTMLReportCreator
+from gitstats.tags import get_tags
 from gitstats.utils import (
+    MIN_GIT_VERSION,
     get_version,
     get_gnuplot_version,
     get_pipe_output,
+    get_pipe_output_lines,
+    get_chunks,
     get_commit_range,
+    get_git_version,
+    get_git_version_number,
     get_log_range,
-    get_num_of_files_from_rev,
-    get_num_of_lines_in_blob,
+    get_num_of_files_from_deltas,
+    get_num_of_files_from_revs,
+    get_num_of_lines_in_blobs,
+    get_pool_context,
     get_stat_summary_counts,
 )
 
@@ -29,13 +47,62 @@ os.environ["LC_ALL"] = "C"
 
 conf = load_config()
 
+# Bump when the layout of the history state kept in the cache changes
+HISTORY_STATE_VERSION = 5
+
+# Collector attributes derived from the history only, which are kept in the
+# cache so the next run only has to process the revisions added since then
+HISTORY_ATTRIBUTES = (
+    "activity_by_hour_of_day",
+    "activity_by_day_of_week",
+    "activity_by_month_of_year",
+    "activity_by_hour_of_week",
+    "activity_by_hour_of_day_busiest",
+    "activity_by_hour_of_week_busiest",
+    "activity_by_year_week",
+    "activity_by_year_week_peak",
+    "authors",
+    "total_commits",
+    "domains",
+    "author_of_month",
+    "author_of_year",
+    "commits_by_month",
+    "commits_by_year",
+    "lines_added_by_month",
+    "lines_added_by_year",
+    "lines_removed_by_month",
+    "lines_removed_by_year",
+    "first_commit_stamp",
+    "last_commit_stamp",
+    "last_active_day",
+    "active_days",
+    "total_lines",
+    "total_lines_added",
+    "total_lines_removed",
+    "commits_by_timezone",
+)
+
+
+class Revision(NamedTuple):
+    """Statistics of a revision from the history walk."""
+
+    stamp: int
+    tree: str
+    hash: str
+    parents: list
+    author: str
+    files: int  # shortstat, against the first parent for merges
+    inserted: int
+    deleted: int
+    delta: int  # files added minus deleted, with incremental_files only
+
 
 class DataCollector:
     """Manages data collection from a revision control repository."""
 
     def __init__(self):
         self.stamp_created = time.time()
-        self.cache = {}
+        self.cache = Cache(":memory:")
         self.total_authors = 0
         self.activity_by_hour_of_day = {}  # hour -> commits
         self.activity_by_day_of_week = {}  # day -> commits
@@ -46,7 +113,7 @@ class DataCollector:
         self.activity_by_year_week = {}  # yy_wNN -> commits
         self.activity_by_year_week_peak = 0
 
-        self.authors = {}  # name -> {commits, first_commit_stamp, last_commit_stamp, last_active_day, active_days, lines_added, lines_removed}
+        self.authors = AuthorRegistry()  # name -> Author
 
         self.total_commits = 0
         self.total_files = 0
@@ -56,8 +123,8 @@ class DataCollector:
         self.domains = {}  # domain -> commits
 
         # author of the month
-        self.author_of_month = {}  # month -> author -> commits
-        self.author_of_year = {}  # year -> author -> commits
+        self.author_of_month = AuthorCounts(self.authors)  # month -> author -> commits
+        self.author_of_year = AuthorCounts(self.authors)  # year -> author -> commits
         self.commits_by_month = {}  # month -> commits
         self.commits_by_year = {}  # year -> commits
         self.lines_added_by_month = {}  # month -> lines added
@@ -89,7 +156,19 @@ class DataCollector:
         self.extensions = {}  # extension -> files, lines
 
         # line statistics
-        self.changes_by_date = {}  # stamp -> { files, ins, del }
+        # stamp -> { files, ins, del, lines }
+        self.changes_by_date = ChangesByDate()
+        # stamp -> author -> { lines_added, commits }
+        self.changes_by_date_by_author = ChangesByDateByAuthor()
+
+        # facts of each commit, for the columnar export
+        self.commits = Commits()
+
+    def __getstate__(self):
+        # the cache stays with the process that opened it
+        state = dict(self.__dict__)
+        state["cache"] = None
+        return state
 
     ##
     # This should be the main function to extract data from the repository.
@@ -103,17 +182,46 @@ class DataCollector:
     ##
     # Load cacheable data
     def load_cache(self, cachefile):
-        if not os.path.exists(cachefile):
-            return
         print("Loading cache...")
-        f = open(cachefile, "rb")
-        try:
-            self.cache = pickle.loads(zlib.decompress(f.read()))
-        except (zlib.error, pickle.UnpicklingError):  # Specific exceptions
-            # temporary hack to upgrade non-compressed caches
-            f.seek(0)
-            self.cache = pickle.load(f)
-        f.close()
+        self.cache = Cache(cachefile)
+
+    def get_history_state(self):
+        """Return the statistics derived from the history, to be kept between runs."""
+        return {name: getattr(self, name) for name in HISTORY_ATTRIBUTES}
+
+    def set_history_state(self, state):
+        for name in HISTORY_ATTRIBUTES:
+            setattr(self, name, state[name])
+
+    def get_history_positions(self):
+        """Return the number of rows of the per-commit series."""
+        return (
+            len(self.changes_by_date.stamps),
+            len(self.changes_by_date_by_author.stamps),
+            len(self.commits),
+        )
+
+    def get_history_rows(self, positions, files_by_stamp):
+        """
+        Return the rows of the per-commit series added after the positions
+        returned by get_history_positions(), with the files of the stamps
+        collected since then.
+        """
+        return {
+            "files_by_stamp": files_by_stamp,
+            "changes_by_date": self.changes_by_date.tail(positions[0]),
+            "changes_by_date_by_author": self.changes_by_date_by_author.tail(
+                positions[1]
+            ),
+            "commits": self.commits.tail(positions[2]),
+        }
+
+    def add_history_rows(self, rows):
+        """Append rows returned by get_history_rows() to the per-commit series."""
+        self.files_by_stamp.update(rows["files_by_stamp"])
+        self.changes_by_date.extend(rows["changes_by_date"])
+        self.changes_by_date_by_author.extend(rows["changes_by_date_by_author"])
+        self.commits.extend(rows["commits"])
 
     def get_stamp_created(self):
         return self.stamp_created
@@ -121,491 +229,599 @@ class DataCollector:
     # Save cacheable data
     def save_cache(self, cachefile):
         print("Saving cache...")
-        tempfile = cachefile + ".tmp"
-        f = open(tempfile, "wb")
-        # pickle.dump(self.cache, f)
-        data = zlib.compress(pickle.dumps(self.cache))
-        f.write(data)
-        f.close()
-        try:
-            os.remove(cachefile)
-        except OSError:
-            pass
-        os.rename(tempfile, cachefile)
+        self.cache.save(cachefile)
+
+    def merge(self, other):
+        """
+        Add the statistics of a collector that collected another repository.
+        Tags are prefixed with the name of their repository.
+        """
+        self.dir = other.dir
+        self.project_name = other.project_name
+        self.total_authors += other.total_authors
+        for name in (
+            "activity_by_hour_of_day",
+            "activity_by_day_of_week",
+            "activity_by_month_of_year",
+            "activity_by_year_week",
+            "commits_by_month",
+            "commits_by_year",
+            "lines_added_by_month",
+            "lines_added_by_year",
+            "lines_removed_by_month",
+            "lines_removed_by_year",
+            "commits_by_timezone",
+        ):
+            add_counts(getattr(self, name), getattr(other, name))
+        for key, counts in other.activity_by_hour_of_week.items():
+            add_counts(self.activity_by_hour_of_week.setdefault(key, {}), counts)
+        self.activity_by_hour_of_day_busiest = max(
+            self.activity_by_hour_of_day.values(), default=0
+        )
+        self.activity_by_hour_of_week_busiest = max(
+            (max(el.values()) for el in self.activity_by_hour_of_week.values()),
+            default=0,
+        )
+        self.activity_by_year_week_peak = max(
+            self.activity_by_year_week.values(), default=0
+        )
+
+        for info in other.authors.values():
+            ours = self.authors.add(info.name)
+            ours.commits += info.commits
+            ours.lines_added += info.lines_added
+            ours.lines_removed += info.lines_removed
+            if info.first_commit_stamp is not None:
+                ours.add_commit_stamp(info.first_commit_stamp)
+                ours.add_commit_stamp(info.last_commit_stamp)
+                ours.last_active_day = info.last_active_day
+                for day in info.days:
+                    ours.add_active_day(day)
+        for name in ("author_of_month", "author_of_year"):
+            ours = getattr(self, name)
+            theirs = getattr(other, name)
+            for period, counts in theirs.counts.items():
+                for id, count in counts.items():
+                    author = self.authors[other.authors.get_name(id)]
+                    ours.add(period, author.id, count)
+
+        for domain, info in other.domains.items():
+            ours = self.domains.setdefault(domain, {})
+            ours["commits"] = ours.get("commits", 0) + info["commits"]
+        for ext, info in other.extensions.items():
+            ours = self.extensions.setdefault(ext, {"files": 0, "lines": 0})
+            ours["files"] += info["files"]
+            ours["lines"] += info["lines"]
+
+        for name in (
+            "total_commits",
+            "total_files",
+            "total_lines",
+            "total_lines_added",
+            "total_lines_removed",
+            "total_size",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.first_commit_stamp != 0 and (
+            self.first_commit_stamp == 0
+            or other.first_commit_stamp < self.first_commit_stamp
+        ):
+            self.first_commit_stamp = other.first_commit_stamp
+        self.last_commit_stamp = max(self.last_commit_stamp, other.last_commit_stamp)
+        self.last_active_day = other.last_active_day
+        self.active_days |= other.active_days
+
+        self.commits.extend(other.commits)
+
+        repository = os.path.basename(os.path.abspath(other.dir))
+        for tag, info in other.tags.items():
+            self.tags["%s/%s" % (repository, tag)] = info
+
+        # series of running totals: at each stamp, sum up the latest value
+        # of each repository
+        self.files_by_stamp = merge_series(
+            self.files_by_stamp, other.files_by_stamp, lambda value: value
+        )
+        ours_by_date = self.changes_by_date.to_dict()
+        other_by_date = other.changes_by_date.to_dict()
+        changes_by_date = merge_series(
+            ours_by_date, other_by_date, lambda value: value["lines"]
+        )
+        for stamp, lines in changes_by_date.items():
+            changes = other_by_date.get(stamp) or ours_by_date[stamp]
+            changes_by_date[stamp] = dict(changes, lines=lines)
+        self.changes_by_date = ChangesByDate.from_dict(changes_by_date)
+
+        self.changes_by_date_by_author = merge_author_series(
+            self.changes_by_date_by_author, other.changes_by_date_by_author
+        )
 
 
 class GitDataCollector(DataCollector):
     def collect(self, dir):
         DataCollector.collect(self, dir)
 
-        self.total_authors += int(
-            get_pipe_output(["git shortlog -s %s" % get_log_range(), "wc -l"])
-        )
+        with timing.phase("authors"):
+            self.total_authors += int(
+                get_pipe_output(
+                    ["git shortlog -s %s" % get_log_range(), "wc -l"], cwd=self.dir
+                )
+            )
         # self.total_lines = int(getoutput('git-ls-files -z |xargs -0 cat |wc -l'))
 
-        # tags
-        lines = get_pipe_output(["git show-ref --tags"]).split("\n")
-        for line in lines:
-            if len(line) == 0:
-                continue
-            (hash, tag) = line.split(" ")
-
-            tag = tag.replace("refs/tags/", "")
-            output = get_pipe_output(
-                ['git log "%s" --pretty=format:"%%at %%aN" -n 1' % hash]
-            )
-            if len(output) > 0:
-                parts = output.split(" ")
-                stamp = 0
-                try:
-                    stamp = int(parts[0])
-                except ValueError:
-                    stamp = 0
-                self.tags[tag] = {
-                    "stamp": stamp,
-                    "hash": hash,
-                    "date": datetime.datetime.fromtimestamp(stamp).strftime("%Y-%m-%d"),
-                    "commits": 0,
-                    "authors": {},
-                }
-
-        # collect info on tags, starting from latest
-        tags_sorted_by_date_desc = [
-            el[1]
-            for el in reversed(
-                sorted([(el[1]["date"], el[0]) for el in list(self.tags.items())])
-            )
-        ]
-        prev = None
-        for tag in reversed(tags_sorted_by_date_desc):
-            cmd = 'git shortlog -s "%s"' % tag
-            if prev is not None:
-                cmd += ' "^%s"' % prev
-            output = get_pipe_output([cmd])
-            if len(output) == 0:
-                continue
-            prev = tag
-            for line in output.split("\n"):
-                parts = re.split(r"\s+", line, 2)
-                commits = int(parts[1])
-                author = parts[2]
-                self.tags[tag]["commits"] += commits
-                self.tags[tag]["authors"][author] = commits
-
-        # Collect revision statistics
-        # Outputs "<stamp> <date> <time> <timezone> <author> '<' <mail> '>'"
-        lines = get_pipe_output(
-            [
-                'git rev-list --pretty=format:"%%at %%ai %%aN <%%aE>" %s'
-                % get_log_range("HEAD"),
-                "grep -v ^commit",
-            ]
-        ).split("\n")
-        for line in lines:
-            parts = line.split(" ", 4)
-            author = ""
-            try:
-                stamp = int(parts[0])
-            except ValueError:
-                stamp = 0
-            timezone = parts[3]
-            author, mail = parts[4].split("<", 1)
-            author = author.rstrip()
-            mail = mail.rstrip(">")
-            domain = "?"
-            if mail.find("@") != -1:
-                domain = mail.rsplit("@", 1)[1]
-            date = datetime.datetime.fromtimestamp(float(stamp))
-
-            # First and last commit stamp (may be in any order because of cherry-picking and patches)
-            if stamp > self.last_commit_stamp:
-                self.last_commit_stamp = stamp
-            if self.first_commit_stamp == 0 or stamp < self.first_commit_stamp:
-                self.first_commit_stamp = stamp
-
-            # activity
-            # hour
-            hour = date.hour
-            self.activity_by_hour_of_day[hour] = (
-                self.activity_by_hour_of_day.get(hour, 0) + 1
+        # tags, with the commits since the previous tag
+        with timing.phase("tags"):
+            self.tags.update(get_tags(cwd=self.dir))
+
+        with timing.phase("shortstat walk"):
+            # Reuse the history statistics of the previous run if the history was
+            # only extended since then, and walk the revisions added since only.
+            # They belong to this repository alone, so only a collector that has
+            # not collected anything yet can take them over.
+            log_range = get_log_range("HEAD")
+            history_key = self.get_history_key()
+            head = get_pipe_output(
+                ['git rev-parse "%s"' % get_commit_range("HEAD", end_only=True)],
+                cwd=self.dir,
             )
-            # most active hour?
+            fresh = self.total_commits == 0
+            state = None
+            chunks = {}
+            if fresh:
+                state = self.cache.table("history").get(history_key)
+            if state is not None:
+                chunks = self.cache.table("history_rows").lookup(state["rows"])
             if (
-                self.activity_by_hour_of_day[hour]
-                > self.activity_by_hour_of_day_busiest
+                state is not None
+                and len(chunks) == len(state["rows"])
+                and self.is_history_extended(state["tip"], head)
             ):
-                self.activity_by_hour_of_day_busiest = self.activity_by_hour_of_day[
-                    hour
+                print("Reusing statistics up to %s" % state["tip"])
+                self.set_history_state(state["attributes"])
+                for key in state["rows"]:
+                    self.add_history_rows(chunks[key])
+                log_range += ' "^%s"' % state["tip"]
+            else:
+                state = None
+                self.changes_by_date = ChangesByDate()
+                self.changes_by_date_by_author = ChangesByDateByAuthor()
+                self.commits = Commits()
+            positions = self.get_history_positions()
+
+            # Collect revision statistics in a single pass over the history,
+            # streamed from the oldest revision on.
+            # Outputs for each revision a header line
+            # "\0<stamp> <date> <time> <timezone>\0<author>\0<mail>\0<tree> <hash> <parents>"
+            # followed by its shortstat (and raw diff when counting files
+            # incrementally). Merges are diffed against their first parent.
+            extra = ""
+            if int(conf["incremental_files"]):
+                extra = "--raw -r --no-renames --no-abbrev"
+            lines = get_pipe_output_lines(
+                [
+                    "git log --shortstat --date-order --reverse --root "
+                    "--diff-merges=first-parent %s "
+                    '--pretty=format:"%%x00%%at %%ai%%x00%%aN%%x00%%aE%%x00%%T %%H %%P" %s'
+                    % (extra, log_range)
+                ],
+                cwd=self.dir,
+                check=True,
+            )
+            revisions = []  # Revision, oldest first
+            commits = []  # (stamp, timezone, author, mail)
+            revision = (
+                None  # (stamp, tree, hash, parents, author) of the current revision
+            )
+            files = 0
+            inserted = 0
+            deleted = 0
+            delta = 0
+            for line in lines:
+                if len(line) == 0:
+                    continue
+
+                # <stamp> <date> <time> <timezone> <author> <mail> <tree> <hash> <parents>
+                if line[0] == "\0":
+                    if revision is not None:
+                        revisions.append(
+                            Revision(*revision, files, inserted, deleted, delta)
+                        )
+                    revision = None
+                    files, inserted, deleted, delta = 0, 0, 0, 0
+                    try:
+                        (date, author, mail, refs) = line[1:].split("\0")
+                        parts = date.split(" ")
+                        (stamp, timezone) = (int(parts[0]), parts[3])
+                        refs = refs.split()
+                        revision = (stamp, refs[0], refs[1], refs[2:], author)
+                        commits.append((stamp, timezone, author, mail))
+                    except (ValueError, IndexError):
+                        print('Warning: unexpected line "%s"' % line)
+                # :<mode> <mode> <blob> <blob> <status>\t<path>
+                elif line[0] == ":":
+                    status = line.split("\t", 1)[0][-1]
+                    if status == "A":
+                        delta += 1
+                    elif status == "D":
+                        delta -= 1
+                else:
+                    numbers = get_stat_summary_counts(line)
+
+                    if len(numbers) == 3:
+                        (files, inserted, deleted) = [int(el) for el in numbers]
+                    else:
+                        print('Warning: failed to handle line "%s"' % line)
+                        (files, inserted, deleted) = (0, 0, 0)
+            if revision is not None:
+                revisions.append(Revision(*revision, files, inserted, deleted, delta))
+            self.total_commits += len(revisions)
+        with timing.phase("activity"):
+            self.update_activities(commits)
+
+        with timing.phase("tree counts"):
+            tree_files = {}  # tree -> files
+            files_by_stamp = {}  # stamp -> files, of the revisions of this run
+            if int(conf["incremental_files"]):
+                # running file count from the diff of each commit against its first parent
+                time_rev_count = [
+                    get_num_of_files_from_deltas(
+                        [
+                            (rev.stamp, rev.tree, rev.hash, rev.parents[:1], rev.delta)
+                            for rev in revisions
+                        ],
+                        cwd=self.dir,
+                    )
                 ]
+            else:
+                revs_to_read = []
+                time_rev_count = []
+                # Look up revs in cache and take info from cache if found
+                # If not append rev to list of rev to read from repo
+                cached = self.cache.table("files_in_tree").lookup(
+                    rev.tree for rev in revisions
+                )
+                tree_files.update(cached)
+                for rev in revisions:
+                    if rev.tree in cached:
+                        files_by_stamp[rev.stamp] = cached[rev.tree]
+                    else:
+                        revs_to_read.append((rev.stamp, rev.tree))
+
+                # Read revisions from repo, each worker streams its chunk of trees
+                # through a single git process
+                pool = get_pool_context().Pool(processes=conf["processes"])
+                time_rev_count = timing.map_counted(
+                    pool,
+                    partial(get_num_of_files_from_revs, cwd=self.dir),
+                    get_chunks(revs_to_read, conf["processes"]),
+                )
+                pool.terminate()
+                pool.join()
+
+            # Update cache with new revisions and append then to general list
+            files_in_tree = self.cache.table("files_in_tree")
+            for stamp, tree, count in (el for chunk in time_rev_count for el in chunk):
+                files_in_tree[tree] = count
+                tree_files[tree] = count
+                files_by_stamp[stamp] = count
+            self.files_by_stamp.update(files_by_stamp)
+
+            for (stamp, timezone, author, mail), rev in zip(commits, revisions):
+                self.commits.add(
+                    stamp,
+                    rev.hash,
+                    author,
+                    mail,
+                    timezone,
+                    rev.files,
+                    rev.inserted,
+                    rev.deleted,
+                    tree_files.get(rev.tree, -1),
+                )
 
-            # day of week
-            day = date.weekday()
-            self.activity_by_day_of_week[day] = (
-                self.activity_by_day_of_week.get(day, 0) + 1
+        # extensions and size of files
+        with timing.phase("blob lines"):
+            lines = get_pipe_output(
+                ["git ls-tree -r -l -z %s" % get_commit_range("HEAD", end_only=True)],
+                cwd=self.dir,
+            ).split("\000")
+            blobs = []
+            blobs_to_read = []
+            for line in lines:
+                if len(line) == 0:
+                    continue
+                parts = re.split(r"\s+", line, 4)
+                if parts[0] == "160000" and parts[3] == "-":
+                    # skip submodules
+                    continue
+                blob_id = parts[2]
+                size = int(parts[3])
+                fullpath = parts[4]
+
+                self.total_size += size
+                self.total_files += 1
+
+                filename = fullpath.split("/")[-1]  # strip directories
+                if filename.find(".") == -1 or filename.rfind(".") == 0:
+                    continue  # skip files without extension
+                else:
+                    ext = filename[(filename.rfind(".") + 1) :]
+                if len(ext) > conf["max_ext_length"]:
+                    ext = ""
+                if ext not in self.extensions:
+                    self.extensions[ext] = {"files": 0, "lines": 0}
+                self.extensions[ext]["files"] += 1
+                blobs.append((ext, blob_id))
+
+            # try to read needed info from cache, otherwise add ext and blob id
+            # to list of new blob's
+            cached = self.cache.table("lines_in_blob").lookup(el[1] for el in blobs)
+            for ext, blob_id in blobs:
+                if blob_id in cached:
+                    self.extensions[ext]["lines"] += cached[blob_id]
+                else:
+                    blobs_to_read.append((ext, blob_id))
+
+            # Get info about line count for new blob's that wasn't found in cache,
+            # each worker streams its chunk of blobs through a single git process
+            pool = get_pool_context().Pool(processes=conf["processes"])
+            ext_blob_linecount = timing.map_counted(
+                pool,
+                partial(get_num_of_lines_in_blobs, cwd=self.dir),
+                get_chunks(blobs_to_read, conf["processes"]),
             )
+            pool.terminate()
+            pool.join()
 
-            # domain stats
-            if domain not in self.domains:
-                self.domains[domain] = {}
-            # commits
-            self.domains[domain]["commits"] = self.domains[domain].get("commits", 0) + 1
-
-            # hour of week
-            if day not in self.activity_by_hour_of_week:
-                self.activity_by_hour_of_week[day] = {}
-            self.activity_by_hour_of_week[day][hour] = (
-                self.activity_by_hour_of_week[day].get(hour, 0) + 1
-            )
-            # most active hour?
-            if (
-                self.activity_by_hour_of_week[day][hour]
-                > self.activity_by_hour_of_week_busiest
+            # Update cache and write down info about number of number of lines
+            lines_in_blob = self.cache.table("lines_in_blob")
+            for ext, blob_id, linecount in (
+                el for chunk in ext_blob_linecount for el in chunk
             ):
-                self.activity_by_hour_of_week_busiest = self.activity_by_hour_of_week[
-                    day
-                ][hour]
-
-            # month of year
-            month = date.month
-            self.activity_by_month_of_year[month] = (
-                self.activity_by_month_of_year.get(month, 0) + 1
-            )
+                lines_in_blob[blob_id] = linecount
+                self.extensions[ext]["lines"] += linecount
 
-            # yearly/weekly activity
-            yyw = date.strftime("%Y-%W")
-            self.activity_by_year_week[yyw] = self.activity_by_year_week.get(yyw, 0) + 1
-            if self.activity_by_year_week_peak < self.activity_by_year_week[yyw]:
-                self.activity_by_year_week_peak = self.activity_by_year_week[yyw]
-
-            # author stats
-            if author not in self.authors:
-                self.authors[author] = {}
-            # commits, note again that commits may be in any date order because of cherry-picking and patches
-            if "last_commit_stamp" not in self.authors[author]:
-                self.authors[author]["last_commit_stamp"] = stamp
-            if stamp > self.authors[author]["last_commit_stamp"]:
-                self.authors[author]["last_commit_stamp"] = stamp
-            if "first_commit_stamp" not in self.authors[author]:
-                self.authors[author]["first_commit_stamp"] = stamp
-            if stamp < self.authors[author]["first_commit_stamp"]:
-                self.authors[author]["first_commit_stamp"] = stamp
-
-            # author of the month/year
-            yymm = date.strftime("%Y-%m")
-            if yymm in self.author_of_month:
-                self.author_of_month[yymm][author] = (
-                    self.author_of_month[yymm].get(author, 0) + 1
-                )
+        # line statistics
+        with timing.phase("line statistics"):
+            # computation of lines of code by date is better done
+            # on a linear history: follow the first parents from the tip.
+            if conf["linear_linestats"]:
+                by_hash = {rev.hash: rev for rev in revisions}
+                linear = []
+                rev = revisions[-1] if revisions else None
+                while rev is not None:
+                    linear.append(rev)
+                    rev = by_hash.get(rev.parents[0]) if rev.parents else None
+                linear.reverse()
             else:
-                self.author_of_month[yymm] = {}
-                self.author_of_month[yymm][author] = 1
-            self.commits_by_month[yymm] = self.commits_by_month.get(yymm, 0) + 1
-
-            yy = date.year
-            if yy in self.author_of_year:
-                self.author_of_year[yy][author] = (
-                    self.author_of_year[yy].get(author, 0) + 1
+                # merges have no stats without --first-parent
+                linear = [
+                    rev._replace(files=0, inserted=0, deleted=0)
+                    if len(rev.parents) > 1
+                    else rev
+                    for rev in revisions
+                ]
+            lines_base = 0 if state is None else state["attributes"]["total_lines"]
+            total_lines = lines_base
+            for rev in linear:
+                (stamp, files, inserted, deleted) = (
+                    rev.stamp,
+                    rev.files,
+                    rev.inserted,
+                    rev.deleted,
+                )
+                total_lines += inserted
+                total_lines -= deleted
+                self.total_lines_added += inserted
+                self.total_lines_removed += deleted
+                self.changes_by_date.add(stamp, files, inserted, deleted, total_lines)
+
+                date = datetime.datetime.fromtimestamp(stamp)
+                yymm = date.strftime("%Y-%m")
+                self.lines_added_by_month[yymm] = (
+                    self.lines_added_by_month.get(yymm, 0) + inserted
+                )
+                self.lines_removed_by_month[yymm] = (
+                    self.lines_removed_by_month.get(yymm, 0) + deleted
                 )
-            else:
-                self.author_of_year[yy] = {}
-                self.author_of_year[yy][author] = 1
-            self.commits_by_year[yy] = self.commits_by_year.get(yy, 0) + 1
-
-            # authors: active days
-            yymmdd = date.strftime("%Y-%m-%d")
-            if "last_active_day" not in self.authors[author]:
-                self.authors[author]["last_active_day"] = yymmdd
-                self.authors[author]["active_days"] = set([yymmdd])
-            elif yymmdd != self.authors[author]["last_active_day"]:
-                self.authors[author]["last_active_day"] = yymmdd
-                self.authors[author]["active_days"].add(yymmdd)
-
-            # project: active days
-            if yymmdd != self.last_active_day:
-                self.last_active_day = yymmdd
-                self.active_days.add(yymmdd)
-
-            # timezone
-            self.commits_by_timezone[timezone] = (
-                self.commits_by_timezone.get(timezone, 0) + 1
-            )
 
-        # outputs "<stamp> <files>" for each revision
-        revlines = (
-            get_pipe_output(
-                [
-                    'git rev-list --pretty=format:"%%at %%T" %s'
-                    % get_log_range("HEAD"),
-                    "grep -v ^commit",
-                ]
-            )
-            .strip()
-            .split("\n")
+                yy = date.year
+                self.lines_added_by_year[yy] = (
+                    self.lines_added_by_year.get(yy, 0) + inserted
+                )
+                self.lines_removed_by_year[yy] = (
+                    self.lines_removed_by_year.get(yy, 0) + deleted
+                )
+            self.total_lines += total_lines - lines_base
+
+            # Per-author statistics
+
+            # changes_by_date_by_author is defined for stamp, author only if
+            # author committed at this timestamp.
+
+            # Walk through every commit to know who committed what, not just
+            # through mainline. Merges are not accounted to their author.
+            stamp = 0 if state is None else state["author_stamp"]
+            for rev in revisions:
+                oldstamp = stamp
+                (stamp, author, inserted, deleted) = (
+                    rev.stamp,
+                    rev.author,
+                    rev.inserted,
+                    rev.deleted,
+                )
+                if len(rev.parents) > 1:
+                    inserted, deleted = 0, 0
+                if oldstamp > stamp:
+                    # clock skew, keep old timestamp to avoid having ugly graph
+                    stamp = oldstamp
+                info = self.authors.add(author)
+                info.commits += 1
+                info.lines_added += inserted
+                info.lines_removed += deleted
+                self.changes_by_date_by_author.add(
+                    stamp, author, info.lines_added, info.commits
+                )
+
+        if fresh:
+            # The per-commit series grow with the history, so each run adds
+            # only its rows to the cache, keyed by their position, instead of
+            # rewriting the series in full. A recollection starts a new chain
+            # from position 0, the rows of the former one are left unused.
+            rows = [] if state is None else state["rows"]
+            if len(self.commits) > positions[2]:
+                key = "%s:%d" % (history_key, positions[2])
+                self.cache.table("history_rows")[key] = self.get_history_rows(
+                    positions, files_by_stamp
+                )
+                rows = rows + [key]
+            self.cache.table("history")[history_key] = {
+                "tip": head,
+                "author_stamp": stamp,
+                "attributes": self.get_history_state(),
+                "rows": rows,
+            }
+
+    def get_history_key(self):
+        """Identify the history statistics of this repository and configuration."""
+        return "%d:%s:%s:%s:%s:%s" % (
+            HISTORY_STATE_VERSION,
+            os.path.abspath(self.dir),
+            conf["commit_end"],
+            conf["start_date"],
+            conf["linear_linestats"],
+            "/".join(time.tzname),
         )
-        lines = []
-        revs_to_read = []
-        time_rev_count = []
-        # Look up rev in cache and take info from cache if found
-        # If not append rev to list of rev to read from repo
-        for revline in revlines:
-            time, rev = revline.split(" ")
-            # if cache empty then add time and rev to list of new rev's
-            # otherwise try to read needed info from cache
-            if "files_in_tree" not in list(self.cache.keys()):
-                revs_to_read.append((time, rev))
-                continue
-            if rev in list(self.cache["files_in_tree"].keys()):
-                lines.append("%d %d" % (int(time), self.cache["files_in_tree"][rev]))
-            else:
-                revs_to_read.append((time, rev))
-
-        # Read revisions from repo
-        pool = Pool(processes=conf["processes"])
-        time_rev_count = pool.map(get_num_of_files_from_rev, revs_to_read)
-        pool.terminate()
-        pool.join()
-
-        # Update cache with new revisions and append then to general list
-        for time, rev, count in time_rev_count:
-            if "files_in_tree" not in self.cache:
-                self.cache["files_in_tree"] = {}
-            self.cache["files_in_tree"][rev] = count
-            lines.append("%d %d" % (int(time), count))
-
-        self.total_commits += len(lines)
-        for line in lines:
-            parts = line.split(" ")
-            if len(parts) != 2:
-                continue
-            (stamp, files) = parts[0:2]
-            try:
-                self.files_by_stamp[int(stamp)] = int(files)
-            except ValueError:
-                print('Warning: failed to parse line "%s"' % line)
 
-        # extensions and size of files
-        lines = get_pipe_output(
-            ["git ls-tree -r -l -z %s" % get_commit_range("HEAD", end_only=True)]
-        ).split("\000")
-        blobs_to_read = []
-        for line in lines:
-            if len(line) == 0:
-                continue
-            parts = re.split(r"\s+", line, 4)
-            if parts[0] == "160000" and parts[3] == "-":
-                # skip submodules
-                continue
-            blob_id = parts[2]
-            size = int(parts[3])
-            fullpath = parts[4]
-
-            self.total_size += size
-            self.total_files += 1
-
-            filename = fullpath.split("/")[-1]  # strip directories
-            if filename.find(".") == -1 or filename.rfind(".") == 0:
-                continue  # skip files without extension
-            else:
-                ext = filename[(filename.rfind(".") + 1) :]
-            if len(ext) > conf["max_ext_length"]:
-                ext = ""
-            if ext not in self.extensions:
-                self.extensions[ext] = {"files": 0, "lines": 0}
-            self.extensions[ext]["files"] += 1
-            # if cache empty then add ext and blob id to list of new blob's
-            # otherwise try to read needed info from cache
-            if "lines_in_blob" not in list(self.cache.keys()):
-                blobs_to_read.append((ext, blob_id))
-                continue
-            if blob_id in list(self.cache["lines_in_blob"].keys()):
-                self.extensions[ext]["lines"] += self.cache["lines_in_blob"][blob_id]
-            else:
-                blobs_to_read.append((ext, blob_id))
+    def is_history_extended(self, tip, head):
+        """
+        Whether head was reached from tip by adding revisions only, with tip
+        on the first-parent line of head so the line statistics carry on.
+        """
+        if tip == head:
+            return True
+        output = get_pipe_output(
+            ['git rev-list --first-parent --parents "%s" "^%s"' % (head, tip)],
+            cwd=self.dir,
+        )
+        if len(output) == 0:
+            return False
+        parents = output.split("\n")[-1].split(" ")[1:]
+        return len(parents) > 0 and parents[0] == tip
+
+    def update_activities(self, commits):
+        """
+        Account the commits, (stamp, timezone, author, mail) tuples, to the
+        activity, author and domain statistics.
+        """
+        if HAVE_NUMPY:
+            update_activity_arrays(self, commits)
+        else:
+            for commit in commits:
+                self.update_activity(*commit)
+
+    def update_activity(self, stamp, timezone, author, mail):
+        """Account one commit to the activity, author and domain statistics."""
+        domain = "?"
+        if mail.find("@") != -1:
+            domain = mail.rsplit("@", 1)[1]
+        date = datetime.datetime.fromtimestamp(float(stamp))
+
+        # First and last commit stamp (may be in any order because of cherry-picking and patches)
+        if stamp > self.last_commit_stamp:
+            self.last_commit_stamp = stamp
+        if self.first_commit_stamp == 0 or stamp < self.first_commit_stamp:
+            self.first_commit_stamp = stamp
+
+        # activity
+        # hour
+        hour = date.hour
+        self.activity_by_hour_of_day[hour] = (
+            self.activity_by_hour_of_day.get(hour, 0) + 1
+        )
+        # most active hour?
+        if self.activity_by_hour_of_day[hour] > self.activity_by_hour_of_day_busiest:
+            self.activity_by_hour_of_day_busiest = self.activity_by_hour_of_day[hour]
+
+        # day of week
+        day = date.weekday()
+        self.activity_by_day_of_week[day] = self.activity_by_day_of_week.get(day, 0) + 1
+
+        # domain stats
+        if domain not in self.domains:
+            self.domains[domain] = {}
+        # commits
+        self.domains[domain]["commits"] = self.domains[domain].get("commits", 0) + 1
+
+        # hour of week
+        if day not in self.activity_by_hour_of_week:
+            self.activity_by_hour_of_week[day] = {}
+        self.activity_by_hour_of_week[day][hour] = (
+            self.activity_by_hour_of_week[day].get(hour, 0) + 1
+        )
+        # most active hour?
+        if (
+            self.activity_by_hour_of_week[day][hour]
+            > self.activity_by_hour_of_week_busiest
+        ):
+            self.activity_by_hour_of_week_busiest = self.activity_by_hour_of_week[day][
+                hour
+            ]
 
-        # Get info about line count for new blob's that wasn't found in cache
-        pool = Pool(processes=conf["processes"])
-        ext_blob_linecount = pool.map(get_num_of_lines_in_blob, blobs_to_read)
-        pool.terminate()
-        pool.join()
+        # month of year
+        month = date.month
+        self.activity_by_month_of_year[month] = (
+            self.activity_by_month_of_year.get(month, 0) + 1
+        )
 
-        # Update cache and write down info about number of number of lines
-        for ext, blob_id, linecount in ext_blob_linecount:
-            if "lines_in_blob" not in self.cache:
-                self.cache["lines_in_blob"] = {}
-            self.cache["lines_in_blob"][blob_id] = linecount
-            self.extensions[ext]["lines"] += self.cache["lines_in_blob"][blob_id]
+        # yearly/weekly activity
+        yyw = date.strftime("%Y-%W")
+        self.activity_by_year_week[yyw] = self.activity_by_year_week.get(yyw, 0) + 1
+        if self.activity_by_year_week_peak < self.activity_by_year_week[yyw]:
+            self.activity_by_year_week_peak = self.activity_by_year_week[yyw]
 
-        # line statistics
-        # outputs:
-        #  N files changed, N insertions (+), N deletions(-)
-        # <stamp> <author>
-        self.changes_by_date = {}  # stamp -> { files, ins, del }
-        # computation of lines of code by date is better done
-        # on a linear history.
-        extra = ""
-        if conf["linear_linestats"]:
-            extra = "--first-parent -m"
-        lines = get_pipe_output(
-            [
-                'git log --shortstat %s --pretty=format:"%%at %%aN" %s'
-                % (extra, get_log_range("HEAD"))
-            ]
-        ).split("\n")
-        lines.reverse()
-        files = 0
-        inserted = 0
-        deleted = 0
-        total_lines = 0
-        author = None
-        for line in lines:
-            if len(line) == 0:
-                continue
-
-            # <stamp> <author>
-            if re.search("files? changed", line) is None:
-                pos = line.find(" ")
-                if pos != -1:
-                    try:
-                        (stamp, author) = (int(line[:pos]), line[pos + 1 :])
-                        self.changes_by_date[stamp] = {
-                            "files": files,
-                            "ins": inserted,
-                            "del": deleted,
-                            "lines": total_lines,
-                        }
-
-                        date = datetime.datetime.fromtimestamp(stamp)
-                        yymm = date.strftime("%Y-%m")
-                        self.lines_added_by_month[yymm] = (
-                            self.lines_added_by_month.get(yymm, 0) + inserted
-                        )
-                        self.lines_removed_by_month[yymm] = (
-                            self.lines_removed_by_month.get(yymm, 0) + deleted
-                        )
+        # author stats
+        info = self.authors.add(author)
+        info.add_commit_stamp(stamp)
 
-                        yy = date.year
-                        self.lines_added_by_year[yy] = (
-                            self.lines_added_by_year.get(yy, 0) + inserted
-                        )
-                        self.lines_removed_by_year[yy] = (
-                            self.lines_removed_by_year.get(yy, 0) + deleted
-                        )
+        # author of the month/year
+        yymm = date.strftime("%Y-%m")
+        self.author_of_month.add(yymm, info.id)
+        self.commits_by_month[yymm] = self.commits_by_month.get(yymm, 0) + 1
 
-                        files, inserted, deleted = 0, 0, 0
-                    except ValueError:
-                        print('Warning: unexpected line "%s"' % line)
-                else:
-                    print('Warning: unexpected line "%s"' % line)
-            else:
-                numbers = get_stat_summary_counts(line)
+        yy = date.year
+        self.author_of_year.add(yy, info.id)
+        self.commits_by_year[yy] = self.commits_by_year.get(yy, 0) + 1
 
-                if len(numbers) == 3:
-                    (files, inserted, deleted) = [int(el) for el in numbers]
-                    total_lines += inserted
-                    total_lines -= deleted
-                    self.total_lines_added += inserted
-                    self.total_lines_removed += deleted
+        # authors: active days
+        yymmdd = date.strftime("%Y-%m-%d")
+        info.last_active_day = yymmdd
+        info.add_active_day(date.toordinal())
 
-                else:
-                    print('Warning: failed to handle line "%s"' % line)
-                    (files, inserted, deleted) = (0, 0, 0)
-                # self.changes_by_date[stamp] = { 'files': files, 'ins': inserted, 'del': deleted }
-        self.total_lines += total_lines
-
-        # Per-author statistics
-
-        # defined for stamp, author only if author committed at this timestamp.
-        self.changes_by_date_by_author = {}  # stamp -> author -> lines_added
-
-        # Similar to the above, but never use --first-parent
-        # (we need to walk through every commit to know who
-        # committed what, not just through mainline)
-        lines = get_pipe_output(
-            [
-                'git log --shortstat --date-order --pretty=format:"%%at %%aN" %s'
-                % (get_log_range("HEAD"))
-            ]
-        ).split("\n")
-        lines.reverse()
-        files = 0
-        inserted = 0
-        deleted = 0
-        author = None
-        stamp = 0
-        for line in lines:
-            if len(line) == 0:
-                continue
-
-            # <stamp> <author>
-            if re.search("files? changed", line) is None:
-                pos = line.find(" ")
-                if pos != -1:
-                    try:
-                        oldstamp = stamp
-                        (stamp, author) = (int(line[:pos]), line[pos + 1 :])
-                        if oldstamp > stamp:
-                            # clock skew, keep old timestamp to avoid having ugly graph
-                            stamp = oldstamp
-                        if author not in self.authors:
-                            self.authors[author] = {
-                                "lines_added": 0,
-                                "lines_removed": 0,
-                                "commits": 0,
-                            }
-                        self.authors[author]["commits"] = (
-                            self.authors[author].get("commits", 0) + 1
-                        )
-                        self.authors[author]["lines_added"] = (
-                            self.authors[author].get("lines_added", 0) + inserted
-                        )
-                        self.authors[author]["lines_removed"] = (
-                            self.authors[author].get("lines_removed", 0) + deleted
-                        )
-                        if stamp not in self.changes_by_date_by_author:
-                            self.changes_by_date_by_author[stamp] = {}
-                        if author not in self.changes_by_date_by_author[stamp]:
-                            self.changes_by_date_by_author[stamp][author] = {}
-                        self.changes_by_date_by_author[stamp][author]["lines_added"] = (
-                            self.authors[author]["lines_added"]
-                        )
-                        self.changes_by_date_by_author[stamp][author]["commits"] = (
-                            self.authors[author]["commits"]
-                        )
-                        files, inserted, deleted = 0, 0, 0
-                    except ValueError:
-                        print('Warning: unexpected line "%s"' % line)
-                else:
-                    print('Warning: unexpected line "%s"' % line)
-            else:
-                numbers = get_stat_summary_counts(line)
+        # project: active days
+        if yymmdd != self.last_active_day:
+            self.last_active_day = yymmdd
+            self.active_days.add(yymmdd)
 
-                if len(numbers) == 3:
-                    (files, inserted, deleted) = [int(el) for el in numbers]
-                else:
-                    print('Warning: failed to handle line "%s"' % line)
-                    (files, inserted, deleted) = (0, 0, 0)
+        # timezone
+        self.commits_by_timezone[timezone] = (
+            self.commits_by_timezone.get(timezone, 0) + 1
+        )
 
     def refine(self):
         # authors
-        # name -> {place_by_commits, commits_frac, date_first, date_last, timedelta}
-        self.authors_by_commits = get_keys_sorted_by_value_key(self.authors, "commits")
-        self.authors_by_commits.reverse()  # most first
+        # place_by_commits, commits_frac, date_first, date_last, timedelta
+        self.authors_by_commits = self.get_authors()  # most first
         for i, name in enumerate(self.authors_by_commits):
-            self.authors[name]["place_by_commits"] = i + 1
-
-        for name in list(self.authors.keys()):
-            a = self.authors[name]
-            a["commits_frac"] = (100 * float(a["commits"])) / self.get_total_commits()
-            date_first = datetime.datetime.fromtimestamp(a["first_commit_stamp"])
-            date_last = datetime.datetime.fromtimestamp(a["last_commit_stamp"])
-            delta = date_last - date_first
-            a["date_first"] = date_first.strftime("%Y-%m-%d")
-            a["date_last"] = date_last.strftime("%Y-%m-%d")
-            a["timedelta"] = delta
-            if "lines_added" not in a:
-                a["lines_added"] = 0
-            if "lines_removed" not in a:
-                a["lines_removed"] = 0
+            self.authors[name].place_by_commits = i + 1
+
+        for a in self.authors.values():
+            a.commits_frac = (100 * float(a.commits)) / self.get_total_commits()
+            date_first = datetime.datetime.fromtimestamp(a.first_commit_stamp)
+            date_last = datetime.datetime.fromtimestamp(a.last_commit_stamp)
+            a.date_first = date_first.strftime("%Y-%m-%d")
+            a.date_last = date_last.strftime("%Y-%m-%d")
+            a.timedelta = date_last - date_first
 
     def get_active_days(self):
         return self.active_days
@@ -620,8 +836,12 @@ class GitDataCollector(DataCollector):
         return self.authors[author]
 
     def get_authors(self, limit=None):
-        res = get_keys_sorted_by_value_key(self.authors, "commits")
-        res.reverse()
+        res = [
+            a.name
+            for a in sorted(
+                self.authors.values(), key=lambda a: (a.commits, a.name), reverse=True
+            )
+        ]
         return res[:limit]
 
     def get_commit_delta_days(self):
@@ -640,7 +860,7 @@ class GitDataCollector(DataCollector):
         return datetime.datetime.fromtimestamp(self.last_commit_stamp)
 
     def get_tags(self):
-        lines = get_pipe_output(["git show-ref --tags", "cut -d/ -f3"])
+        lines = get_pipe_output(["git show-ref --tags", "cut -d/ -f3"], cwd=self.dir)
         return lines.split("\n")
 
     def get_tag_date(self, tag):
@@ -662,21 +882,102 @@ class GitDataCollector(DataCollector):
         return self.total_size
 
     def rev_to_date(self, rev):
-        stamp = int(get_pipe_output(['git log --pretty=format:%%at "%s" -n 1' % rev]))
+        stamp = int(
+            get_pipe_output(
+                ['git log --pretty=format:%%at "%s" -n 1' % rev], cwd=self.dir
+            )
+        )
         return datetime.datetime.fromtimestamp(stamp).strftime("%Y-%m-%d")
 
 
-def run(gitpath, outputpath, extra_fmt=None) -> int:
+def add_counts(counts, other):
+    """Add the counts of other to counts, key by key."""
+    for key, value in other.items():
+        counts[key] = counts.get(key, 0) + value
+
+
+def merge_series(a, b, get_value):
+    """
+    Merge two series of running totals (stamp -> value). At every stamp of
+    either series, the result is the sum of the latest value of each.
+    """
+    merged = {}
+    latest_a = 0
+    latest_b = 0
+    for stamp in sorted(set(a) | set(b)):
+        if stamp in a:
+            latest_a = get_value(a[stamp])
+        if stamp in b:
+            latest_b = get_value(b[stamp])
+        merged[stamp] = latest_a + latest_b
+    return merged
+
+
+def merge_author_series(a, b):
+    """
+    Merge two series of running totals of the authors in one pass ordered
+    by stamp. At every stamp at which an author has a row in either, the
+    result is the sum of the latest values of the author in each.
+    """
+    merged = ChangesByDateByAuthor()
+    latest = ({}, {})  # author -> (lines added, commits), in a and in b
+    rows = heapq.merge(
+        (
+            (stamp, 0, a.authors[author], lines_added, commits)
+            for stamp, author, lines_added, commits in a.iter_rows()
+        ),
+        (
+            (stamp, 1, b.authors[author], lines_added, commits)
+            for stamp, author, lines_added, commits in b.iter_rows()
+        ),
+        key=itemgetter(0),
+    )
+    for stamp, group in groupby(rows, key=itemgetter(0)):
+        authors = {}  # the authors of the stamp, in order
+        for _, origin, author, lines_added, commits in group:
+            latest[origin][author] = (lines_added, commits)
+            authors[author] = None
+        for author in authors:
+            ours = latest[0].get(author, (0, 0))
+            theirs = latest[1].get(author, (0, 0))
+            merged.add(stamp, author, ours[0] + theirs[0], ours[1] + theirs[1])
+    return merged
+
+
+def collect_repository(gitpath, cachefile, config):
+    """
+    Collect the data of one repository in a worker. Returns the collector,
+    without its cache, the new cache entries and the timing of the phases.
+    """
+    conf.update(config)
+    print("Git path: %s" % gitpath)
+
+    with timing.use(timing.Timing()):
+        data = GitDataCollector()
+        data.load_cache(cachefile)
+        print("Collecting data...")
+        data.collect(gitpath)
+        cache = data.cache
+        data.cache = None
+        return data, cache.get_new_entries(), timing.get_state()
+
+
+def run(gitpath, outputpath, extra_fmt=None, profile=False) -> int:
     """Run the gitstats program.
     Args:
         gitpath: path to the git repository
         outputpath: path to the output directory
         extra_fmt: extra format
+        profile: write the timing of the phases to profile.json
     Returns:
         0 on success, 1 on failure
     """
-    rundir = os.getcwd()
+    # the phases of each run are timed apart, runs may share the process
+    with timing.use(timing.Timing()):
+        return run_timed(gitpath, outputpath, extra_fmt, profile)
 
+
+def run_timed(gitpath, outputpath, extra_fmt, profile) -> int:
     try:
         os.makedirs(outputpath)
     except OSError:
@@ -686,58 +987,89 @@ def run(gitpath, outputpath, extra_fmt=None) -> int:
         print("FATAL: Output path is not a directory or does not exist")
         return 1
 
-    if get_gnuplot_version is None:
-        print("gnuplot not found")
+    if conf["chart_backend"] not in CHART_BACKENDS:
+        print("FATAL: Unknown chart backend '%s'" % conf["chart_backend"])
+        return 1
+
+    git_version = get_git_version_number()
+    if git_version is None or git_version < MIN_GIT_VERSION:
+        print(
+            "FATAL: git %d.%d or later is required, found: %s"
+            % (MIN_GIT_VERSION + (get_git_version(),))
+        )
         return 1
 
+    if conf["chart_backend"] == "gnuplot" and get_gnuplot_version() is None:
+        print("gnuplot not found, using the svg chart backend")
+        conf["chart_backend"] = "svg"
+
     print("Output path: %s" % outputpath)
     cachefile = os.path.join(outputpath, "gitstats.cache")
 
     data = GitDataCollector()
-    data.load_cache(cachefile)
-
-    for gitpath in gitpath:
-        print("Git path: %s" % gitpath)
-
-        prevdir = os.getcwd()
-        os.chdir(gitpath)
+    with timing.phase("cache"):
+        data.load_cache(cachefile)
 
+    if len(gitpath) == 1:
+        print("Git path: %s" % gitpath[0])
         print("Collecting data...")
-        data.collect(gitpath)
-
-        os.chdir(prevdir)
+        data.collect(gitpath[0])
+    else:
+        # collect each repository in its own worker and merge the results
+        with timing.phase("cache"):
+            data.save_cache(cachefile)
+        with ProcessPoolExecutor(
+            max_workers=min(len(gitpath), conf["processes"]),
+            mp_context=get_pool_context(),
+        ) as executor:
+            for collected, entries, state in executor.map(
+                collect_repository,
+                [os.path.abspath(el) for el in gitpath],
+                [cachefile] * len(gitpath),
+                [conf] * len(gitpath),
+            ):
+                data.merge(collected)
+                data.cache.add_new_entries(entries)
+                timing.merge(state)
 
     print("Refining data...")
-    data.save_cache(cachefile)
-    data.refine()
-
-    os.chdir(rundir)
+    with timing.phase("cache"):
+        data.save_cache(cachefile)
+    with timing.phase("refine"):
+        data.refine()
 
     print("Generating report...")
     html_report = HTMLReportCreator()
     html_report.create(data, outputpath)
 
     if extra_fmt:
-        output_file = os.path.join(gitpath, f"{outputpath}.{extra_fmt}")
-        if extra_fmt == "json":
-            import json
-
-            print(f'Generating JSON file: "{output_file}"')
-            with open(output_file, "w") as file:
-                json.dump(data.__dict__, file, default=str)
+        output_file = os.path.join(gitpath[-1], f"{outputpath}.{extra_fmt}")
+        if extra_fmt in WRITERS:
+            print(f'Generating {extra_fmt.upper()} file: "{output_file}"')
+            with timing.phase("export"):
+                if extra_fmt in BINARY_FORMATS:
+                    with open(output_file, "wb") as f:
+                        WRITERS[extra_fmt](data, f)
+                else:
+                    with open(output_file, "w", encoding="utf-8") as f:
+                        WRITERS[extra_fmt](data, f)
         else:
             print(f"Error: Unsupported format '{extra_fmt}'")
             return 1
 
+    data.cache.print_stats()
     time_end = time.time()
-    exectime_internal = time_end - time_start
+    exectime_internal = time_end - timing.current().start
+    exectime_external = timing.current().total.external
+    if profile:
+        profile_file = os.path.join(outputpath, "profile.json")
+        print(f'Writing timing report: "{profile_file}"')
+        timing.write_report(profile_file)
+    # the workers wait for their commands at the same time, so the time in
+    # external commands may exceed the execution time
     print(
-        "Execution time %.5f secs, %.5f secs (%.2f %%) in external commands)"
-        % (
-            exectime_internal,
-            exectime_external,
-            (100.0 * exectime_external) / exectime_internal,
-        )
+        "Execution time %.5f secs, %.5f secs in external commands, "
+        "summed over the workers" % (exectime_internal, exectime_external)
     )
     if sys.stdin.isatty():
         print("To view the report, run:")
@@ -784,9 +1116,21 @@ def get_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "-f",
         "--format",
-        choices=["json"],
+        choices=sorted(WRITERS),
         required=False,
-        help="The extra format of the output file.",
+        help="The extra format of the output file: json, ndjson with a line per row of the per-commit series, "
+        "or the facts of each commit in columns, in a binary layout (columns) or a NumPy file (npz).",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write the timing of each phase to profile.json in the output directory.",
+    )
+    parser.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="Profile the run with cProfile, written to profile.prof in the output directory.",
     )
 
     return parser
@@ -808,7 +1152,16 @@ def main() -> int:
         except ValueError:
             parser.error("Config must be in the form key=value")
 
-    run(gitpath, outputpath, extra_fmt=extra_fmt)
+    if args.cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.runcall(
+            run, gitpath, outputpath, extra_fmt=extra_fmt, profile=args.profile
+        )
+        profiler.dump_stats(os.path.join(outputpath, "profile.prof"))
+    else:
+        run(gitpath, outputpath, extra_fmt=extra_fmt, profile=args.profile)
 
     return 0
 
@@ -3,21 +3,41 @@
 # Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
 # GPLv2 / GPLv3
 import os
-import glob
 import shutil
 import datetime
+import json
+import pickle
 import time
-from gitstats import load_config, GNUPLOT_COMMON, WEEKDAYS
+from functools import lru_cache, partial
+from string import Template
+from gitstats import load_config, WEEKDAYS
+from gitstats.charts import decimate_charts, get_charts, get_chart_backend
+from gitstats.timing import map_counted, phase
 from gitstats.utils import (
     get_version,
     get_git_version,
     get_gnuplot_version,
-    get_pipe_output,
-    gnuplot_cmd,
+    get_pool_context,
 )
 
 conf = load_config()
 
+PAGES = ("index", "activity", "authors", "files", "lines", "tags")
+WEEKS = 32  # of the weekly activity
+
+# the columns of the list of all authors it is sorted and filtered by
+AUTHOR_INDEX = (
+    "name",
+    "commits",
+    "lines_added",
+    "lines_removed",
+    "first_commit",
+    "last_commit",
+    "active_days",
+)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
 
 class ReportCreator:
     """Creates the actual report based on given data."""
@@ -35,12 +55,16 @@ class HTMLReportCreator(ReportCreator):
     def create(self, data, path):
         ReportCreator.create(self, data, path)
         self.title = data.project_name
+        self.version = get_version()
+        self.chart_backend = get_chart_backend(conf["chart_backend"])
+        load_templates()
 
         # copy static files to the report directory
         basedir = os.path.dirname(os.path.abspath(__file__))
         for file in (
             conf["style"],
             "sortable.js",
+            "authors.js",
             "arrow-up.gif",
             "arrow-down.gif",
             "arrow-none.gif",
@@ -48,545 +72,330 @@ class HTMLReportCreator(ReportCreator):
             src = basedir + "/" + file
             if os.path.exists(src):
                 shutil.copyfile(src, path + "/" + file)
-                break
 
-        self.create_index_html(data, path)
-        self.create_activity_html(data, path)
-        self.create_authors_html(data, path)
-        self.create_files_html(data, path)
-        self.create_lines_html(data, path)
-        self.create_tags_html(data, path)
-        self.create_graphs(path)
+        with phase("charts"):
+            self.create_graphs(path)
+        with phase("html"):
+            self.create_pages(data, path)
+
+    def create_pages(self, data, path):
+        """
+        Create the pages, concurrently in worker processes, as the pages
+        only read the refined data.
+        """
+        names = ["create_%s_html" % page for page in PAGES]
+        processes = min(len(names), int(conf["processes"]), os.cpu_count() or 1)
+        if processes < 2:
+            for name in names:
+                getattr(self, name)(data, path)
+            return
+        # pickled once, not once per page
+        pages = pickle.dumps((self, data, path, conf), pickle.HIGHEST_PROTOCOL)
+        pool = get_pool_context().Pool(processes=processes)
+        try:
+            map_counted(pool, partial(create_page, pages), names)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def write_page(self, path, name, heading, content):
+        """Render a page around its content and write it with a single write."""
+        page = render(
+            "page",
+            title=self.title,
+            style=conf["style"],
+            version=self.version,
+            chart_header=self.chart_backend.get_header_html(),
+            heading=heading,
+            content=content,
+        )
+        with open(path + "/" + name + ".html", "w") as f:
+            f.write(page)
 
     def create_index_html(self, data, path):
-        f = open(path + "/index.html", "w")
-        format = "%Y-%m-%d %H:%M:%S"
-        self.print_header(f)
-
-        f.write("<h1>GitStats - %s</h1>" % data.project_name)
-
-        self.print_nav(f)
+        content = render("index", **self.get_index_view(data))
+        self.write_page(path, "index", "GitStats - %s" % data.project_name, content)
 
-        f.write(html_header(2, "Git Overview"))
-
-        f.write("<table border='1' cellspacing='0' cellpadding='4'>")
-        f.write("<tr><td><b>Project name</b></td><td>%s</td></tr>" % data.project_name)
-        f.write(
-            "<tr><td><b>Generated</b></td><td>%s (in %d seconds)</td></tr>"
-            % (
-                datetime.datetime.now().strftime(format),
-                time.time() - data.get_stamp_created(),
-            )
-        )
-        f.write(
-            '<tr><td><b>Generator</b></td><td><a href="https://github.com/shenxianpeng/gitstats">gitstats</a> %s, %s, %s</td></tr>'
-            % (get_version(), get_git_version(), get_gnuplot_version())
-        )
-        f.write(
-            "<tr><td><b>Report Period</b></td><td>%s to %s</td></tr>"
-            % (
-                data.get_first_commit_date().strftime(format),
-                data.get_last_commit_date().strftime(format),
-            )
-        )
-        f.write(
-            "<tr><td><b>Age</b></td><td>%d days, %d active days (%3.2f%%)</td></tr>"
-            % (
-                data.get_commit_delta_days(),
-                len(data.get_active_days()),
-                (100.0 * len(data.get_active_days()) / data.get_commit_delta_days()),
-            )
-        )
-        f.write(
-            "<tr><td><b>Total Files</b></td><td>%s</td></tr>" % data.get_total_files()
-        )
-        f.write(
-            "<tr><td><b>Total Lines of Code</b></td><td>%s (%d added, %d removed)</td></tr>"
-            % (data.get_total_loc(), data.total_lines_added, data.total_lines_removed)
-        )
-        f.write(
-            "<tr><td><b>Total Commits</b></td><td>%s (average %.1f commits per active day, %.1f per all days)</td></tr>"
-            % (
-                data.get_total_commits(),
-                float(data.get_total_commits()) / len(data.get_active_days()),
-                float(data.get_total_commits()) / data.get_commit_delta_days(),
-            )
-        )
-        f.write(
-            "<tr><td><b>Authors</b></td><td>%s (average %.1f commits per author)</td></tr>"
-            % (
-                data.get_total_authors(),
-                (1.0 * data.get_total_commits()) / data.get_total_authors(),
-            )
-        )
-        f.write("</table>")
+    def create_activity_html(self, data, path):
+        content = render("activity", **self.get_activity_view(data))
+        self.write_page(path, "activity", "Activity", content)
 
-        f.write("</body>\n</html>")
-        f.close()
+    def create_authors_html(self, data, path):
+        view = self.get_authors_view(data)
+        if view["all_authors"]:
+            write_author_pages(data, path, int(conf["authors_page_size"]))
+        content = render("authors", **view)
+        self.write_page(path, "authors", "Authors", content)
 
-    def create_activity_html(self, data, path):
-        ###
-        # Activity
-        f = open(path + "/activity.html", "w")
-        self.print_header(f)
-        f.write("<h1>Activity</h1>")
-        self.print_nav(f)
+    def create_files_html(self, data, path):
+        content = render("files", **self.get_files_view(data))
+        self.write_page(path, "files", "Files", content)
 
-        # f.write('<h2>Last 30 days</h2>')
+    def create_lines_html(self, data, path):
+        content = render("lines", **self.get_lines_view(data))
+        self.write_page(path, "lines", "Lines", content)
 
-        # f.write('<h2>Last 12 months</h2>')
+    def create_tags_html(self, data, path):
+        content = render("tags", **self.get_tags_view(data))
+        self.write_page(path, "tags", "Tags", content)
 
-        # Weekly activity
-        WEEKS = 32
-        f.write(html_header(2, "Weekly activity"))
-        f.write("<p>Last %d weeks</p>" % WEEKS)
+    def get_index_view(self, data):
+        format = "%Y-%m-%d %H:%M:%S"
+        active_days = len(data.get_active_days())
+        delta_days = data.get_commit_delta_days()
+        total_commits = data.get_total_commits()
+        return {
+            "project_name": data.project_name,
+            "generated": datetime.datetime.now().strftime(format),
+            "generated_in": "%d" % (time.time() - data.get_stamp_created()),
+            "version": self.version,
+            "git_version": get_git_version(),
+            "gnuplot_version": get_gnuplot_version(),
+            "first_commit": data.get_first_commit_date().strftime(format),
+            "last_commit": data.get_last_commit_date().strftime(format),
+            "age": "%d" % delta_days,
+            "active_days": "%d" % active_days,
+            "active_days_percent": "%3.2f" % (100.0 * active_days / delta_days),
+            "total_files": data.get_total_files(),
+            "total_lines": data.get_total_loc(),
+            "lines_added": "%d" % data.total_lines_added,
+            "lines_removed": "%d" % data.total_lines_removed,
+            "total_commits": total_commits,
+            "commits_per_active_day": "%.1f" % (float(total_commits) / active_days),
+            "commits_per_day": "%.1f" % (float(total_commits) / delta_days),
+            "total_authors": data.get_total_authors(),
+            "commits_per_author": "%.1f"
+            % ((1.0 * total_commits) / data.get_total_authors()),
+        }
+
+    def get_activity_view(self, data):
+        totalcommits = data.get_total_commits()
 
-        # generate weeks to show (previous N weeks from now)
+        # Weekly activity, the previous WEEKS weeks from now
         now = datetime.datetime.now()
-        deltaweek = datetime.timedelta(7)
-        weeks = []
-        stampcur = now
-        for i in range(0, WEEKS):
-            weeks.insert(0, stampcur.strftime("%Y-%W"))
-            stampcur -= deltaweek
-
-        # top row: commits & bar
-        f.write('<table class="noborders"><tr>')
-        for i in range(0, WEEKS):
-            commits = 0
-            if weeks[i] in data.activity_by_year_week:
-                commits = data.activity_by_year_week[weeks[i]]
-
-            percentage = 0
-            if weeks[i] in data.activity_by_year_week:
-                percentage = (
-                    float(data.activity_by_year_week[weeks[i]])
-                    / data.activity_by_year_week_peak
-                )
-            height = max(1, int(200 * percentage))
-            f.write(
-                '<td style="text-align: center; vertical-align: bottom">%d<div style="display: block; background-color: red; width: 20px; height: %dpx"></div></td>'
-                % (commits, height)
+        weeks = [
+            (now - datetime.timedelta(7 * i)).strftime("%Y-%W")
+            for i in reversed(range(WEEKS))
+        ]
+        week_bars = []
+        for week in weeks:
+            commits = data.activity_by_year_week.get(week, 0)
+            percentage = float(commits) / data.activity_by_year_week_peak
+            week_bars.append(
+                {"commits": "%d" % commits, "height": max(1, int(200 * percentage))}
             )
 
-        # bottom row: year/week
-        f.write("</tr><tr>")
-        for i in range(0, WEEKS):
-            f.write("<td>%s</td>" % (WEEKS - i))
-        f.write("</tr></table>")
-
         # Hour of Day
-        f.write(html_header(2, "Hour of Day"))
         hour_of_day = data.get_activity_by_hour_of_day()
-        f.write("<table><tr><th>Hour</th>")
-        for i in range(0, 24):
-            f.write("<th>%d</th>" % i)
-        f.write("</tr>\n<tr><th>Commits</th>")
-        fp = open(path + "/hour_of_day.dat", "w")
+        hour_of_day_commits = []
+        hour_of_day_percents = []
         for i in range(0, 24):
             if i in hour_of_day:
                 r = 127 + int(
                     (float(hour_of_day[i]) / data.activity_by_hour_of_day_busiest) * 128
                 )
-                f.write(
-                    '<td style="background-color: rgb(%d, 0, 0)">%d</td>'
-                    % (r, hour_of_day[i])
-                )
-                fp.write("%d %d\n" % (i, hour_of_day[i]))
-            else:
-                f.write("<td>0</td>")
-                fp.write("%d 0\n" % i)
-        fp.close()
-        f.write("</tr>\n<tr><th>%</th>")
-        totalcommits = data.get_total_commits()
-        for i in range(0, 24):
-            if i in hour_of_day:
-                r = 127 + int(
-                    (float(hour_of_day[i]) / data.activity_by_hour_of_day_busiest) * 128
+                hour_of_day_commits.append(
+                    render("heat_cell", red=r, value="%d" % hour_of_day[i])
                 )
-                f.write(
-                    '<td style="background-color: rgb(%d, 0, 0)">%.2f</td>'
-                    % (r, (100.0 * hour_of_day[i]) / totalcommits)
+                hour_of_day_percents.append(
+                    render(
+                        "heat_cell",
+                        red=r,
+                        value="%.2f" % ((100.0 * hour_of_day[i]) / totalcommits),
+                    )
                 )
             else:
-                f.write("<td>0.00</td>")
-        f.write("</tr></table>")
-        f.write('<img src="hour_of_day.png" alt="Hour of Day">')
-        fg = open(path + "/hour_of_day.dat", "w")
-        for i in range(0, 24):
-            if i in hour_of_day:
-                fg.write("%d %d\n" % (i + 1, hour_of_day[i]))
-            else:
-                fg.write("%d 0\n" % (i + 1))
-        fg.close()
+                hour_of_day_commits.append(render("cell", value="0"))
+                hour_of_day_percents.append(render("cell", value="0.00"))
 
         # Day of Week
-        f.write(html_header(2, "Day of Week"))
         day_of_week = data.get_activity_by_day_of_week()
-        f.write('<div class="vtable"><table>')
-        f.write("<tr><th>Day</th><th>Total (%)</th></tr>")
-        fp = open(path + "/day_of_week.dat", "w")
+        day_of_week_rows = []
         for d in range(0, 7):
-            commits = 0
             if d in day_of_week:
-                commits = day_of_week[d]
-            fp.write("%d %s %d\n" % (d + 1, WEEKDAYS[d], commits))
-            f.write("<tr>")
-            f.write("<th>%s</th>" % (WEEKDAYS[d]))
-            if d in day_of_week:
-                f.write(
-                    "<td>%d (%.2f%%)</td>"
-                    % (day_of_week[d], (100.0 * day_of_week[d]) / totalcommits)
+                commits = "%d (%.2f%%)" % (
+                    day_of_week[d],
+                    (100.0 * day_of_week[d]) / totalcommits,
                 )
             else:
-                f.write("<td>0</td>")
-            f.write("</tr>")
-        f.write("</table></div>")
-        f.write('<img src="day_of_week.png" alt="Day of Week">')
-        fp.close()
+                commits = "0"
+            day_of_week_rows.append({"day": WEEKDAYS[d], "commits": commits})
 
         # Hour of Week
-        f.write(html_header(2, "Hour of Week"))
-        f.write("<table>")
-
-        f.write("<tr><th>Weekday</th>")
-        for hour in range(0, 24):
-            f.write("<th>%d</th>" % (hour))
-        f.write("</tr>")
-
+        hour_of_week_rows = []
         for weekday in range(0, 7):
-            f.write("<tr><th>%s</th>" % (WEEKDAYS[weekday]))
+            by_hour = data.activity_by_hour_of_week.get(weekday, {})
+            cells = []
             for hour in range(0, 24):
-                try:
-                    commits = data.activity_by_hour_of_week[weekday][hour]
-                except KeyError:
-                    commits = 0
+                commits = by_hour.get(hour, 0)
                 if commits != 0:
-                    f.write("<td")
                     r = 127 + int(
                         (float(commits) / data.activity_by_hour_of_week_busiest) * 128
                     )
-                    f.write(' style="background-color: rgb(%d, 0, 0)"' % r)
-                    f.write(">%d</td>" % commits)
+                    cells.append(render("heat_cell", red=r, value="%d" % commits))
                 else:
-                    f.write("<td></td>")
-            f.write("</tr>")
-
-        f.write("</table>")
+                    cells.append(render("cell", value=""))
+            hour_of_week_rows.append(
+                {"weekday": WEEKDAYS[weekday], "cells": "".join(cells)}
+            )
 
         # Month of Year
-        f.write(html_header(2, "Month of Year"))
-        f.write('<div class="vtable"><table>')
-        f.write("<tr><th>Month</th><th>Commits (%)</th></tr>")
-        fp = open(path + "/month_of_year.dat", "w")
+        month_of_year_rows = []
         for mm in range(1, 13):
-            commits = 0
-            if mm in data.activity_by_month_of_year:
-                commits = data.activity_by_month_of_year[mm]
-            f.write(
-                "<tr><td>%d</td><td>%d (%.2f %%)</td></tr>"
-                % (mm, commits, (100.0 * commits) / data.get_total_commits())
+            commits = data.activity_by_month_of_year.get(mm, 0)
+            month_of_year_rows.append(
+                {
+                    "month": "%d" % mm,
+                    "commits": "%d" % commits,
+                    "percent": "%.2f" % ((100.0 * commits) / totalcommits),
+                }
             )
-            fp.write("%d %d\n" % (mm, commits))
-        fp.close()
-        f.write("</table></div>")
-        f.write('<img src="month_of_year.png" alt="Month of Year">')
 
         # Commits by year/month
-        f.write(html_header(2, "Commits by year/month"))
-        f.write(
-            '<div class="vtable"><table><tr><th>Month</th><th>Commits</th><th>Lines added</th><th>Lines removed</th></tr>'
-        )
-        for yymm in reversed(sorted(data.commits_by_month.keys())):
-            f.write(
-                "<tr><td>%s</td><td>%d</td><td>%d</td><td>%d</td></tr>"
-                % (
-                    yymm,
-                    data.commits_by_month.get(yymm, 0),
-                    data.lines_added_by_month.get(yymm, 0),
-                    data.lines_removed_by_month.get(yymm, 0),
-                )
-            )
-        f.write("</table></div>")
-        f.write('<img src="commits_by_year_month.png" alt="Commits by year/month">')
-        fg = open(path + "/commits_by_year_month.dat", "w")
-        for yymm in sorted(data.commits_by_month.keys()):
-            fg.write("%s %s\n" % (yymm, data.commits_by_month[yymm]))
-        fg.close()
+        month_rows = [
+            {
+                "month": yymm,
+                "commits": "%d" % data.commits_by_month.get(yymm, 0),
+                "lines_added": "%d" % data.lines_added_by_month.get(yymm, 0),
+                "lines_removed": "%d" % data.lines_removed_by_month.get(yymm, 0),
+            }
+            for yymm in reversed(sorted(data.commits_by_month.keys()))
+        ]
 
         # Commits by year
-        f.write(html_header(2, "Commits by Year"))
-        f.write(
-            '<div class="vtable"><table><tr><th>Year</th><th>Commits (% of all)</th><th>Lines added</th><th>Lines removed</th></tr>'
-        )
-        for yy in reversed(sorted(data.commits_by_year.keys())):
-            f.write(
-                "<tr><td>%s</td><td>%d (%.2f%%)</td><td>%d</td><td>%d</td></tr>"
-                % (
-                    yy,
-                    data.commits_by_year.get(yy, 0),
-                    (100.0 * data.commits_by_year.get(yy, 0))
-                    / data.get_total_commits(),
-                    data.lines_added_by_year.get(yy, 0),
-                    data.lines_removed_by_year.get(yy, 0),
-                )
-            )
-        f.write("</table></div>")
-        f.write('<img src="commits_by_year.png" alt="Commits by Year">')
-        fg = open(path + "/commits_by_year.dat", "w")
-        for yy in sorted(data.commits_by_year.keys()):
-            fg.write("%d %d\n" % (yy, data.commits_by_year[yy]))
-        fg.close()
+        year_rows = [
+            {
+                "year": yy,
+                "commits": "%d" % data.commits_by_year.get(yy, 0),
+                "percent": "%.2f"
+                % ((100.0 * data.commits_by_year.get(yy, 0)) / totalcommits),
+                "lines_added": "%d" % data.lines_added_by_year.get(yy, 0),
+                "lines_removed": "%d" % data.lines_removed_by_year.get(yy, 0),
+            }
+            for yy in reversed(sorted(data.commits_by_year.keys()))
+        ]
 
         # Commits by timezone
-        f.write(html_header(2, "Commits by Timezone"))
-        f.write("<table><tr>")
-        f.write("<th>Timezone</th><th>Commits</th>")
-        f.write("</tr>")
         max_commits_on_tz = max(data.commits_by_timezone.values())
+        timezone_rows = []
         for i in sorted(list(data.commits_by_timezone.keys()), key=lambda n: int(n)):
             commits = data.commits_by_timezone[i]
             r = 127 + int((float(commits) / max_commits_on_tz) * 128)
-            f.write(
-                '<tr><th>%s</th><td style="background-color: rgb(%d, 0, 0)">%d</td></tr>'
-                % (i, r, commits)
-            )
-        f.write("</table>")
-
-        f.write("</body></html>")
-        f.close()
-
-    def create_authors_html(self, data, path):
-        ###
-        # Authors
-        f = open(path + "/authors.html", "w")
-        self.print_header(f)
-
-        f.write("<h1>Authors</h1>")
-        self.print_nav(f)
-
-        # Authors :: List of authors
-        f.write(html_header(2, "List of Authors"))
-
-        f.write('<table class="authors sortable" id="authors">')
-        f.write(
-            '<tr><th>Author</th><th>Commits (%)</th><th>+ lines</th><th>- lines</th><th>First commit</th><th>Last commit</th><th class="unsortable">Age</th><th>Active days</th><th># by commits</th></tr>'
-        )
-        for author in data.get_authors(conf["max_authors"]):
-            info = data.get_author_info(author)
-            f.write(
-                "<tr><td>%s</td><td>%d (%.2f%%)</td><td>%d</td><td>%d</td><td>%s</td><td>%s</td><td>%s</td><td>%d</td><td>%d</td></tr>"
-                % (
-                    author,
-                    info["commits"],
-                    info["commits_frac"],
-                    info["lines_added"],
-                    info["lines_removed"],
-                    info["date_first"],
-                    info["date_last"],
-                    info["timedelta"],
-                    len(info["active_days"]),
-                    info["place_by_commits"],
-                )
-            )
-        f.write("</table>")
-
+            timezone_rows.append({"timezone": i, "red": r, "commits": "%d" % commits})
+
+        hours = "".join(render("header_cell", value=i) for i in range(0, 24))
+        return {
+            "weeks": WEEKS,
+            "week_bars": render_rows("activity_week", week_bars, ""),
+            "week_numbers": "".join(
+                render("cell", value=WEEKS - i) for i in range(0, WEEKS)
+            ),
+            "hours": hours,
+            "hour_of_day_commits": "".join(hour_of_day_commits),
+            "hour_of_day_percents": "".join(hour_of_day_percents),
+            "hour_of_day_chart": self.chart_html("hour_of_day", "Hour of Day"),
+            "day_of_week_rows": render_rows("activity_day", day_of_week_rows),
+            "day_of_week_chart": self.chart_html("day_of_week", "Day of Week"),
+            "hour_of_week_rows": render_rows(
+                "activity_hour_of_week", hour_of_week_rows
+            ),
+            "month_of_year_rows": render_rows(
+                "activity_month_of_year", month_of_year_rows
+            ),
+            "month_of_year_chart": self.chart_html("month_of_year", "Month of Year"),
+            "month_rows": render_rows("activity_month", month_rows),
+            "commits_by_year_month_chart": self.chart_html(
+                "commits_by_year_month", "Commits by year/month"
+            ),
+            "year_rows": render_rows("activity_year", year_rows),
+            "commits_by_year_chart": self.chart_html(
+                "commits_by_year", "Commits by Year"
+            ),
+            "timezone_rows": render_rows("activity_timezone", timezone_rows),
+        }
+
+    def get_authors_view(self, data):
+        max_authors = int(conf["max_authors"])
         allauthors = data.get_authors()
-        if len(allauthors) > conf["max_authors"]:
-            rest = allauthors[conf["max_authors"] :]
-            f.write(
-                '<p class="moreauthors">These didn\'t make it to the top: %s</p>'
-                % ", ".join(rest)
-            )
-
-        f.write(html_header(2, "Cumulated Added Lines of Code per Author"))
-        f.write(
-            '<img src="lines_of_code_by_author.png" alt="Lines of code per Author">'
-        )
-        if len(allauthors) > conf["max_authors"]:
-            f.write(
-                '<p class="moreauthors">Only top %d authors shown</p>'
-                % conf["max_authors"]
-            )
-
-        f.write(html_header(2, "Commits per Author"))
-        f.write('<img src="commits_by_author.png" alt="Commits per Author">')
-        if len(allauthors) > conf["max_authors"]:
-            f.write(
-                '<p class="moreauthors">Only top %d authors shown</p>'
-                % conf["max_authors"]
-            )
-
-        fgl = open(path + "/lines_of_code_by_author.dat", "w")
-        fgc = open(path + "/commits_by_author.dat", "w")
-
-        lines_by_authors = {}  # cumulated added lines by
-        # author. to save memory,
-        # changes_by_date_by_author[stamp][author] is defined
-        # only at points where author commits.
-        # lines_by_authors allows us to generate all the
-        # points in the .dat file.
-
-        # Don't rely on get_authors to give the same order each
-        # time. Be robust and keep the list in a variable.
-        commits_by_authors = {}  # cumulated added lines by
-
-        self.authors_to_plot = data.get_authors(conf["max_authors"])
-        for author in self.authors_to_plot:
-            lines_by_authors[author] = 0
-            commits_by_authors[author] = 0
-        for stamp in sorted(data.changes_by_date_by_author.keys()):
-            fgl.write("%d" % stamp)
-            fgc.write("%d" % stamp)
-            for author in self.authors_to_plot:
-                if author in list(data.changes_by_date_by_author[stamp].keys()):
-                    lines_by_authors[author] = data.changes_by_date_by_author[stamp][
-                        author
-                    ]["lines_added"]
-                    commits_by_authors[author] = data.changes_by_date_by_author[stamp][
-                        author
-                    ]["commits"]
-                fgl.write(" %d" % lines_by_authors[author])
-                fgc.write(" %d" % commits_by_authors[author])
-            fgl.write("\n")
-            fgc.write("\n")
-        fgl.close()
-        fgc.close()
-
-        # Authors :: Author of Month
-        f.write(html_header(2, "Author of Month"))
-        f.write('<table class="sortable" id="aom">')
-        f.write(
-            '<tr><th>Month</th><th>Author</th><th>Commits (%%)</th><th class="unsortable">Next top %d</th><th>Number of authors</th></tr>'
-            % conf["authors_top"]
-        )
-        for yymm in reversed(sorted(data.author_of_month.keys())):
-            author_dict = data.author_of_month[yymm]
-            authors = get_keys_sorted_by_values(author_dict)
-            authors.reverse()
-            commits = data.author_of_month[yymm][authors[0]]
-            authors_str = ", ".join(authors[1 : conf["authors_top"] + 1])
-            f.write(
-                "<tr><td>%s</td><td>%s</td><td>%d (%.2f%% of %d)</td><td>%s</td><td>%d</td></tr>"
-                % (
-                    yymm,
-                    authors[0],
-                    commits,
-                    (100.0 * commits) / data.commits_by_month[yymm],
-                    data.commits_by_month[yymm],
-                    authors_str,
-                    len(authors),
-                )
+        author_rows = []
+        for author in allauthors[:max_authors]:
+            info = data.get_author_info(author)
+            author_rows.append(
+                {
+                    "author": author,
+                    "commits": "%d" % info.commits,
+                    "commits_percent": "%.2f" % info.commits_frac,
+                    "lines_added": "%d" % info.lines_added,
+                    "lines_removed": "%d" % info.lines_removed,
+                    "first_commit": info.date_first,
+                    "last_commit": info.date_last,
+                    "age": info.timedelta,
+                    "active_days": "%d" % len(info.days),
+                    "place": "%d" % info.place_by_commits,
+                }
             )
 
-        f.write("</table>")
-
-        f.write(html_header(2, "Author of Year"))
-        f.write(
-            '<table class="sortable" id="aoy"><tr><th>Year</th><th>Author</th><th>Commits (%%)</th><th class="unsortable">Next top %d</th><th>Number of authors</th></tr>'
-            % conf["authors_top"]
-        )
-        for yy in reversed(sorted(data.author_of_year.keys())):
-            author_dict = data.author_of_year[yy]
-            authors = get_keys_sorted_by_values(author_dict)
-            authors.reverse()
-            commits = data.author_of_year[yy][authors[0]]
-            authors_str = ", ".join(authors[1 : conf["authors_top"] + 1])
-            f.write(
-                "<tr><td>%s</td><td>%s</td><td>%d (%.2f%% of %d)</td><td>%s</td><td>%d</td></tr>"
-                % (
-                    yy,
-                    authors[0],
-                    commits,
-                    (100.0 * commits) / data.commits_by_year[yy],
-                    data.commits_by_year[yy],
-                    authors_str,
-                    len(authors),
-                )
+        # the list of all authors is paged, see write_author_pages()
+        all_authors = ""
+        top_authors_note = ""
+        if len(allauthors) > max_authors:
+            all_authors = render(
+                "authors_all",
+                total=len(allauthors),
+                page_size=int(conf["authors_page_size"]),
+                version="%d" % data.get_stamp_created(),
             )
-        f.write("</table>")
+            top_authors_note = render("authors_top", count=max_authors)
 
         # Domains
-        f.write(html_header(2, "Commits by Domains"))
         domains_by_commits = get_keys_sorted_by_value_key(data.domains, "commits")
         domains_by_commits.reverse()  # most first
-        f.write('<div class="vtable"><table>')
-        f.write("<tr><th>Domains</th><th>Total (%)</th></tr>")
-        fp = open(path + "/domains.dat", "w")
-        n = 0
-        for domain in domains_by_commits:
-            if n == conf["max_domains"]:
-                break
-            commits = 0
-            n += 1
+        domain_rows = []
+        for domain in domains_by_commits[: int(conf["max_domains"])]:
             info = data.get_domain_info(domain)
-            fp.write("%s %d %d\n" % (domain, n, info["commits"]))
-            f.write(
-                "<tr><th>%s</th><td>%d (%.2f%%)</td></tr>"
-                % (
-                    domain,
-                    info["commits"],
-                    (100.0 * info["commits"] / data.get_total_commits()),
-                )
+            domain_rows.append(
+                {
+                    "domain": domain,
+                    "commits": "%d" % info["commits"],
+                    "percent": "%.2f"
+                    % (100.0 * info["commits"] / data.get_total_commits()),
+                }
             )
-        f.write("</table></div>")
-        f.write('<img src="domains.png" alt="Commits by Domains">')
-        fp.close()
-
-        f.write("</body></html>")
-        f.close()
 
-    def create_files_html(self, data, path):
-        ###
-        # Files
-        f = open(path + "/files.html", "w")
-        self.print_header(f)
-        f.write("<h1>Files</h1>")
-        self.print_nav(f)
-
-        f.write("<dl>\n")
-        f.write("<dt>Total files</dt><dd>%d</dd>" % data.get_total_files())
-        f.write("<dt>Total lines</dt><dd>%d</dd>" % data.get_total_loc())
+        return {
+            "author_rows": render_rows("authors_author", author_rows),
+            "all_authors": all_authors,
+            "lines_of_code_by_author_chart": self.chart_html(
+                "lines_of_code_by_author", "Lines of code per Author"
+            ),
+            "commits_by_author_chart": self.chart_html(
+                "commits_by_author", "Commits per Author"
+            ),
+            "top_authors_note": top_authors_note,
+            "authors_top": "%d" % int(conf["authors_top"]),
+            "author_of_month_rows": render_rows(
+                "authors_period",
+                get_author_of_period_rows(data.author_of_month, data.commits_by_month),
+            ),
+            "author_of_year_rows": render_rows(
+                "authors_period",
+                get_author_of_period_rows(data.author_of_year, data.commits_by_year),
+            ),
+            "domain_rows": render_rows("authors_domain", domain_rows),
+            "domains_chart": self.chart_html("domains", "Commits by Domains"),
+        }
+
+    def get_files_view(self, data):
+        average_file_size = ""
         try:
-            f.write(
-                "<dt>Average file size</dt><dd>%.2f bytes</dd>"
-                % (float(data.get_total_size()) / data.get_total_files())
+            average_file_size = render(
+                "files_average",
+                size="%.2f" % (float(data.get_total_size()) / data.get_total_files()),
             )
         except ZeroDivisionError:
             pass
-        f.write("</dl>\n")
-
-        # Files :: File count by date
-        f.write(html_header(2, "File count by date"))
-
-        # use set to get rid of duplicate/unnecessary entries
-        files_by_date = set()
-        for stamp in sorted(data.files_by_stamp.keys()):
-            files_by_date.add(
-                "%s %d"
-                % (
-                    datetime.datetime.fromtimestamp(stamp).strftime("%Y-%m-%d"),
-                    data.files_by_stamp[stamp],
-                )
-            )
-
-        fg = open(path + "/files_by_date.dat", "w")
-        for line in sorted(list(files_by_date)):
-            fg.write("%s\n" % line)
-        # for stamp in sorted(data.files_by_stamp.keys()):
-        # 	fg.write('%s %d\n' % (datetime.datetime.fromtimestamp(stamp).strftime('%Y-%m-%d'), data.files_by_stamp[stamp]))
-        fg.close()
-
-        f.write('<img src="files_by_date.png" alt="Files by Date">')
-
-        # f.write('<h2>Average file size by date</h2>')
-
-        # Files :: Extensions
-        f.write(html_header(2, "Extensions"))
-        f.write(
-            '<table class="sortable" id="ext"><tr><th>Extension</th><th>Files (%)</th><th>Lines (%)</th><th>Lines/file</th></tr>'
-        )
 
+        extension_rows = []
         for ext in sorted(data.extensions.keys()):
             files = data.extensions[ext]["files"]
             lines = data.extensions[ext]["lines"]
@@ -594,64 +403,40 @@ class HTMLReportCreator(ReportCreator):
                 loc_percentage = (100.0 * lines) / data.get_total_loc()
             except ZeroDivisionError:
                 loc_percentage = 0
-            f.write(
-                "<tr><td>%s</td><td>%d (%.2f%%)</td><td>%d (%.2f%%)</td><td>%d</td></tr>"
-                % (
-                    ext,
-                    files,
-                    (100.0 * files) / data.get_total_files(),
-                    lines,
-                    loc_percentage,
-                    lines / files,
-                )
+            extension_rows.append(
+                {
+                    "extension": ext,
+                    "files": "%d" % files,
+                    "files_percent": "%.2f"
+                    % ((100.0 * files) / data.get_total_files()),
+                    "lines": "%d" % lines,
+                    "lines_percent": "%.2f" % loc_percentage,
+                    "lines_per_file": "%d" % (lines / files),
+                }
             )
-        f.write("</table>")
-
-        f.write("</body></html>")
-        f.close()
-
-    def create_lines_html(self, data, path):
-        ###
-        # Lines
-        f = open(path + "/lines.html", "w")
-        self.print_header(f)
-        f.write("<h1>Lines</h1>")
-        self.print_nav(f)
-
-        f.write("<dl>\n")
-        f.write("<dt>Total lines</dt><dd>%d</dd>" % data.get_total_loc())
-        f.write("</dl>\n")
-
-        f.write(html_header(2, "Lines of Code"))
-        f.write('<img src="lines_of_code.png" alt="Lines of Code">')
-
-        fg = open(path + "/lines_of_code.dat", "w")
-        for stamp in sorted(data.changes_by_date.keys()):
-            fg.write("%d %d\n" % (stamp, data.changes_by_date[stamp]["lines"]))
-        fg.close()
 
-        f.write("</body></html>")
-        f.close()
-
-    def create_tags_html(self, data, path):
-        ###
-        # tags.html
-        f = open(path + "/tags.html", "w")
-        self.print_header(f)
-        f.write("<h1>Tags</h1>")
-        self.print_nav(f)
-
-        f.write("<dl>")
-        f.write("<dt>Total tags</dt><dd>%d</dd>" % len(data.tags))
+        return {
+            "total_files": "%d" % data.get_total_files(),
+            "total_lines": "%d" % data.get_total_loc(),
+            "average_file_size": average_file_size,
+            "files_by_date_chart": self.chart_html("files_by_date", "Files by Date"),
+            "extension_rows": render_rows("files_extension", extension_rows),
+        }
+
+    def get_lines_view(self, data):
+        return {
+            "total_lines": "%d" % data.get_total_loc(),
+            "lines_of_code_chart": self.chart_html("lines_of_code", "Lines of Code"),
+        }
+
+    def get_tags_view(self, data):
+        average_commits = ""
         if len(data.tags) > 0:
-            f.write(
-                "<dt>Average commits per tag</dt><dd>%.2f</dd>"
-                % (1.0 * data.get_total_commits() / len(data.tags))
+            average_commits = render(
+                "tags_average",
+                commits="%.2f" % (1.0 * data.get_total_commits() / len(data.tags)),
             )
-        f.write("</dl>")
 
-        f.write('<table class="tags">')
-        f.write("<tr><th>Name</th><th>Date</th><th>Commits</th><th>Authors</th></tr>")
         # sort the tags by date desc
         tags_sorted_by_date_desc = [
             el[1]
@@ -659,315 +444,168 @@ class HTMLReportCreator(ReportCreator):
                 sorted([(el[1]["date"], el[0]) for el in list(data.tags.items())])
             )
         ]
+        tag_rows = []
         for tag in tags_sorted_by_date_desc:
-            authorinfo = []
-            self.authors_by_commits = get_keys_sorted_by_values(
-                data.tags[tag]["authors"]
+            authors = data.tags[tag]["authors"]
+            authorinfo = [
+                "%s (%d)" % (i, authors[i])
+                for i in reversed(get_keys_sorted_by_values(authors))
+            ]
+            tag_rows.append(
+                {
+                    "tag": tag,
+                    "date": data.tags[tag]["date"],
+                    "commits": "%d" % data.tags[tag]["commits"],
+                    "authors": ", ".join(authorinfo),
+                }
             )
-            for i in reversed(self.authors_by_commits):
-                authorinfo.append("%s (%d)" % (i, data.tags[tag]["authors"][i]))
-            f.write(
-                "<tr><td>%s</td><td>%s</td><td>%d</td><td>%s</td></tr>"
-                % (
-                    tag,
-                    data.tags[tag]["date"],
-                    data.tags[tag]["commits"],
-                    ", ".join(authorinfo),
-                )
-            )
-        f.write("</table>")
 
-        f.write("</body></html>")
-        f.close()
+        return {
+            "total_tags": "%d" % len(data.tags),
+            "average_commits": average_commits,
+            "tag_rows": render_rows("tags_tag", tag_rows),
+        }
 
     def create_graphs(self, path):
         print("Generating graphs...")
-        self.create_graph_hour_of_day(path)
-        self.create_graph_day_of_week(path)
-        self.create_graph_domains(path)
-        self.create_graph_month_of_year(path)
-        self.create_graph_commits_by_year_month(path)
-        self.create_graph_commits_by_year(path)
-        self.create_graph_files_by_date(path)
-        self.create_graph_lines_of_code(path)
-        self.create_graph_lines_of_code_by_author(path)
-        self.create_graph_commits_by_author(path)
-        self.create_graph_by_gnuplot(path)
-
-    def create_graph_hour_of_day(self, path):
-        # hour of day
-        f = open(path + "/hour_of_day.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'hour_of_day.png'
-unset key
-set xrange [0.5:24.5]
-set yrange [0:]
-set xtics 4
-set grid y
-set ylabel "Commits"
-plot 'hour_of_day.dat' using 1:2:(0.5) w boxes fs solid
-"""
+        charts = decimate_charts(get_charts(self.data), int(conf["max_chart_points"]))
+        self.chart_backend.render(charts, path)
+
+    def chart_html(self, name, alt):
+        return self.chart_backend.get_html(name, alt)
+
+
+def create_page(pages, name):
+    """
+    Create a page in a worker process, given the pickled (creator, data,
+    path, conf) of the report.
+    """
+    creator, data, path, config = pickle.loads(pages)
+    conf.update(config)
+    getattr(creator, name)(data, path)
+
+
+def get_author_of_period_rows(author_of_period, commits_by_period):
+    """Return the rows of the author of month or year table, latest first."""
+    rows = []
+    for period in reversed(sorted(author_of_period.keys())):
+        author_dict = author_of_period[period]
+        authors = get_keys_sorted_by_values(author_dict)
+        authors.reverse()
+        commits = author_dict[authors[0]]
+        rows.append(
+            {
+                "period": period,
+                "author": authors[0],
+                "commits": "%d" % commits,
+                "percent": "%.2f" % ((100.0 * commits) / commits_by_period[period]),
+                "total": "%d" % commits_by_period[period],
+                "next_top": ", ".join(authors[1 : int(conf["authors_top"]) + 1]),
+                "authors": "%d" % len(authors),
+            }
         )
-        f.close()
-
-    def create_graph_day_of_week(self, path):
-        # day of week
-        f = open(path + "/day_of_week.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'day_of_week.png'
-unset key
-set xrange [0.5:7.5]
-set yrange [0:]
-set xtics 1
-set grid y
-set ylabel "Commits"
-plot 'day_of_week.dat' using 1:3:(0.5):xtic(2) w boxes fs solid
-"""
+    return rows
+
+
+def write_author_pages(data, path, page_size):
+    """
+    Write the rows of all authors, most commits first, page_size rows per
+    file to authors/<n>.js, and the values the list is sorted and filtered
+    by to authors/index.js, for authors.js to load when they are shown.
+    """
+    os.makedirs(path + "/authors", exist_ok=True)
+    index = {key: [] for key in AUTHOR_INDEX}
+    rows = []
+    for author in data.get_authors():
+        info = data.get_author_info(author)
+        values = (
+            author,
+            info.commits,
+            info.lines_added,
+            info.lines_removed,
+            info.date_first,
+            info.date_last,
+            len(info.days),
         )
-        f.close()
-
-    def create_graph_domains(self, path):
-        # Domains
-        f = open(path + "/domains.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'domains.png'
-unset key
-unset xtics
-set yrange [0:]
-set grid y
-set ylabel "Commits"
-plot 'domains.dat' using 2:3:(0.5) with boxes fs solid, '' using 2:3:1 with labels rotate by 45 offset 0,1
-"""
+        for key, value in zip(AUTHOR_INDEX, values):
+            index[key].append(value)
+        rows.append(
+            [
+                author,
+                "%d (%.2f%%)" % (info.commits, info.commits_frac),
+                "%d" % info.lines_added,
+                "%d" % info.lines_removed,
+                info.date_first,
+                info.date_last,
+                str(info.timedelta),
+                "%d" % len(info.days),
+                "%d" % info.place_by_commits,
+            ]
         )
-        f.close()
 
-    def create_graph_month_of_year(self, path):
-        # Month of Year
-        f = open(path + "/month_of_year.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'month_of_year.png'
-unset key
-set xrange [0.5:12.5]
-set yrange [0:]
-set xtics 1
-set grid y
-set ylabel "Commits"
-plot 'month_of_year.dat' using 1:2:(0.5) w boxes fs solid
-"""
-        )
-        f.close()
-
-    def create_graph_commits_by_year_month(self, path):
-        # commits_by_year_month
-        f = open(path + "/commits_by_year_month.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'commits_by_year_month.png'
-unset key
-set yrange [0:]
-set xdata time
-set timefmt "%Y-%m"
-set format x "%Y-%m"
-set xtics rotate
-set bmargin 5
-set grid y
-set ylabel "Commits"
-plot 'commits_by_year_month.dat' using 1:2:(0.5) w boxes fs solid
-"""
-        )
-        f.close()
-
-    def create_graph_commits_by_year(self, path):
-        # commits_by_year
-        f = open(path + "/commits_by_year.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'commits_by_year.png'
-unset key
-set yrange [0:]
-set xtics 1 rotate
-set grid y
-set ylabel "Commits"
-set yrange [0:]
-plot 'commits_by_year.dat' using 1:2:(0.5) w boxes fs solid
-"""
-        )
-        f.close()
-
-    def create_graph_files_by_date(self, path):
-        # Files by date
-        f = open(path + "/files_by_date.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'files_by_date.png'
-unset key
-set yrange [0:]
-set xdata time
-set timefmt "%Y-%m-%d"
-set format x "%Y-%m-%d"
-set grid y
-set ylabel "Files"
-set xtics rotate
-set ytics autofreq
-set bmargin 6
-plot 'files_by_date.dat' using 1:2 w steps
-"""
-        )
-        f.close()
-
-    def create_graph_lines_of_code(self, path):
-        # Lines of Code
-        f = open(path + "/lines_of_code.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set output 'lines_of_code.png'
-unset key
-set yrange [0:]
-set xdata time
-set timefmt "%s"
-set format x "%Y-%m-%d"
-set grid y
-set ylabel "Lines"
-set xtics rotate
-set bmargin 6
-plot 'lines_of_code.dat' using 1:2 w lines
-"""
-        )
-        f.close()
-
-    def create_graph_lines_of_code_by_author(self, path):
-        # Lines of Code Added per author
-        f = open(path + "/lines_of_code_by_author.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set terminal png transparent size 640,480
-set output 'lines_of_code_by_author.png'
-set key left top
-set yrange [0:]
-set xdata time
-set timefmt "%s"
-set format x "%Y-%m-%d"
-set grid y
-set ylabel "Lines"
-set xtics rotate
-set bmargin 6
-plot """
-        )
-        i = 1
-        plots = []
-        for a in self.authors_to_plot:
-            i = i + 1
-            author = a.replace('"', '\\"').replace("`", "")
-            plots.append(
-                """'lines_of_code_by_author.dat' using 1:%d title "%s" w lines"""
-                % (i, author)
-            )
-        f.write(", ".join(plots))
-        f.write("\n")
-
-        f.close()
-
-    def create_graph_commits_by_author(self, path):
-        # Commits per author
-        f = open(path + "/commits_by_author.plot", "w")
-        f.write(GNUPLOT_COMMON)
-        f.write(
-            """
-set terminal png transparent size 640,480
-set output 'commits_by_author.png'
-set key left top
-set yrange [0:]
-set xdata time
-set timefmt "%s"
-set format x "%Y-%m-%d"
-set grid y
-set ylabel "Commits"
-set xtics rotate
-set bmargin 6
-plot """
-        )
-        i = 1
-        plots = []
-        for a in self.authors_to_plot:
-            i = i + 1
-            author = a.replace('"', '\\"').replace("`", "")
-            plots.append(
-                """'commits_by_author.dat' using 1:%d title "%s" w lines"""
-                % (i, author)
+    for number, start in enumerate(range(0, len(rows), page_size)):
+        with open(path + "/authors/%d.js" % number, "w", encoding="utf-8") as f:
+            f.write(
+                "authors_chunk(%d, %s);\n"
+                % (
+                    number,
+                    json.dumps(rows[start : start + page_size], separators=(",", ":")),
+                )
             )
-        f.write(", ".join(plots))
-        f.write("\n")
-
-        f.close()
-
-    def create_graph_by_gnuplot(self, path):
-        os.chdir(path)
-        files = glob.glob(path + "/*.plot")
-        for f in files:
-            out = get_pipe_output([gnuplot_cmd + ' "%s"' % f])
-            if len(out) > 0:
-                print(out)
-
-    def print_header(self, file) -> None:
-        file.write(
-            """<!DOCTYPE html>
-<html>
-<head>
-	<meta charset="UTF-8">
-	<title>GitStats - %s</title>
-	<link rel="stylesheet" href="%s" type="text/css">
-	<meta name="generator" content="GitStats %s">
-	<script type="text/javascript" src="sortable.js"></script>
-</head>
-<body>
-"""
-            % (self.title, conf["style"], get_version)
-        )
-
-    def print_nav(self, file) -> None:
-        """Print navigation menu to file."""
-        file.write(
-            """
-            <div class="nav">
-            <ul>
-            <li><a href="index.html">General</a></li>
-            <li><a href="activity.html">Activity</a></li>
-            <li><a href="authors.html">Authors</a></li>
-            <li><a href="files.html">Files</a></li>
-            <li><a href="lines.html">Lines</a></li>
-            <li><a href="tags.html">Tags</a></li>
-            </ul>
-            </div>
-            """
-        )
-
-
-def html_header(level, text):
-    name = html_linkify(text)
-    return '\n<h%d id="%s"><a href="#%s">%s</a></h%d>\n\n' % (
-        level,
-        name,
-        name,
-        text,
-        level,
-    )
-
-
-def html_linkify(text):
-    return text.lower().replace(" ", "_")
+    with open(path + "/authors/index.js", "w", encoding="utf-8") as f:
+        f.write("authors_index(%s);\n" % json.dumps(index, separators=(",", ":")))
+
+
+def compile_template(text):
+    """
+    Compile the $placeholders of a string.Template to a %-format string,
+    so that rendering it is a single % operation.
+    """
+
+    def convert(match):
+        if match.group("escaped") is not None:
+            return "$"
+        name = match.group("named") or match.group("braced")
+        if name is None:
+            raise ValueError("Invalid placeholder in template: %r" % match.group())
+        return "%%(%s)s" % name
+
+    return Template.pattern.sub(convert, text.replace("%", "%%"))
+
+
+@lru_cache(maxsize=None)
+def get_template(name, directory=""):
+    """
+    Return the compiled template name.html of directory, or the built-in
+    one if directory has none. Templates are compiled once per process, for
+    all the reports it creates.
+    """
+    path = os.path.join(directory, name + ".html")
+    if not directory or not os.path.exists(path):
+        path = os.path.join(TEMPLATES_DIR, name + ".html")
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    # the final newline of a template file is not part of the template
+    if text.endswith("\n"):
+        text = text[:-1]
+    return compile_template(text)
+
+
+def load_templates():
+    """Compile all templates, before the pages are created in worker processes."""
+    for file in sorted(os.listdir(TEMPLATES_DIR)):
+        if file.endswith(".html"):
+            get_template(file[:-5], conf["templates"])
+
+
+def render(name, **values):
+    return get_template(name, conf["templates"]) % values
+
+
+def render_rows(name, rows, separator="\n"):
+    """Render the template once per row, given as dicts of its values."""
+    template = get_template(name, conf["templates"])
+    return separator.join(template % row for row in rows)
 
 
 def get_keys_sorted_by_values(dict):
@@ -0,0 +1,192 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import datetime
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappop, heappush
+
+from gitstats import load_config
+from gitstats.timing import bind
+from gitstats.utils import get_pipe_output, get_pipe_output_lines
+
+conf = load_config()
+
+
+def get_tags(cwd=None):
+    """
+    Return tag -> {stamp, hash, date, commits, authors} of the tags of the
+    repository. The tags are ordered by date, and the commits and authors
+    of a tag are those reachable from it but not from the previous tag,
+    like "git shortlog -s <tag> ^<previous tag>" counts them.
+    """
+    tags = {}
+    commits = {}  # tag -> hash of the tagged commit
+    # <ref> <object> <type> <peeled object> <peeled type> <date> <peeled date>
+    output = get_pipe_output(
+        [
+            "git for-each-ref --format="
+            '"%(refname)%00%(objectname)%00%(objecttype)%00%(*objectname)'
+            '%00%(*objecttype)%00%(authordate:unix)%00%(*authordate:unix)" refs/tags'
+        ],
+        cwd=cwd,
+    )
+    for line in output.split("\n"):
+        if len(line) == 0:
+            continue
+        ref, hash, type, peeled, peeled_type, date, peeled_date = line.split("\0")
+        tag = ref.replace("refs/tags/", "", 1)
+        if type == "commit":
+            commit, date = hash, date
+        elif peeled_type == "commit":
+            commit, date = peeled, peeled_date
+        elif type == "tag":
+            # a tag of a tag, peel it all the way
+            output = get_pipe_output(
+                ['git log "%s" --pretty=format:"%%at %%H" -n 1' % hash], cwd=cwd
+            )
+            if len(output) == 0:
+                continue
+            date, commit = output.split(" ")
+        else:
+            continue  # not a commit, e.g. a tagged tree
+        try:
+            stamp = int(date)
+        except ValueError:
+            stamp = 0
+        tags[tag] = {
+            "stamp": stamp,
+            "hash": hash,
+            "date": datetime.datetime.fromtimestamp(stamp).strftime("%Y-%m-%d"),
+            "commits": 0,
+            "authors": {},
+        }
+        commits[tag] = commit
+    if len(tags) == 0:
+        return tags
+
+    tags_sorted_by_date = sorted(tags, key=lambda tag: (tags[tag]["date"], tag))
+    authors_by_tag = get_tag_authors(tags_sorted_by_date, commits, cwd)
+    if authors_by_tag is None:
+        authors_by_tag = get_tag_authors_from_shortlog(
+            tags_sorted_by_date, commits, cwd
+        )
+    for tag, authors in authors_by_tag.items():
+        tags[tag]["commits"] = sum(authors.values())
+        tags[tag]["authors"] = authors
+    return tags
+
+
+def get_tag_authors(tags, commits, cwd=None):
+    """
+    Return tag -> author -> commits of the tags, ordered by date, from a
+    single walk over the history of all tags. Returns None if a tagged
+    commit is missing from the walk.
+    """
+    # <hash> <parents>\0<author>, the parents before their children
+    lines = get_pipe_output_lines(
+        ['git log --tags --topo-order --reverse --pretty=format:"%H %P%x00%aN"'],
+        cwd=cwd,
+    )
+    index = {}  # hash -> commit
+    parents = []  # commit -> parent commits
+    author_ids = {}  # name -> id
+    author = array("l")  # commit -> author id
+    for line in lines:
+        if len(line) == 0:
+            continue
+        hashes, name = line.split("\0", 1)
+        hashes = hashes.split(" ")
+        index[hashes[0]] = len(parents)
+        parents.append(tuple(index[el] for el in hashes[1:] if el in index))
+        author.append(author_ids.setdefault(name, len(author_ids)))
+    if any(commits[tag] not in index for tag in tags):
+        return None
+    names = sorted(author_ids, key=author_ids.get)
+
+    result = {}
+    prev = None
+    for tag in tags:
+        reachable = get_reachable(
+            parents, index[commits[tag]], None if prev is None else index[commits[prev]]
+        )
+        if len(reachable) == 0:
+            continue
+        prev = tag
+        counts = {}
+        for commit in reachable:
+            counts[author[commit]] = counts.get(author[commit], 0) + 1
+        # in the order "git shortlog" lists the authors in
+        result[tag] = {
+            names[el]: counts[el] for el in sorted(counts, key=names.__getitem__)
+        }
+    return result
+
+
+def get_reachable(parents, start, stop=None):
+    """
+    Return the commits reachable from start but not from stop, given as
+    indexes into parents, which lists the parents of each commit in
+    topological order with the parents first. Walks from both commits,
+    highest index first, until no commit reachable from start only is left.
+    """
+    if start == stop:
+        return []
+    uninteresting = {start: False}  # commit -> reachable from stop
+    heap = [-start]
+    if stop is not None:
+        uninteresting[stop] = True
+        heappush(heap, -stop)
+    pending = 1  # commits in the heap reachable from start only
+    result = []
+    while pending > 0:
+        commit = -heappop(heap)
+        flag = uninteresting[commit]
+        if not flag:
+            pending -= 1
+            result.append(commit)
+        for parent in parents[commit]:
+            if parent not in uninteresting:
+                uninteresting[parent] = flag
+                heappush(heap, -parent)
+                if not flag:
+                    pending += 1
+            elif flag and not uninteresting[parent]:
+                uninteresting[parent] = True
+                pending -= 1
+    return result
+
+
+def get_tag_authors_from_shortlog(tags, commits, cwd=None):
+    """
+    Return tag -> author -> commits of the tags, ordered by date, with
+    "git shortlog" run for the ranges between consecutive tags in parallel.
+    """
+
+    def shortlog(range):
+        tag, prev = range
+        cmd = 'git shortlog -s "%s"' % commits[tag]
+        if prev is not None:
+            cmd += ' "^%s"' % commits[prev]
+        return get_pipe_output([cmd], cwd=cwd)
+
+    ranges = list(zip(tags, [None] + tags[:-1]))
+    with ThreadPoolExecutor(max_workers=int(conf["processes"])) as executor:
+        outputs = dict(zip(ranges, executor.map(bind(shortlog), ranges)))
+
+    result = {}
+    prev = None
+    for tag in tags:
+        # a tag without commits of its own is skipped, the next one is
+        # then compared to the tag before it
+        if (tag, prev) not in outputs:
+            outputs[(tag, prev)] = shortlog((tag, prev))
+        output = outputs[(tag, prev)]
+        if len(output) == 0:
+            continue
+        prev = tag
+        result[tag] = {}
+        for line in output.split("\n"):
+            parts = re.split(r"\s+", line, 2)
+            result[tag][parts[2]] = int(parts[1])
+    return result
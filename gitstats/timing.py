@@ -0,0 +1,226 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from gitstats import time_start
+
+PROFILE_VERSION = 1
+
+
+class Phase:
+    """
+    Time taken and external commands run in one phase of a run. The
+    phases may nest, the time and commands of a phase include those of
+    the phases run within it.
+    """
+
+    __slots__ = (
+        "name",
+        "calls",
+        "wall",
+        "cpu",
+        "children_cpu",
+        "subprocesses",
+        "bytes_read",
+        "external",
+    )
+
+    COUNTERS = __slots__[1:]
+
+    name: str
+    calls: int
+    wall: float
+    cpu: float
+    children_cpu: float
+    subprocesses: int
+    bytes_read: int
+    external: float  # summed over the worker processes running commands
+
+    def __init__(self, name):
+        self.name = name
+        for key in self.COUNTERS:
+            setattr(self, key, 0)
+
+    def add(self, other):
+        for key in self.COUNTERS:
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+
+    def to_dict(self):
+        return {"name": self.name, **{key: getattr(self, key) for key in self.COUNTERS}}
+
+
+class Timing:
+    """
+    The phases and external commands of one run. Each thread accounts to
+    the timing it uses, see use(), so that runs in concurrent threads are
+    timed apart. The CPU times are those of the whole process.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.lock = threading.Lock()
+        self.phases: dict[str, Phase] = {}  # name -> Phase, in the order they first ran
+        self.active: list[Phase] = []  # the running phases, outermost first
+        self.total = Phase("total")  # external commands of the whole run
+
+    @contextmanager
+    def phase(self, name):
+        with self.lock:
+            if name not in self.phases:
+                self.phases[name] = Phase(name)
+            record = self.phases[name]
+            self.active.append(record)
+        start = get_times()
+        try:
+            yield record
+        finally:
+            wall, cpu, children_cpu = (b - a for a, b in zip(start, get_times()))
+            with self.lock:
+                self.active.remove(record)
+                record.calls += 1
+                record.wall += wall
+                record.cpu += cpu
+                record.children_cpu += children_cpu
+
+    def add_external(self, seconds, bytes_read=0, subprocesses=1):
+        with self.lock:
+            for record in [self.total] + self.active:
+                record.subprocesses += subprocesses
+                record.bytes_read += bytes_read
+                record.external += seconds
+
+    def reset(self):
+        with self.lock:
+            self.phases.clear()
+            del self.active[:]
+            for key in Phase.COUNTERS:
+                setattr(self.total, key, 0)
+
+    def get_state(self):
+        return list(self.phases.values()), self.total
+
+    def merge(self, state):
+        other_phases, other_total = state
+        with self.lock:
+            for record in other_phases:
+                if record.name not in self.phases:
+                    self.phases[record.name] = Phase(record.name)
+                self.phases[record.name].add(record)
+            self.total.add(other_total)
+
+    def get_report(self):
+        _, cpu, children_cpu = get_times()
+        return {
+            "version": PROFILE_VERSION,
+            "wall": time.time() - self.start,
+            "cpu": cpu,
+            "children_cpu": children_cpu,
+            "subprocesses": self.total.subprocesses,
+            "bytes_read": self.total.bytes_read,
+            "external": self.total.external,
+            "phases": [record.to_dict() for record in self.phases.values()],
+        }
+
+
+default = Timing(time_start)  # of the threads not using another one
+local = threading.local()
+
+
+def get_times():
+    """Return the wall clock, and the CPU time of this process and its children."""
+    times = os.times()
+    return (
+        time.perf_counter(),
+        times.user + times.system,
+        times.children_user + times.children_system,
+    )
+
+
+def current():
+    """Return the timing of this thread."""
+    return getattr(local, "timing", default)
+
+
+@contextmanager
+def use(timing):
+    """Account the time and external commands of this thread to timing."""
+    previous = current()
+    local.timing = timing
+    try:
+        yield timing
+    finally:
+        local.timing = previous
+
+
+def bind(func):
+    """Return func, run with the timing of this thread in other threads."""
+    return partial(call_with, current(), func)
+
+
+def call_with(timing, func, *args, **kwargs):
+    with use(timing):
+        return func(*args, **kwargs)
+
+
+def phase(name):
+    """Account the time and external commands of the block to the named phase."""
+    return current().phase(name)
+
+
+def add_external(seconds, bytes_read=0, subprocesses=1):
+    """Account external commands to the running phases and the total."""
+    current().add_external(seconds, bytes_read, subprocesses)
+
+
+def call_counted(func, *args):
+    """
+    Call func in a worker process, return its result and the external
+    commands it ran, as the arguments of add_external().
+    """
+    total = current().total
+    before = (total.external, total.bytes_read, total.subprocesses)
+    result = func(*args)
+    after = (total.external, total.bytes_read, total.subprocesses)
+    return result, tuple(b - a for a, b in zip(before, after))
+
+
+def map_counted(pool, func, iterable):
+    """
+    Like pool.map(), and account the external commands run in the worker
+    processes to the phases running in this one.
+    """
+    results = []
+    for result, counts in pool.map(partial(call_counted, func), iterable):
+        add_external(*counts)
+        results.append(result)
+    return results
+
+
+def reset():
+    current().reset()
+
+
+def get_state():
+    """Return the phases and the total, to be merged in another process."""
+    return current().get_state()
+
+
+def merge(state):
+    """Add the phases and the total of another process."""
+    current().merge(state)
+
+
+def get_report():
+    """Return the timing report of the run so far."""
+    return current().get_report()
+
+
+def write_report(path):
+    with open(path, "w") as f:
+        json.dump(get_report(), f, indent=2)
+        f.write("\n")
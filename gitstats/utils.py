@@ -2,17 +2,22 @@
 # GPLv2 / GPLv3
 # Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
 # GPLv2 / GPLv3
+import multiprocessing
 import os
 import re
 import sys
 import time
 import subprocess
-from gitstats import ON_LINUX, exectime_external, load_config
+from gitstats import ON_LINUX, load_config
+from gitstats.timing import add_external
 from importlib.metadata import version
 
 
 conf = load_config()
 
+# --diff-merges=first-parent of the history walk
+MIN_GIT_VERSION = (2, 31)
+
 
 def get_version():
     return version("gitstats")
@@ -22,23 +27,47 @@ def get_git_version():
     return get_pipe_output(["git --version"]).split("\n")[0]
 
 
+def get_git_version_number():
+    """Return the (major, minor) version of git, None if it is not found."""
+    match = re.search(r"(\d+)\.(\d+)", get_git_version())
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
 def get_gnuplot_version():
     output = get_pipe_output(["%s --version" % gnuplot_cmd]).split("\n")[0]
     return output if output else None
 
 
-def get_pipe_output(cmds, quiet=False):
-    global exectime_external
+def get_pipe_output(cmds, quiet=False, cwd=None, check=False):
+    """
+    Run the commands as a pipeline, return the output of the last one
+    """
+    return "\n".join(get_pipe_output_lines(cmds, quiet, cwd, check)).rstrip("\n")
+
+
+def get_pipe_output_lines(cmds, quiet=False, cwd=None, check=False):
+    """
+    Run the commands as a pipeline, yield the output of the last one line by
+    line while it is read from the pipe instead of buffering all of it. With
+    check, raises CalledProcessError once the output is read if a command
+    failed.
+    """
     start = time.time()
     if not quiet and ON_LINUX and os.isatty(1):
         print(">> " + " | ".join(cmds), end=" ")
         sys.stdout.flush()
-    p = subprocess.Popen(cmds[0], stdout=subprocess.PIPE, shell=True)
+    p = subprocess.Popen(cmds[0], stdout=subprocess.PIPE, shell=True, cwd=cwd)
     processes = [p]
     for x in cmds[1:]:
-        p = subprocess.Popen(x, stdin=p.stdout, stdout=subprocess.PIPE, shell=True)
+        p = subprocess.Popen(
+            x, stdin=p.stdout, stdout=subprocess.PIPE, shell=True, cwd=cwd
+        )
         processes.append(p)
-    output = p.communicate()[0]
+    bytes_read = 0
+    for line in p.stdout:
+        bytes_read += len(line)
+        yield line.decode("utf-8").rstrip("\n")
+    p.stdout.close()
     for p in processes:
         p.wait()
     end = time.time()
@@ -46,8 +75,27 @@ def get_pipe_output(cmds, quiet=False):
         if ON_LINUX and os.isatty(1):
             print("\r", end=" ")
         print("[%.5f] >> %s" % (end - start, " | ".join(cmds)))
-    exectime_external += end - start
-    return output.decode("utf-8").rstrip("\n")
+    add_external(end - start, bytes_read, len(processes))
+    if check:
+        for p, cmd in zip(processes, cmds):
+            if p.returncode != 0:
+                raise subprocess.CalledProcessError(p.returncode, cmd)
+
+
+def run_gnuplot(plotfile, cwd=None):
+    """
+    Run gnuplot on a plot script, return its exit code and error output
+    """
+    start = time.time()
+    p = subprocess.run(
+        gnuplot_cmd + ' "%s"' % plotfile,
+        shell=True,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    add_external(time.time() - start, len(p.stdout))
+    return p.returncode, p.stdout.decode("utf-8", "replace").rstrip("\n")
 
 
 def get_commit_range(defaultrange="HEAD", end_only=False):
@@ -58,32 +106,146 @@ def get_commit_range(defaultrange="HEAD", end_only=False):
     return defaultrange
 
 
-def get_num_of_lines_in_blob(ext_blob):
+class CatFileBatch:
     """
-    Get number of lines in blob
+    Long-lived ``git cat-file --batch`` process reading objects over stdin
     """
-    ext, blob_id = ext_blob
-    return (
-        ext,
-        blob_id,
-        int(get_pipe_output(["git cat-file blob %s" % blob_id, "wc -l"]).split()[0]),
-    )
+
+    def __init__(self, cwd=None):
+        self.process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=cwd,
+        )
+        self.bytes_read = 0
+        self.exectime = 0.0  # spent waiting for objects
+
+    def read(self, obj):
+        """Return (type, content) of the given object."""
+        start = time.time()
+        self.process.stdin.write(obj.encode("utf-8") + b"\n")
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        header = line.split()
+        if len(header) != 3:
+            raise KeyError(obj)
+        content = self.process.stdout.read(int(header[2]))
+        self.process.stdout.read(1)  # trailing newline
+        self.exectime += time.time() - start
+        self.bytes_read += len(line) + len(content) + 1
+        return header[1].decode("ascii"), content
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+        add_external(self.exectime, self.bytes_read)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
-def get_num_of_files_from_rev(time_rev):
+def count_files_in_tree(batch, tree_id, counts):
     """
-    Get number of files changed in commit
+    Count the files of a tree recursively, like ``git ls-tree -r | wc -l``.
+    Subtree counts are memoized in counts, so trees shared between
+    revisions are only read once.
     """
-    time, rev = time_rev
-    return (
-        int(time),
-        rev,
-        int(
-            get_pipe_output(['git ls-tree -r --name-only "%s"' % rev, "wc -l"]).split(
-                "\n"
-            )[0]
-        ),
-    )
+    if tree_id in counts:
+        return counts[tree_id]
+    content = batch.read(tree_id)[1]
+    hash_len = len(tree_id) // 2
+    total = 0
+    pos = 0
+    while pos < len(content):
+        name_end = content.index(b"\0", pos)
+        mode = content[pos : content.index(b" ", pos)]
+        oid = content[name_end + 1 : name_end + 1 + hash_len].hex()
+        pos = name_end + 1 + hash_len
+        if mode == b"40000":
+            total += count_files_in_tree(batch, oid, counts)
+        else:
+            total += 1
+    counts[tree_id] = total
+    return total
+
+
+def get_num_of_files_from_revs(time_revs, cwd=None):
+    """
+    Get number of files in the tree of each revision, using one git process
+    """
+    result = []
+    counts = {}
+    with CatFileBatch(cwd) as batch:
+        for time, rev in time_revs:
+            result.append((int(time), rev, count_files_in_tree(batch, rev, counts)))
+    return result
+
+
+def get_num_of_files_from_deltas(revisions, cwd=None):
+    """
+    Get number of files in the tree of each revision from a running count:
+    each commit starts from its first parent's count and applies the number
+    of files its diff against that parent added minus deleted. Revisions are
+    (time, tree, commit, parents, delta), parents before children. Parents
+    outside of the given revisions are counted in full.
+    """
+    result = []
+    count_by_commit = {}
+    counts = {}
+    batch = None
+    for stamp, tree, commit, parents, delta in revisions:
+        if not parents:
+            count = 0
+        elif parents[0] in count_by_commit:
+            count = count_by_commit[parents[0]]
+        else:
+            if batch is None:
+                batch = CatFileBatch(cwd)
+            parent_tree = batch.read(parents[0])[1].split(b"\n", 1)[0].split()[1]
+            count = count_files_in_tree(batch, parent_tree.decode("ascii"), counts)
+        count += delta
+        count_by_commit[commit] = count
+        result.append((int(stamp), tree, count))
+    if batch is not None:
+        batch.close()
+    return result
+
+
+def get_num_of_lines_in_blobs(ext_blobs, cwd=None):
+    """
+    Get number of lines in each blob, using one git process
+    """
+    result = []
+    with CatFileBatch(cwd) as batch:
+        for ext, blob_id in ext_blobs:
+            result.append((ext, blob_id, batch.read(blob_id)[1].count(b"\n")))
+    return result
+
+
+def get_chunks(items, count):
+    """
+    Split items into at most count contiguous chunks of similar size
+    """
+    size = -(-len(items) // count) or 1
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def get_pool_context():
+    """
+    Return the multiprocessing context of the worker processes. They are not
+    forked from this process, as another of its threads may hold a lock at
+    that moment, which the worker would then wait for forever.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # imported once by the server instead of by each worker it forks
+        context.set_forkserver_preload(["gitstats.main"])
+        return context
+    return multiprocessing.get_context("spawn")
 
 
 def get_stat_summary_counts(line):
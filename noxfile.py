@@ -60,6 +60,22 @@ def preview(session: nox.Session) -> None:
     )
 
 
+@nox.session
+def test(session: nox.Session) -> None:
+    """Run tests"""
+    session.install("--upgrade", "pip")
+    session.install("-e", ".", "pytest")
+    session.run("pytest", "tests", *session.posargs)
+
+
+@nox.session
+def bench(session: nox.Session) -> None:
+    """Benchmark gitstats on synthetic repositories, results in bench-results.json"""
+    session.install("--upgrade", "pip")
+    session.install("-e", ".[numpy]")
+    session.run("python", "benchmarks/bench.py", *session.posargs)
+
+
 @nox.session
 def docs(session: nox.Session) -> None:
     """Build docs"""
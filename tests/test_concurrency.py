@@ -0,0 +1,113 @@
+# Copyright (c) 2024-present Xianpeng Shen <xianpeng.shen@gmail.com>.
+# GPLv2 / GPLv3
+"""
+Collections and reports running in threads of one process must give the
+same results as sequential ones, as gitstats never changes the working
+directory and keeps no state of a run in module globals.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gitstats import timing
+from gitstats.export import Table, get_sections
+from gitstats.main import GitDataCollector
+from gitstats.report_creator import PAGES, HTMLReportCreator, conf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from repo import generate
+
+
+@pytest.fixture(scope="module")
+def repositories(tmp_path_factory):
+    paths = []
+    for seed in range(2):
+        path = str(tmp_path_factory.mktemp("repo") / "repo.git")
+        generate(path, 200, authors=10, files=50, tags=5, merges=0.1, seed=seed)
+        paths.append(path)
+    return paths
+
+
+def collect(path):
+    data = GitDataCollector()
+    data.collect(path)
+    data.refine()
+    return data
+
+
+def get_facts(data):
+    """Return the sections of the export of the data, with the rows of tables."""
+    return {
+        name: (value.columns, list(value.rows)) if isinstance(value, Table) else value
+        for name, value in get_sections(data)
+    }
+
+
+def test_concurrent_collections(repositories):
+    expected = [get_facts(collect(path)) for path in repositories]
+    with ThreadPoolExecutor(max_workers=len(repositories)) as executor:
+        collected = list(executor.map(collect, repositories))
+    assert [get_facts(data) for data in collected] == expected
+    assert expected[0]["project"]["commits"] > 200
+    assert expected[0] != expected[1]
+
+
+def create_report(data, path):
+    os.makedirs(path)
+    HTMLReportCreator().create(data, path)
+    pages = {}
+    for page in PAGES:
+        with open(os.path.join(path, page + ".html")) as f:
+            # without the time the report was generated at
+            pages[page] = re.sub(r"<b>Generated</b>.*", "", f.read())
+    return pages
+
+
+def test_concurrent_reports(repositories, tmp_path, monkeypatch):
+    # render the pages in worker processes even on a single CPU
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    monkeypatch.setitem(conf, "chart_backend", "svg")
+    collected = [collect(path) for path in repositories]
+    expected = [
+        create_report(data, str(tmp_path / "expected" / str(i)))
+        for i, data in enumerate(collected)
+    ]
+    for run in range(5):
+        paths = [str(tmp_path / str(run) / str(i)) for i in range(len(collected))]
+        with ThreadPoolExecutor(max_workers=len(collected)) as executor:
+            assert list(executor.map(create_report, collected, paths)) == expected
+
+
+def test_workers_while_timing_locked(repositories, tmp_path, monkeypatch):
+    # a worker process started while another thread holds the lock of the
+    # phase timings must not wait for it
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    monkeypatch.setitem(conf, "chart_backend", "svg")
+    run = timing.Timing()
+    done = threading.Event()
+
+    def hold_lock():
+        while not done.is_set():
+            with run.lock:
+                time.sleep(0.01)
+
+    def create(rounds):
+        with timing.use(run):
+            for i in range(rounds):
+                create_report(collect(repositories[0]), str(tmp_path / str(i)))
+        done.set()
+
+    holder = threading.Thread(target=hold_lock, daemon=True)
+    worker = threading.Thread(target=create, args=(3,), daemon=True)
+    holder.start()
+    worker.start()
+    worker.join(120)
+    done.set()
+    assert not worker.is_alive()
+    assert run.phases["html"].calls == 3